@@ -2,8 +2,10 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 from .services import AIService
+from customers.throttling import throttle_view
 
 @csrf_exempt
+@throttle_view('ai')
 def ai_chat_api(request):
     if request.method == 'POST':
         try:
@@ -35,6 +37,7 @@ def ai_chat_api(request):
     return JsonResponse({'status': 'error', 'message': 'Метод не разрешен'}, status=405)
 
 @csrf_exempt
+@throttle_view('ai')
 def ai_analyze_photo(request):
     if request.method == 'POST':
         # В реальной системе здесь будет обработка файла
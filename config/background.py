@@ -0,0 +1,74 @@
+"""
+Фоновое выполнение коротких задач внутри процесса веб-сервера.
+
+Задача ставится в пул потоков после коммита текущей транзакции и выполняется
+в схеме того тенанта, из которого была поставлена. Для задач, которые должны
+пережить перезапуск процесса, рядом должна быть management-команда,
+досчитывающая пропущенное (см. generate_media_derivatives).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django_tenants.utils import schema_context
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+# Ключи задач, поставленных в пул, но еще не начавших выполняться
+_pending_keys = set()
+_pending_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+            thread_name_prefix='qtrace-bg',
+        )
+    return _executor
+
+
+def _run(func, schema_name, args, kwargs, dedupe_key=None):
+    if dedupe_key is not None:
+        with _pending_lock:
+            _pending_keys.discard(dedupe_key)
+    try:
+        with schema_context(schema_name):
+            func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed (schema %s)', getattr(func, '__name__', func), schema_name)
+    finally:
+        # У каждого потока свои соединения с БД (и с шардами), не оставляем их открытыми
+        connections.close_all()
+
+
+def _submit(func, schema_name, args, kwargs, dedupe_key):
+    if dedupe_key is not None:
+        with _pending_lock:
+            if dedupe_key in _pending_keys:
+                return
+            _pending_keys.add(dedupe_key)
+    get_executor().submit(_run, func, schema_name, args, kwargs, dedupe_key)
+
+
+def run_in_background(func, *args, dedupe_key=None, **kwargs):
+    """
+    Выполняет func(*args, **kwargs) в фоне после коммита текущей транзакции.
+    Задача с dedupe_key не ставится повторно, пока такая же ждет в очереди
+    (например, разбор очереди удаления после каскадного удаления сотен записей).
+    При BACKGROUND_TASKS_SYNC=True выполняет синхронно (отладка, тесты).
+    """
+    from customers.sharding import tenant_db_alias
+    schema_name = getattr(connection, 'schema_name', 'public')
+    # Данные тенанта из другого шарда коммитятся в транзакции его базы
+    using = tenant_db_alias()
+    if not connections[using].in_atomic_block:
+        using = None
+    if getattr(settings, 'BACKGROUND_TASKS_SYNC', False):
+        transaction.on_commit(lambda: func(*args, **kwargs), using=using)
+        return
+    transaction.on_commit(lambda: _submit(func, schema_name, args, kwargs, dedupe_key), using=using)
@@ -0,0 +1,23 @@
+"""
+Бэкенд PostgreSQL для django-tenants с поддержкой пулов соединений.
+
+Режим выбирается переменной DB_POOL_MODE (config/settings.py):
+    (пусто)     новое соединение на каждый запрос, как раньше
+    persistent  постоянные соединения (CONN_MAX_AGE) с проверкой перед запросом
+    pool        пул psycopg 3 в процессе (нужен пакет psycopg[pool])
+    pgbouncer   PgBouncer в режиме transaction
+
+django-tenants выполняет SET search_path отдельным запросом. В режимах
+persistent и pool он выполняется один раз после смены схемы
+(TENANT_LIMIT_SET_CALLS), а возвращаемое в пул соединение сбрасывает
+search_path. За PgBouncer в режиме transaction отдельный SET небезопасен:
+следующий запрос может уйти в другое серверное соединение. Поэтому при
+TENANT_INLINE_SEARCH_PATH SET отправляется вместе с каждым запросом одной
+командой — это одна неявная транзакция и одно серверное соединение.
+
+Команды, которые нельзя выполнять в блоке транзакции (VACUUM, CREATE/DROP
+DATABASE, CREATE/DROP SUBSCRIPTION, CREATE INDEX CONCURRENTLY и т.п.), отправляются без SET: имена
+таблиц в них нужно указывать со схемой. Команды миграций и фоновые команды
+с SET statement_timeout лучше запускать напрямую к PostgreSQL, минуя
+PgBouncer.
+"""
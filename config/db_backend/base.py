@@ -0,0 +1,84 @@
+import re
+
+from django.conf import settings
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django_tenants.postgresql_backend.base import DatabaseWrapper as TenantDatabaseWrapper
+
+
+def reset_pooled_connection(conn):
+    """Соединение, вернувшееся в пул psycopg, не должно сохранять схему прошлого запроса"""
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    conn.execute('RESET search_path')
+    conn.autocommit = autocommit
+
+
+# Команды, которые PostgreSQL не выполняет в блоке транзакции (в том числе
+# неявном, из нескольких команд): они отправляются без SET search_path
+NON_TRANSACTIONAL_SQL = re.compile(
+    r'\s*(VACUUM|(CREATE|DROP)\s+DATABASE|ALTER\s+SYSTEM|(CREATE|DROP|ALTER)\s+SUBSCRIPTION'
+    r'|(CREATE(\s+UNIQUE)?\s+INDEX|DROP\s+INDEX|REINDEX(\s*\([^)]*\))?\s+\w+)\s+CONCURRENTLY\b)',
+    re.IGNORECASE,
+)
+
+
+class InlineSearchPathCursor:
+    """
+    Курсор, отправляющий SET search_path в одной команде с каждым запросом.
+    Остальные методы и атрибуты — исходного курсора драйвера.
+    """
+
+    def __init__(self, cursor, wrapper):
+        self.cursor = cursor
+        self.wrapper = wrapper
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def execute(self, sql, params=None):
+        if NON_TRANSACTIONAL_SQL.match(sql):
+            return self.cursor.execute(sql, params)
+        prefix = self.wrapper.search_path_sql()
+        result = self.cursor.execute(f'{prefix}; {sql}', params)
+        if is_psycopg3:
+            # psycopg 3 оставляет курсор на первом результате (SET), переходим к запросу
+            self.cursor.nextset()
+        return result
+
+    def executemany(self, sql, param_list):
+        # executemany драйвера не разрешает несколько команд в одном запросе
+        for params in param_list:
+            self.execute(sql, params)
+
+
+class DatabaseWrapper(TenantDatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_options = self.settings_dict['OPTIONS'].get('pool')
+        if pool_options:
+            pool_options = {} if pool_options is True else dict(pool_options)
+            pool_options.setdefault('reset', reset_pooled_connection)
+            self.settings_dict['OPTIONS']['pool'] = pool_options
+
+    @property
+    def inline_search_path(self):
+        return getattr(settings, 'TENANT_INLINE_SEARCH_PATH', False)
+
+    def search_path_sql(self):
+        paths = ','.join(f"'{path}'" for path in self._get_cursor_search_paths())
+        return f'SET search_path = {paths}'
+
+    def create_cursor(self, name=None):
+        cursor = super().create_cursor(name)
+        if self.inline_search_path and not name:
+            return InlineSearchPathCursor(cursor, self)
+        return cursor
+
+    def _handle_search_path(self, cursor=None):
+        # Именованный (серверный) курсор выполняет одну команду: для него — обычный SET
+        if self.inline_search_path and cursor is not None:
+            return
+        super()._handle_search_path(cursor)
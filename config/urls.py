@@ -2,8 +2,6 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
-import os
 from customers.views import (
     landing_page, superuser_dashboard, superuser_tenants, 
     superuser_tenant_edit, superuser_tenant_toggle_status,
@@ -22,33 +20,22 @@ from customers.views import (
     superuser_mail_log_edit, superuser_ai_settings,
     superuser_db_management, superuser_db_cleanup_tenants,
     superuser_db_vacuum, superuser_db_backup, superuser_db_restore,
+    superuser_db_backup_status, superuser_db_backup_download,
     public_tariffs, TenantRegistrationViewSet, SuperuserLoginView
 )
 from dashboard import views as dashboard_views
+from media_app.serving import serve_media
 from config.error_handlers import custom_page_not_found, custom_server_error
 
 handler404 = custom_page_not_found
 handler500 = custom_server_error
 
-def universal_media_serve(request, path, **kwargs):
-    """Универсальный обработчик медиа, учитывающий тенанта"""
-    # Базовый корень — это корень проекта (так как там лежит tenant_media)
-    document_root = settings.MEDIA_ROOT
-    
-    # Если это запрос от тенанта (не public)
-    if hasattr(request, 'tenant') and request.tenant.schema_name != 'public':
-        tenant_root = os.path.join(settings.MEDIA_ROOT, request.tenant.schema_name)
-        # Если файл существует в папке тенанта (например, abc/tenant_media/...)
-        if os.path.exists(os.path.join(tenant_root, path)):
-            document_root = tenant_root
-    
-    return serve(request, path, document_root=document_root, **kwargs)
-
 urlpatterns = [
     path('admin/login/', SuperuserLoginView.as_view(), name='admin_login'),
     path('admin/', admin.site.urls), # Standard admin for public schema
     path('tariffs/', public_tariffs, name='public_tariffs'),
     path('register/', TenantRegistrationViewSet.as_view({'post': 'register'}), name='register'),
+    path('register/<uuid:pk>/', TenantRegistrationViewSet.as_view({'get': 'provisioning'}), name='register_status'),
     path('superuser/', superuser_dashboard, name='superuser_dashboard'),
     path('superuser/tenants/', superuser_tenants, name='superuser_tenants'),
     path('superuser/tenants/<int:tenant_id>/edit/', superuser_tenant_edit, name='superuser_tenant_edit'),
@@ -92,7 +79,9 @@ urlpatterns = [
         path('cleanup-tenants/', superuser_db_cleanup_tenants, name='superuser_db_cleanup_tenants'),
         path('vacuum/', superuser_db_vacuum, name='superuser_db_vacuum'),
         path('backup/', superuser_db_backup, name='superuser_db_backup'),
-        path('restore/<str:filename>/', superuser_db_restore, name='superuser_db_restore'),
+        path('backup/status/', superuser_db_backup_status, name='superuser_db_backup_status'),
+        path('backup/<uuid:job_id>/download/', superuser_db_backup_download, name='superuser_db_backup_download'),
+        path('restore/<uuid:job_id>/', superuser_db_restore, name='superuser_db_restore'),
     ])),
     
     # Обратная связь
@@ -112,12 +101,12 @@ urlpatterns = [
     path('login/', dashboard_views.TenantLoginView.as_view(), name='login'),
     path('logout/', dashboard_views.TenantLogoutView.as_view(), name='logout'),
     path('dashboard/', include('dashboard.urls')), 
-    
+
+    # Медиа отдаются после проверки доступа (см. media_app/serving.py)
+    path('media/<path:path>', serve_media, name='media'),
+
     path('', landing_page, name='home'),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += [
-        path('media/<path:path>', universal_media_serve),
-    ]
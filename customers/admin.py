@@ -31,13 +31,14 @@ class DomainInline(admin.TabularInline):
 
 @admin.register(Client)
 class ClientAdmin(TenantAdminMixin, admin.ModelAdmin):
-    list_display = ('name', 'schema_name', 'subscription_plan', 'is_active', 'created_on')
-    list_filter = ('is_active', 'created_on', 'subscription_end_date')
+    list_display = ('name', 'schema_name', 'shard', 'subscription_plan', 'is_active', 'created_on')
+    list_filter = ('is_active', 'shard', 'created_on', 'subscription_end_date')
     search_fields = ('name', 'schema_name', 'phone', 'telegram', 'email', 'contact_person')
-    readonly_fields = ('created_on',)
+    # Шард меняется только переносом схемы (manage.py move_tenant)
+    readonly_fields = ('created_on', 'shard')
     fieldsets = (
         (None, {
-            'fields': ('name', 'schema_name', 'is_active')
+            'fields': ('name', 'schema_name', 'shard', 'is_active')
         }),
         ('Контакты организации', {
             'fields': ('phone', 'telegram', 'email')
@@ -52,12 +53,23 @@ class ClientAdmin(TenantAdminMixin, admin.ModelAdmin):
     inlines = [DomainInline]
     actions = ['activate_tenants', 'deactivate_tenants']
 
+    def set_tenants_active(self, queryset, is_active):
+        from users_app.principal_cache import bump_principal_version
+        from .tenant_cache import bump_tenant_cache_version
+
+        schemas = list(queryset.values_list('schema_name', flat=True))
+        queryset.update(is_active=is_active)
+        # update() не вызывает сигналы: сбрасываем кэш тенантов и аутентификации вручную
+        bump_tenant_cache_version()
+        for schema_name in schemas:
+            bump_principal_version(schema_name)
+
     def activate_tenants(self, request, queryset):
-        queryset.update(is_active=True)
+        self.set_tenants_active(queryset, True)
     activate_tenants.short_description = "Активировать выбранных тенантов"
 
     def deactivate_tenants(self, request, queryset):
-        queryset.update(is_active=False)
+        self.set_tenants_active(queryset, False)
     deactivate_tenants.short_description = "Заблокировать выбранных тенантов"
 
 @admin.register(Domain)
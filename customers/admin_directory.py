@@ -0,0 +1,73 @@
+"""
+Справочник администраторов тенантов в публичной схеме (customers.TenantAdmin).
+
+Панель суперпользователя ищет и листает администраторов всех организаций
+одним запросом, не переключаясь в схемы. Записи обновляются сигналами
+TenantUser (customers/signals.py); массовые update() сигналов не вызывают,
+такие места синхронизируют справочник сами или через rebuild_client_admins().
+"""
+from django.db import connection, transaction
+
+from .models import Client, TenantAdmin
+
+
+def current_client_id():
+    """Client текущей схемы: tenant_context хранит объект, schema_context — только имя схемы"""
+    tenant = getattr(connection, 'tenant', None)
+    if isinstance(tenant, Client):
+        return tenant.pk
+    return Client.objects.filter(schema_name=connection.schema_name).values_list('pk', flat=True).first()
+
+
+def admin_values(user):
+    return {
+        'username': user.username,
+        'email': user.email or '',
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_active': user.is_active,
+        'last_login': user.last_login,
+        'search_text': ' '.join(filter(None, [user.username, user.first_name, user.last_name, user.email])).lower(),
+    }
+
+
+def sync_tenant_admin(user):
+    """Добавляет, обновляет или убирает пользователя из справочника по его роли"""
+    if getattr(connection, 'schema_name', 'public') == 'public':
+        return
+    client_id = current_client_id()
+    if client_id is None:
+        return
+    if user.role == 'ADMIN':
+        TenantAdmin.objects.update_or_create(client_id=client_id, user_id=user.pk, defaults=admin_values(user))
+    else:
+        TenantAdmin.objects.filter(client_id=client_id, user_id=user.pk).delete()
+
+
+def remove_tenant_admin(user):
+    if getattr(connection, 'schema_name', 'public') == 'public':
+        return
+    client_id = current_client_id()
+    if client_id is not None:
+        TenantAdmin.objects.filter(client_id=client_id, user_id=user.pk).delete()
+
+
+def rebuild_client_admins(client):
+    """Полная пересборка записей одной организации (выполняется в ее схеме)"""
+    from users_app.models import TenantUser
+    admins = [
+        TenantAdmin(client=client, user_id=user.pk, **admin_values(user))
+        for user in TenantUser.objects.filter(role='ADMIN')
+    ]
+    with transaction.atomic():
+        TenantAdmin.objects.filter(client=client).delete()
+        TenantAdmin.objects.bulk_create(admins)
+    return len(admins)
+
+
+def search_tenant_admins(query=''):
+    admins = TenantAdmin.objects.select_related('client')
+    query = query.strip().lower()
+    if query:
+        admins = admins.filter(search_text__contains=query)
+    return admins
@@ -0,0 +1,380 @@
+"""
+Резервное копирование через pg_dump в фоне (BackupJob).
+
+Копия одной организации — архив custom-формата (pg_dump -Fc -n <схема>):
+один файл, который можно скачать и восстановить pg_restore -j.
+Полная копия базы — каталог (pg_dump -Fd -j BACKUP_JOBS): таблицы
+выгружаются параллельно; скачивается как tar, собираемый на лету.
+
+Пароль передается pg_dump только через окружение дочернего процесса.
+Прогресс — число выгруженных таблиц по строкам pg_dump --verbose.
+После успешной копии старые копии той же схемы (или полные) сверх
+BACKUP_KEEP_TENANT / BACKUP_KEEP_FULL удаляются вместе с файлами.
+
+По расписанию копии создает команда backup_tenants.
+
+Восстановление одной организации (RestoreJob) не трогает ее рабочую
+схему, пока новая не готова. pg_restore не умеет менять имя схемы,
+поэтому архив разворачивается (pg_restore -j) во временную базу, схема
+там переименовывается во временное имя и переносится в основную базу
+(pg_dump -j / pg_restore -j). Если архив снят до последнего деплоя,
+к временной схеме применяются недостающие миграции. Затем в одной
+транзакции рабочая схема и восстановленная меняются именами, старая
+удаляется. Для временной базы пользователю БД нужно право CREATEDB.
+Медиа-файлы не восстанавливаются.
+
+Копия и восстановление организации выполняются в базе ее шарда
+(Client.shard, customers/sharding.py); полная копия — только базы default.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import BackupJob, Client, RestoreJob
+
+logger = logging.getLogger(__name__)
+
+# pg_dump --verbose пишет эту строку перед выгрузкой каждой таблицы (и в параллельном режиме)
+TABLE_DUMP_MARKER = 'dumping contents of table'
+PROGRESS_INTERVAL = 1.0
+CHUNK_SIZE = 1024 * 1024
+
+
+def backup_dir():
+    path = str(getattr(settings, 'BACKUP_DIR', os.path.join(settings.BASE_DIR, 'backups')))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def backup_path(job):
+    return os.path.join(backup_dir(), job.filename)
+
+
+def find_pg_tool(name):
+    """Утилита PostgreSQL из PATH или стандартного каталога установки в Windows"""
+    path = shutil.which(name)
+    if path or os.name != 'nt':
+        return path
+    for version in (17, 16, 15, 14):
+        candidate = rf'C:\Program Files\PostgreSQL\{version}\bin\{name}.exe'
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def pg_connection_args(database=None, alias='default'):
+    db = settings.DATABASES[alias]
+    return [
+        '-h', db.get('HOST') or 'localhost',
+        '-p', str(db.get('PORT') or 5432),
+        '-U', db['USER'],
+        '-d', database or db['NAME'],
+    ]
+
+
+def pg_env(alias='default'):
+    """Окружение для утилит PostgreSQL; os.environ процесса не меняется"""
+    env = os.environ.copy()
+    password = settings.DATABASES[alias].get('PASSWORD')
+    if password:
+        env['PGPASSWORD'] = password
+    return env
+
+
+def create_backup_job(client=None):
+    """Копия схемы client или (без client) всей базы; только запись, без запуска"""
+    stamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+    if client is None:
+        return BackupJob.objects.create(format='directory', filename=f'full_{stamp}.d')
+    return BackupJob.objects.create(
+        client=client, schema_name=client.schema_name, format='custom',
+        filename=f'{client.schema_name}_{stamp}.dump',
+    )
+
+
+def schedule_backup(job):
+    from config.background import run_in_background
+    run_in_background(run_backup, job.pk, dedupe_key=f'backup:{job.pk}')
+
+
+def job_shard(job):
+    return job.client.shard if job.client_id else 'default'
+
+
+def count_tables(schema_name, alias='default'):
+    if schema_name:
+        condition, params = 'n.nspname = %s', [schema_name]
+    else:
+        condition, params = "n.nspname NOT LIKE %s AND n.nspname <> 'information_schema'", ['pg\\_%']
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            f"WHERE c.relkind = 'r' AND {condition}",
+            params,
+        )
+        return cursor.fetchone()[0]
+
+
+def dump_command(job, path, alias='default'):
+    compression = str(getattr(settings, 'BACKUP_COMPRESSION', 6))
+    cmd = [find_pg_tool('pg_dump'), *pg_connection_args(alias=alias), '--verbose', '-Z', compression, '-f', path]
+    if job.format == 'directory':
+        cmd += ['-Fd', '-j', str(getattr(settings, 'BACKUP_JOBS', 4))]
+    else:
+        cmd += ['-Fc']
+    if job.schema_name:
+        cmd += ['-n', job.schema_name]
+    return cmd
+
+
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def remove_backup_files(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def run_backup(job_id):
+    """Выполняет pg_dump по заданию. Повторный вызов для завершенного задания ничего не делает."""
+    with transaction.atomic():
+        job = BackupJob.objects.select_for_update(skip_locked=True) \
+            .filter(pk=job_id, status__in=['PENDING', 'RUNNING']).select_related('client').first()
+        if job is None:
+            return
+        alias = job_shard(job)
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.tables_total = count_tables(job.schema_name, alias)
+        job.save(update_fields=['status', 'started_at', 'tables_total'])
+
+    path = backup_path(job)
+    remove_backup_files(path)
+    process = None
+    try:
+        if not find_pg_tool('pg_dump'):
+            raise RuntimeError('Утилита pg_dump не найдена. Установите клиент PostgreSQL или добавьте его bin в PATH.')
+        process = subprocess.Popen(
+            dump_command(job, path, alias), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            text=True, errors='replace', env=pg_env(alias),
+        )
+        output = deque(maxlen=20)
+        done, reported_at = 0, time.monotonic()
+        for line in process.stderr:
+            output.append(line.rstrip())
+            if TABLE_DUMP_MARKER in line:
+                done += 1
+                if time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+                    BackupJob.objects.filter(pk=job.pk).update(tables_done=done)
+                    reported_at = time.monotonic()
+        if process.wait() != 0:
+            errors = [line for line in output if 'error' in line.lower()] or list(output)
+            raise RuntimeError('\n'.join(errors[-5:]) or f'pg_dump завершился с кодом {process.returncode}')
+    except BaseException as e:
+        # BaseException: и при Ctrl+C в команде pg_dump не остается работать
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+        remove_backup_files(path)
+        logger.exception('Backup %s failed', job.filename)
+        BackupJob.objects.filter(pk=job.pk).update(status='FAILED', error=str(e), finished_at=timezone.now())
+        if not isinstance(e, Exception):
+            raise
+        return
+
+    BackupJob.objects.filter(pk=job.pk).update(
+        status='READY', tables_done=done, size=path_size(path), error='', finished_at=timezone.now(),
+    )
+    prune_backups(job.schema_name)
+
+
+def prune_backups(schema_name):
+    """Удаляет готовые копии схемы (или полные) сверх лимита хранения"""
+    if schema_name:
+        keep = getattr(settings, 'BACKUP_KEEP_TENANT', 7)
+    else:
+        keep = getattr(settings, 'BACKUP_KEEP_FULL', 7)
+    stale = list(
+        BackupJob.objects.filter(schema_name=schema_name, status='READY').order_by('-created_at')[keep:]
+    )
+    # Архив, из которого сейчас идет восстановление, не удаляем
+    busy = set(RestoreJob.objects.filter(status__in=['PENDING', 'RUNNING']).values_list('backup_id', flat=True))
+    stale = [job for job in stale if job.pk not in busy]
+    for job in stale:
+        remove_backup_files(backup_path(job))
+    BackupJob.objects.filter(pk__in=[job.pk for job in stale]).delete()
+    return len(stale)
+
+
+def iter_backup(job):
+    """Содержимое копии для скачивания: файл архива или tar каталога, по частям"""
+    path = backup_path(job)
+    if not os.path.isdir(path):
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+        return
+
+    # tar без промежуточного файла: в каталоге pg_dump только плоский список файлов
+    root = os.path.basename(path)
+    for entry in sorted(os.scandir(path), key=lambda e: e.name):
+        if not entry.is_file():
+            continue
+        info = tarfile.TarInfo(f'{root}/{entry.name}')
+        stat = entry.stat()
+        info.size, info.mtime, info.mode = stat.st_size, int(stat.st_mtime), 0o644
+        yield info.tobuf(format=tarfile.GNU_FORMAT)
+        with open(entry.path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+        if info.size % tarfile.BLOCKSIZE:
+            yield tarfile.NUL * (tarfile.BLOCKSIZE - info.size % tarfile.BLOCKSIZE)
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def download_name(job):
+    return f'{job.filename}.tar' if job.format == 'directory' else job.filename
+
+
+def run_pg_tool(name, args, alias='default'):
+    path = find_pg_tool(name)
+    if not path:
+        raise RuntimeError(f'Утилита {name} не найдена. Установите клиент PostgreSQL или добавьте его bin в PATH.')
+    result = subprocess.run([path, *args], capture_output=True, text=True, errors='replace', env=pg_env(alias))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[-2000:] or f'{name} завершился с кодом {result.returncode}')
+
+
+def active_restore_schemas():
+    """Временные схемы идущих восстановлений: их нельзя считать «мертвыми»"""
+    schemas = set()
+    for job in RestoreJob.objects.filter(status__in=['PENDING', 'RUNNING']):
+        schemas.update((job.staging_schema, job.old_schema))
+    return schemas
+
+
+def schedule_restore(job):
+    from config.background import run_in_background
+    run_in_background(run_restore, job.pk, dedupe_key=f'restore:{job.pk}')
+
+
+def set_restore_stage(job, stage):
+    RestoreJob.objects.filter(pk=job.pk).update(stage=stage)
+
+
+def drop_schema(schema_name, alias='default'):
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS {connection.ops.quote_name(schema_name)} CASCADE')
+
+
+def swap_schema(job, alias='default'):
+    """Восстановленная схема получает рабочее имя; запросы видят либо старую, либо новую"""
+    connection = connections[alias]
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        # Не ждем бесконечно, если схему держит долгая миграция
+        cursor.execute("SET LOCAL lock_timeout = '30s'")
+        cursor.execute(f'ALTER SCHEMA {qn(job.schema_name)} RENAME TO {qn(job.old_schema)}')
+        cursor.execute(f'ALTER SCHEMA {qn(job.staging_schema)} RENAME TO {qn(job.schema_name)}')
+
+
+def migrate_staging_schema(job, alias='default'):
+    """Архив мог быть снят до деплоя: недостающие миграции применяются до переключения"""
+    from django.core.management import call_command
+    from .provisioning import missing_migrations
+
+    missing = missing_migrations(job.staging_schema, alias)
+    if missing is None:
+        raise RuntimeError('В восстановленной схеме нет таблицы миграций')
+    if missing:
+        call_command(
+            'migrate_schemas', tenant=True, schema_name=job.staging_schema, database=alias,
+            interactive=False, verbosity=0,
+        )
+
+
+def after_restore(client):
+    """Данные в публичной схеме и кэшах, производные от схемы организации"""
+    from django_tenants.utils import tenant_context
+    from users_app.principal_cache import bump_principal_version
+    from .admin_directory import rebuild_client_admins
+    from .stats import collect_tenant_stats
+
+    bump_principal_version(client.schema_name)
+    with tenant_context(client):
+        rebuild_client_admins(client)
+    collect_tenant_stats(Client.objects.filter(pk=client.pk))
+
+
+def run_restore(job_id):
+    """Восстанавливает схему организации из архива задания. Повторный вызов безопасен."""
+    with transaction.atomic():
+        job = RestoreJob.objects.select_for_update(skip_locked=True) \
+            .filter(pk=job_id, status__in=['PENDING', 'RUNNING']).select_related('backup').first()
+        if job is None:
+            return
+        job.status = 'RUNNING'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+    alias = 'default'
+    qn = connections[alias].ops.quote_name
+    workdir = os.path.join(backup_dir(), f'.restore_{job.suffix}')
+    jobs = str(getattr(settings, 'BACKUP_JOBS', 4))
+    scratch_created = False
+    try:
+        client = Client.objects.get(schema_name=job.schema_name)
+        # Временная база создается на сервере шарда организации
+        alias = client.shard
+        scratch_db = f"{settings.DATABASES[alias]['NAME'][:40]}_restore_{job.suffix}"
+        if job.backup is None or job.backup.status != 'READY' or not os.path.exists(backup_path(job.backup)):
+            raise RuntimeError('Файл резервной копии недоступен')
+
+        set_restore_stage(job, 'restore')
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS {qn(scratch_db)}')
+            cursor.execute(f'CREATE DATABASE {qn(scratch_db)} TEMPLATE template0')
+        scratch_created = True
+        run_pg_tool('pg_restore', [*pg_connection_args(scratch_db, alias), '-j', jobs, '--exit-on-error', backup_path(job.backup)], alias)
+        run_pg_tool('psql', [
+            *pg_connection_args(scratch_db, alias), '-v', 'ON_ERROR_STOP=1',
+            '-c', f'ALTER SCHEMA {qn(job.schema_name)} RENAME TO {qn(job.staging_schema)}',
+        ], alias)
+
+        set_restore_stage(job, 'copy')
+        remove_backup_files(workdir)
+        run_pg_tool('pg_dump', [*pg_connection_args(scratch_db, alias), '-Fd', '-j', jobs, '-Z', '0', '-n', job.staging_schema, '-f', workdir], alias)
+        drop_schema(job.staging_schema, alias)
+        run_pg_tool('pg_restore', [*pg_connection_args(alias=alias), '-j', jobs, '--exit-on-error', workdir], alias)
+        migrate_staging_schema(job, alias)
+
+        set_restore_stage(job, 'swap')
+        swap_schema(job, alias)
+    except Exception as e:
+        logger.exception('Restore of %s failed', job.schema_name)
+        drop_schema(job.staging_schema, alias)
+        RestoreJob.objects.filter(pk=job.pk).update(status='FAILED', error=str(e), finished_at=timezone.now())
+        return
+    finally:
+        remove_backup_files(workdir)
+        if scratch_created:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'DROP DATABASE IF EXISTS {qn(scratch_db)}')
+
+    RestoreJob.objects.filter(pk=job.pk).update(status='READY', error='', finished_at=timezone.now())
+    drop_schema(job.old_schema, alias)
+    after_restore(client)
@@ -0,0 +1,123 @@
+"""
+Сводки платежей: итоги по организации (PaymentSummary) и выручка по
+месяцам (RevenueMonth).
+
+Сводки пересчитываются по платежам одной организации при каждом
+сохранении/удалении Payment (customers/signals.py), поэтому страница
+финансов и панель не агрегируют все платежи на каждый запрос. Массовые
+update()/delete() сигналов не вызывают — после них (и для заполнения
+сводок впервые) нужна команда rebuild_payment_ledger.
+
+Показатели для API выручки считаются только по RevenueMonth. Оплата
+вносится вперед на несколько месяцев, поэтому организация считается
+платящей в месяце M, если платила в одном из window последних месяцев,
+а MRR — поступления платящих за эти месяцы, деленные на window.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Payment, PaymentSummary, RevenueMonth
+
+CENTS = Decimal('0.01')
+
+
+def refresh_client_ledger(client_id):
+    """Пересчитывает сводки одной организации по ее платежам"""
+    if client_id is None:
+        return
+    payments = Payment.objects.filter(tenant_id=client_id)
+    with transaction.atomic():
+        totals = payments.aggregate(
+            total=Sum('amount'), count=Count('id'), first=Min('date'), last=Max('date'),
+        )
+        if not totals['count']:
+            PaymentSummary.objects.filter(client_id=client_id).delete()
+            RevenueMonth.objects.filter(client_id=client_id).delete()
+            return
+        PaymentSummary.objects.update_or_create(client_id=client_id, defaults={
+            'total_paid': totals['total'] or 0,
+            'payment_count': totals['count'],
+            'first_payment_date': totals['first'],
+            'last_payment_date': totals['last'],
+        })
+
+        months = [
+            RevenueMonth(client_id=client_id, month=row['month'], amount=row['amount'], payment_count=row['count'])
+            for row in payments.filter(date__isnull=False).annotate(month=TruncMonth('date'))
+            .values('month').annotate(amount=Sum('amount'), count=Count('id'))
+        ]
+        RevenueMonth.objects.filter(client_id=client_id).exclude(month__in=[m.month for m in months]).delete()
+        RevenueMonth.objects.bulk_create(
+            months, update_conflicts=True, unique_fields=['client', 'month'],
+            update_fields=['amount', 'payment_count'],
+        )
+
+
+def rebuild_ledger():
+    """Полный пересчет сводок. Возвращает число организаций с платежами."""
+    client_ids = set(Payment.objects.exclude(tenant=None).values_list('tenant_id', flat=True).distinct())
+    stale = set(PaymentSummary.objects.values_list('client_id', flat=True)) - client_ids
+    RevenueMonth.objects.filter(client_id__in=stale).delete()
+    PaymentSummary.objects.filter(client_id__in=stale).delete()
+    for client_id in client_ids:
+        refresh_client_ledger(client_id)
+    return len(client_ids)
+
+
+def client_total_paid(client):
+    return PaymentSummary.objects.filter(client=client).values_list('total_paid', flat=True).first() or 0
+
+
+def total_revenue():
+    return PaymentSummary.objects.aggregate(total=Sum('total_paid'))['total'] or 0
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def revenue_series(months=12, window=3):
+    """
+    Помесячные показатели за последние months месяцев (включая текущий):
+    выручка, MRR, платящие, новые и ушедшие организации, отток.
+    """
+    end = timezone.now().date().replace(day=1)
+    start = add_months(end, -(months - 1))
+    by_month = defaultdict(dict)
+    rows = RevenueMonth.objects.filter(month__gte=add_months(start, -window), month__lte=end) \
+        .values_list('client_id', 'month', 'amount')
+    for client_id, month, amount in rows:
+        by_month[month][client_id] = amount
+
+    def paying(month):
+        """Организации, платившие за window месяцев до month включительно: id -> сумма"""
+        result = defaultdict(Decimal)
+        for offset in range(window):
+            for client_id, amount in by_month.get(add_months(month, -offset), {}).items():
+                result[client_id] += amount
+        return result
+
+    series = []
+    previous = paying(add_months(start, -1))
+    for index in range(months):
+        month = add_months(start, index)
+        current = paying(month)
+        churned = previous.keys() - current.keys()
+        series.append({
+            'month': month.isoformat(),
+            'revenue': str(sum(by_month.get(month, {}).values(), Decimal(0)).quantize(CENTS)),
+            'mrr': str((sum(current.values(), Decimal(0)) / window).quantize(CENTS)),
+            'paying_clients': len(current),
+            'new_clients': len(current.keys() - previous.keys()),
+            'churned_clients': len(churned),
+            'churned_mrr': str((sum((previous[c] for c in churned), Decimal(0)) / window).quantize(CENTS)),
+            'churn_rate': round(len(churned) / len(previous), 4) if previous else 0.0,
+        })
+        previous = current
+    return series
@@ -0,0 +1,33 @@
+from django.core.management.base import CommandError
+from customers.backups import create_backup_job, run_backup
+from customers.models import BackupJob
+from customers.tenant_commands import TenantCommand
+
+
+def backup(client=None):
+    job = create_backup_job(client)
+    run_backup(job.pk)
+    job = BackupJob.objects.get(pk=job.pk)
+    if job.status != 'READY':
+        raise RuntimeError(job.error or f'статус {job.status}')
+    return job
+
+
+class Command(TenantCommand):
+    help = 'Резервные копии схем организаций (pg_dump -Fc); с --full — и полная копия базы. Запускать по расписанию.'
+
+    def add_tenant_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Перед копиями организаций сделать полную копию базы')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            try:
+                job = backup()
+            except RuntimeError as e:
+                raise CommandError(f'Полная копия не создана: {e}')
+            self.stdout.write(f"Полная копия: {job.filename} ({job.size} байт)")
+        super().handle(*args, **options)
+
+    def handle_tenant(self, client, **options):
+        job = backup(client)
+        return {'bytes': job.size}
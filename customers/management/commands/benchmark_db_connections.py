@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from customers.models import Client
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет накладные расходы на соединение с БД: имитирует запросы к тенанту '
+        'с новым соединением на каждый запрос и в текущем режиме DB_POOL_MODE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Сколько запросов имитировать')
+        parser.add_argument('--queries', type=int, default=5, help='SQL-запросов на один запрос')
+        parser.add_argument('--schema', help='Схема тенанта (по умолчанию — первая)')
+
+    def simulate(self, client, requests, queries, reconnect):
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            # Как в обработчике запроса: сигналы закрывают устаревшие соединения,
+            # middleware выбирает схему тенанта
+            request_started.send(sender=self.__class__)
+            connection.set_tenant(client)
+            for _ in range(queries):
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            if reconnect:
+                connection.close()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f"{label}: среднее {statistics.mean(timings):.2f} мс, медиана {statistics.median(timings):.2f} мс, p95 {p95:.2f} мс"
+        )
+        return statistics.mean(timings)
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public').order_by('schema_name')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+        client = clients.first()
+        if client is None:
+            raise CommandError('Нет схемы тенанта для замера')
+
+        requests, queries = max(options['requests'], 1), max(options['queries'], 1)
+        mode = settings.DB_POOL_MODE or 'новое соединение на запрос'
+        self.stdout.write(f"{client.name} ({client.schema_name}): {requests} запросов по {queries} SQL, режим: {mode}")
+
+        # Прогрев: открытие пула, кэши ContentType и т.п.
+        self.simulate(client, 5, queries, reconnect=False)
+        current = self.report(f'Текущий режим ({mode})', self.simulate(client, requests, queries, reconnect=False))
+        if connection.settings_dict['OPTIONS'].get('pool'):
+            # close() вернет соединение в пул, а не закроет его
+            connection.close()
+            self.stdout.write('Для сравнения запустите команду с пустым DB_POOL_MODE')
+            return
+        baseline = self.report('Новое соединение на каждый запрос', self.simulate(client, requests, queries, reconnect=True))
+        connection.close()
+
+        if current:
+            self.stdout.write(self.style.SUCCESS(f"Экономия на запрос: {baseline - current:.2f} мс ({baseline / current:.1f}x)"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from customers.metering import collect_usage_samples, prune_usage_samples
+from customers.models import Client
+
+
+class Command(BaseCommand):
+    help = 'Записывает замер потребления организаций (размер схемы, записи, медиа, запросы); запускать по расписанию'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+        parser.add_argument('--keep-days', type=int, default=90, help='Удалить замеры старше N дней (0 — не удалять)')
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+        created = collect_usage_samples(clients)
+        self.stdout.write(f"Записано замеров: {created}")
+        if options['keep_days']:
+            deleted = prune_usage_samples(options['keep_days'])
+            self.stdout.write(f"Удалено устаревших замеров: {deleted}")
+        self.stdout.write(self.style.SUCCESS('Сбор завершен'))
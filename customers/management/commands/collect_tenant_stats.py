@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from customers.models import Client
+from customers.stats import collect_tenant_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику организаций (пользователи, задачи, объем медиа) одним запросом по всем схемам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+        updated = collect_tenant_stats(clients)
+        self.stdout.write(self.style.SUCCESS(f"Обновлена статистика организаций: {updated}"))
@@ -0,0 +1,17 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from customers.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = 'Выполняет migrate_schemas во всех шардах БД: общие приложения в default (в остальных — только очередь удаления файлов), схемы организаций — в их шардах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--executor', help='Исполнитель migrate_schemas (standard, multiprocessing)')
+
+    def handle(self, *args, **options):
+        extra = {'executor': options['executor']} if options['executor'] else {}
+        for alias in shard_aliases():
+            self.stdout.write(f'Шард {alias}')
+            call_command('migrate_schemas', database=alias, interactive=False, verbosity=options['verbosity'], **extra)
+        self.stdout.write(self.style.SUCCESS(f'Шардов смигрировано: {len(shard_aliases())}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from customers.models import Client
+from customers.sharding import move_tenant, shard_aliases
+
+
+class Command(BaseCommand):
+    help = 'Переносит схему организации в другой шард БД логической репликацией (организация отключается на секунды)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('schema', help='Схема организации')
+        parser.add_argument('shard', help='Шард назначения')
+        parser.add_argument('--drop-source', action='store_true', help='Удалить схему из исходного шарда после переноса')
+        parser.add_argument('--timeout', type=int, default=3600, help='Ожидание копирования данных, секунды')
+        parser.add_argument('--drain', type=int, help='Пауза на завершение начатых запросов, секунды')
+
+    def handle(self, *args, **options):
+        schema_name = options['schema']
+        client = Client.objects.exclude(schema_name='public').filter(schema_name=schema_name).first()
+        if client is None:
+            raise CommandError(f'Организация со схемой {schema_name} не найдена')
+        if options['shard'] not in shard_aliases():
+            raise CommandError(f"Неизвестный шард {options['shard']}; доступны: {', '.join(shard_aliases())}")
+
+        source = client.shard
+        try:
+            move_tenant(
+                client, options['shard'], drop_source=options['drop_source'], timeout=options['timeout'],
+                drain=options['drain'], log=lambda message: self.stdout.write(f"{client.name} ({schema_name}): {message}"),
+            )
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Организация {client.name} перенесена: {source} -> {client.shard}"))
@@ -0,0 +1,43 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django_tenants.utils import schema_exists
+from customers.models import Client
+from customers.provisioning import get_template_schema, missing_migrations
+
+
+class Command(BaseCommand):
+    help = 'Создает или обновляет шаблонную схему для быстрой регистрации организаций (TENANT_TEMPLATE_SCHEMA)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Только проверить, что шаблон актуален')
+
+    def handle(self, *args, **options):
+        template = get_template_schema()
+        if not template:
+            raise CommandError('TENANT_TEMPLATE_SCHEMA не задан.')
+        if Client.objects.filter(schema_name=template).exists():
+            raise CommandError(f'Схема {template} принадлежит организации и не может быть шаблоном.')
+
+        if options['check']:
+            missing = missing_migrations(template)
+            if missing is None:
+                raise CommandError(f'Шаблонная схема {template} не создана.')
+            if missing:
+                raise CommandError(f'В шаблонной схеме {template} не применено миграций: {len(missing)}')
+            self.stdout.write(self.style.SUCCESS(f'Шаблонная схема {template} актуальна'))
+            return
+
+        if not schema_exists(template):
+            with connection.cursor() as cursor:
+                cursor.execute(f'CREATE SCHEMA {connection.ops.quote_name(template)}')
+            self.stdout.write(f'Создана схема {template}')
+
+        call_command(
+            'migrate_schemas', tenant=True, schema_name=template,
+            interactive=False, verbosity=options['verbosity'],
+        )
+        missing = missing_migrations(template)
+        if missing:
+            raise CommandError(f'После миграции в {template} не применено: {len(missing)}')
+        self.stdout.write(self.style.SUCCESS(f'Шаблонная схема {template} готова'))
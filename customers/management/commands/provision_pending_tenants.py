@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from customers.provisioning import provision_tenant, stale_provisioning_jobs
+
+
+class Command(BaseCommand):
+    help = 'Доделывает заявки на создание организаций, прерванные перезапуском процесса'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes', type=int, default=10,
+            help='Считать заявку зависшей, если она не менялась столько минут'
+        )
+
+    def handle(self, *args, **options):
+        jobs = list(stale_provisioning_jobs(options['minutes']))
+        for job in jobs:
+            provision_tenant(job.pk)
+            job.refresh_from_db()
+            self.stdout.write(f"{job.company_name} ({job.schema_name}): {job.get_status_display()}")
+        self.stdout.write(self.style.SUCCESS(f"Обработано заявок: {len(jobs)}"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+from customers.admin_directory import rebuild_client_admins
+from customers.models import Client, TenantAdmin
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает справочник администраторов тенантов в публичной схеме'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+        else:
+            # Записи организаций, которых больше нет (на случай удаления схемы в обход Client)
+            TenantAdmin.objects.exclude(client__in=clients).delete()
+
+        total = 0
+        for client in clients:
+            try:
+                with schema_context(client.schema_name):
+                    count = rebuild_client_admins(client)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{client.name} ({client.schema_name}): ошибка: {e}"))
+                continue
+            self.stdout.write(f"{client.name} ({client.schema_name}): администраторов {count}")
+            total += count
+
+        self.stdout.write(self.style.SUCCESS(f"Всего администраторов в справочнике: {total}"))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from customers.ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает итоги платежей и помесячную выручку организаций по всем платежам'
+
+    def handle(self, *args, **options):
+        count = rebuild_ledger()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитаны сводки платежей организаций: {count}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from customers.backups import run_restore
+from customers.models import BackupJob, Client, RestoreJob
+
+
+class Command(BaseCommand):
+    help = 'Восстанавливает схему одной организации из ее резервной копии (по умолчанию — последней), не затрагивая остальные'
+
+    def add_arguments(self, parser):
+        parser.add_argument('schema', help='Схема организации')
+        parser.add_argument('--backup', help='ID резервной копии (BackupJob)')
+
+    def handle(self, *args, **options):
+        schema_name = options['schema']
+        if not Client.objects.filter(schema_name=schema_name).exists():
+            raise CommandError(f'Организация со схемой {schema_name} не найдена')
+        backups = BackupJob.objects.filter(schema_name=schema_name, status='READY')
+        if options['backup']:
+            backups = backups.filter(pk=options['backup'])
+        backup = backups.order_by('-created_at').first()
+        if backup is None:
+            raise CommandError(f'Нет готовой резервной копии схемы {schema_name}')
+
+        job = RestoreJob.objects.create(backup=backup, schema_name=schema_name)
+        self.stdout.write(f"{schema_name}: восстановление из {backup.filename}")
+        run_restore(job.pk)
+        job.refresh_from_db()
+        if job.status != 'READY':
+            raise CommandError(f'Восстановление не удалось: {job.error}')
+        self.stdout.write(self.style.SUCCESS(f'Схема {schema_name} восстановлена'))
@@ -0,0 +1,133 @@
+"""
+Учет потребления ресурсов организациями (TenantUsageSample).
+
+Команда collect_tenant_metering периодически записывает для каждой схемы:
+    db_bytes      — pg_total_relation_size таблиц схемы (с индексами и TOAST)
+    row_estimate  — сумма pg_class.reltuples (оценка планировщика, без COUNT(*))
+    media_bytes   — объем медиа из TenantStats
+    request_count — запросы к тенанту с прошлого замера
+
+Размеры всех схем считаются одним запросом к pg_class с группировкой по
+схеме в каждом шарде (customers/sharding.py). Запросы считает
+RequestMeteringMiddleware счетчиком в общем кэше Django; при сборе из
+счетчика вычитается прочитанное значение, так что запросы, пришедшие во
+время сбора, попадут в следующий замер. При LocMemCache каждый процесс
+считает только свои запросы.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Client, TenantStats, TenantUsageSample
+from .sharding import schemas_by_shard
+
+REQUEST_COUNTER_PREFIX = 'metering:requests:'
+
+
+def count_request(schema_name):
+    key = REQUEST_COUNTER_PREFIX + schema_name
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def take_request_counts(schema_names):
+    """Счетчики запросов по схемам с обнулением прочитанного"""
+    keys = {REQUEST_COUNTER_PREFIX + name: name for name in schema_names}
+    counts = {}
+    for key, value in cache.get_many(list(keys)).items():
+        if not value:
+            continue
+        try:
+            cache.decr(key, value)
+        except ValueError:
+            continue
+        counts[keys[key]] = value
+    return counts
+
+
+def schema_sizes(schema_names, using='default'):
+    """{схема: (байт, записей)} по таблицам, секционированным таблицам и мат. представлениям"""
+    if not schema_names:
+        return {}
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT n.nspname,
+                COALESCE(SUM(pg_total_relation_size(c.oid)), 0)::bigint,
+                -- reltuples = -1 у таблиц, которые еще ни разу не анализировались
+                COALESCE(SUM(GREATEST(c.reltuples, 0)) FILTER (WHERE c.relkind <> 'p'), 0)::bigint
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind IN ('r', 'p', 'm') AND n.nspname = ANY(%s)
+            GROUP BY n.nspname
+            """,
+            [list(schema_names)],
+        )
+        return {name: (size, rows) for name, size, rows in cursor.fetchall()}
+
+
+def collect_usage_samples(clients=None):
+    """Записывает по одному замеру на организацию. Возвращает число замеров."""
+    from .stats import collect_tenant_stats
+
+    if clients is None:
+        clients = Client.objects.exclude(schema_name='public')
+    schemas = dict(clients.values_list('schema_name', 'id'))
+    if not schemas:
+        return 0
+
+    collect_tenant_stats(clients)
+    media = dict(TenantStats.objects.filter(client_id__in=schemas.values()).values_list('client_id', 'media_bytes'))
+    sizes = {}
+    for shard, shard_schemas in schemas_by_shard(clients).items():
+        sizes.update(schema_sizes(shard_schemas, shard))
+    requests = take_request_counts(schemas)
+
+    collected_at = timezone.now()
+    samples = []
+    for schema_name, client_id in schemas.items():
+        db_bytes, row_estimate = sizes.get(schema_name, (0, 0))
+        samples.append(TenantUsageSample(
+            client_id=client_id,
+            collected_at=collected_at,
+            db_bytes=db_bytes,
+            row_estimate=row_estimate,
+            media_bytes=media.get(client_id, 0),
+            request_count=requests.get(schema_name, 0),
+        ))
+    TenantUsageSample.objects.bulk_create(samples)
+    return len(samples)
+
+
+def prune_usage_samples(keep_days):
+    deleted, _ = TenantUsageSample.objects.filter(collected_at__lt=timezone.now() - timedelta(days=keep_days)).delete()
+    return deleted
+
+
+def latest_usage(hours=24):
+    """
+    Последний замер каждой организации (collect_tenant_metering --schema
+    добавляет замер только одной) и сумма запросов за hours часов до
+    последнего сбора: (время последнего сбора, [замеры]).
+    """
+    samples = list(
+        TenantUsageSample.objects.order_by('client_id', '-collected_at')
+        .distinct('client_id').select_related('client')
+    )
+    if not samples:
+        return None, []
+    samples.sort(key=lambda sample: sample.db_bytes, reverse=True)
+    collected_at = max(sample.collected_at for sample in samples)
+    requests = dict(
+        TenantUsageSample.objects.filter(collected_at__gt=collected_at - timedelta(hours=hours))
+        .values_list('client_id').annotate(total=Sum('request_count'))
+    )
+    for sample in samples:
+        sample.recent_requests = requests.get(sample.client_id, 0)
+    return collected_at, samples
@@ -1,6 +1,23 @@
 from django.http import HttpResponseForbidden
 from django.shortcuts import render
 from django.utils import timezone
+from django_tenants.middleware.main import TenantMainMiddleware
+
+from .metering import count_request
+from .tenant_cache import load_tenant, tenant_cache
+
+
+class CachedTenantMainMiddleware(TenantMainMiddleware):
+    """
+    TenantMainMiddleware с кэшем хост -> организация в памяти процесса
+    (customers/tenant_cache.py): обычный запрос не обращается к публичной схеме.
+    """
+    def get_tenant(self, domain_model, hostname):
+        tenant = tenant_cache.get(hostname, load_tenant)
+        if tenant is None:
+            raise domain_model.DoesNotExist
+        return tenant
+
 
 class TenantStatusMiddleware:
     """
@@ -31,3 +48,15 @@ class TenantStatusMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+class RequestMeteringMiddleware:
+    """Счетчик запросов тенанта для замеров потребления (customers/metering.py)"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant = getattr(request, 'tenant', None)
+        if tenant and tenant.schema_name != 'public':
+            count_request(tenant.schema_name)
+        return self.get_response(request)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0023_pendingfiledeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='image_max_dimension',
+            field=models.PositiveIntegerField(default=2560, verbose_name='Максимальная сторона фотографии (px)'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='image_quality',
+            field=models.PositiveSmallIntegerField(default=80, verbose_name='Качество сжатия (1-100)'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='image_transcode_enabled',
+            field=models.BooleanField(default=False, verbose_name='Сжимать фотографии при загрузке'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='image_transcode_format',
+            field=models.CharField(choices=[('WEBP', 'WebP'), ('JPEG', 'JPEG')], default='WEBP', max_length=10, verbose_name='Формат сжатых фотографий'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='keep_original_images',
+            field=models.BooleanField(default=False, verbose_name='Хранить оригиналы фотографий'),
+        ),
+    ]
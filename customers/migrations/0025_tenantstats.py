@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0024_client_image_transcoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantStats',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='customers.client')),
+                ('user_count', models.PositiveIntegerField(default=0, verbose_name='Пользователей')),
+                ('task_count', models.PositiveIntegerField(default=0, verbose_name='Задач')),
+                ('media_bytes', models.BigIntegerField(default=0, verbose_name='Объем медиа (байт)')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Статистика организации',
+                'verbose_name_plural': 'Статистика организаций',
+            },
+        ),
+    ]
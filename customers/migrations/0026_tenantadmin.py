@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:03
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0025_tenantstats'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='TenantAdmin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(verbose_name='ID пользователя в схеме тенанта')),
+                ('username', models.CharField(max_length=150)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('first_name', models.CharField(blank=True, max_length=150)),
+                ('last_name', models.CharField(blank=True, max_length=150)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_login', models.DateTimeField(blank=True, null=True)),
+                ('search_text', models.TextField(blank=True, default='')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='admins', to='customers.client')),
+            ],
+            options={
+                'verbose_name': 'Администратор организации',
+                'verbose_name_plural': 'Администраторы организаций',
+                'indexes': [models.Index(fields=['username'], name='tenant_admin_username_idx'), django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='tenant_admin_search_idx', opclasses=['gin_trgm_ops'])],
+                'constraints': [models.UniqueConstraint(fields=('client', 'user_id'), name='tenant_admin_client_user_uniq')],
+            },
+        ),
+    ]
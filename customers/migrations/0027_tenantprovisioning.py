@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:08
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0026_tenantadmin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantProvisioning',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('RUNNING', 'Создается'), ('READY', 'Готово'), ('FAILED', 'Ошибка')], db_index=True, default='PENDING', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('company_name', models.CharField(max_length=100)),
+                ('schema_name', models.CharField(db_index=True, max_length=63)),
+                ('domain', models.CharField(max_length=253)),
+                ('tenant_url', models.CharField(max_length=300)),
+                ('phone', models.CharField(max_length=20)),
+                ('telegram', models.CharField(blank=True, default='', max_length=100)),
+                ('email', models.EmailField(blank=True, default='', max_length=254)),
+                ('contact_person', models.CharField(blank=True, default='', max_length=255)),
+                ('admin_username', models.CharField(max_length=150)),
+                ('admin_email', models.EmailField(max_length=254)),
+                ('admin_password_hash', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='provisioning', to='customers.client')),
+                ('subscription_plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='customers.subscriptionplan')),
+            ],
+            options={
+                'verbose_name': 'Заявка на создание организации',
+                'verbose_name_plural': 'Заявки на создание организаций',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0027_tenantprovisioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantUsageSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collected_at', models.DateTimeField(db_index=True, verbose_name='Время замера')),
+                ('db_bytes', models.BigIntegerField(default=0, verbose_name='Размер схемы (байт)')),
+                ('row_estimate', models.BigIntegerField(default=0, verbose_name='Записей (оценка)')),
+                ('media_bytes', models.BigIntegerField(default=0, verbose_name='Объем медиа (байт)')),
+                ('request_count', models.PositiveIntegerField(default=0, verbose_name='Запросов с прошлого замера')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_samples', to='customers.client')),
+            ],
+            options={
+                'verbose_name': 'Замер потребления',
+                'verbose_name_plural': 'Замеры потребления',
+                'indexes': [models.Index(fields=['client', '-collected_at'], name='usage_client_collected_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:11
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0028_tenantusagesample'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('RUNNING', 'Выполняется'), ('READY', 'Готово'), ('FAILED', 'Ошибка')], db_index=True, default='PENDING', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('schema_name', models.CharField(blank=True, db_index=True, default='', max_length=63)),
+                ('format', models.CharField(choices=[('custom', 'Архив pg_dump (-Fc)'), ('directory', 'Каталог pg_dump (-Fd)')], default='custom', max_length=20)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(default=0, verbose_name='Размер (байт)')),
+                ('tables_total', models.PositiveIntegerField(default=0)),
+                ('tables_done', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='backups', to='customers.client')),
+            ],
+            options={
+                'verbose_name': 'Резервная копия',
+                'verbose_name_plural': 'Резервные копии',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:14
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0029_backupjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestoreJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('RUNNING', 'Выполняется'), ('READY', 'Готово'), ('FAILED', 'Ошибка')], db_index=True, default='PENDING', max_length=20)),
+                ('stage', models.CharField(blank=True, choices=[('restore', 'Распаковка архива'), ('copy', 'Загрузка в основную базу'), ('swap', 'Подмена схемы')], default='', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('schema_name', models.CharField(db_index=True, max_length=63)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('backup', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='restores', to='customers.backupjob')),
+            ],
+            options={
+                'verbose_name': 'Восстановление из копии',
+                'verbose_name_plural': 'Восстановления из копий',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
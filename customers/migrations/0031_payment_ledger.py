@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0030_restorejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentSummary',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payment_summary', serialize=False, to='customers.client')),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Всего оплачено')),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('first_payment_date', models.DateField(blank=True, null=True)),
+                ('last_payment_date', models.DateField(blank=True, db_index=True, null=True, verbose_name='Последний платеж')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Итоги платежей',
+                'verbose_name_plural': 'Итоги платежей',
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(db_index=True)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_months', to='customers.client')),
+            ],
+            options={
+                'verbose_name': 'Выручка за месяц',
+                'verbose_name_plural': 'Выручка по месяцам',
+                'constraints': [models.UniqueConstraint(fields=('client', 'month'), name='revenue_month_client_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:25
+
+import customers.sharding
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0031_payment_ledger'),
+    ]
+
+    operations = [
+        # Существующие организации остаются в default при любом TENANT_DEFAULT_SHARD
+        migrations.AddField(
+            model_name='client',
+            name='shard',
+            field=models.CharField(db_index=True, default='default', max_length=63, verbose_name='Шард БД'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='shard',
+            field=models.CharField(db_index=True, default=customers.sharding.default_shard, max_length=63, verbose_name='Шард БД'),
+        ),
+    ]
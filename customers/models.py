@@ -1,9 +1,15 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
 from django_tenants.models import TenantMixin, DomainMixin
+from django_tenants.utils import get_tenant_database_alias, schema_exists
 from django.db.models import Sum
 from django.utils import timezone
 
+from .sharding import default_shard
+
 class Client(TenantMixin):
     name = models.CharField(max_length=100)
     created_on = models.DateField(auto_now_add=True)
@@ -17,12 +23,46 @@ class Client(TenantMixin):
     subscription_end_date = models.DateField(null=True, blank=True)
     can_admin_delete_media = models.BooleanField(default=False, verbose_name='Разрешить админу удалять медиа')
 
+    # Сжатие фотографий при загрузке (media_app/ingest.py)
+    IMAGE_FORMAT_CHOICES = [
+        ('WEBP', 'WebP'),
+        ('JPEG', 'JPEG'),
+    ]
+    image_transcode_enabled = models.BooleanField(default=False, verbose_name='Сжимать фотографии при загрузке')
+    image_transcode_format = models.CharField(max_length=10, choices=IMAGE_FORMAT_CHOICES, default='WEBP', verbose_name='Формат сжатых фотографий')
+    image_max_dimension = models.PositiveIntegerField(default=2560, verbose_name='Максимальная сторона фотографии (px)')
+    image_quality = models.PositiveSmallIntegerField(default=80, verbose_name='Качество сжатия (1-100)')
+    keep_original_images = models.BooleanField(default=False, verbose_name='Хранить оригиналы фотографий')
+
+    # База со схемой организации (customers/sharding.py); меняется командой move_tenant
+    shard = models.CharField(max_length=63, default=default_shard, db_index=True, verbose_name='Шард БД')
+
     auto_create_schema = True
     auto_drop_schema = True
 
     def __str__(self):
         return self.name
 
+    def create_schema(self, check_if_exists=False, sync_schema=True, verbosity=1):
+        if self.shard != get_tenant_database_alias():
+            # Шаблонная схема есть только в default
+            from .sharding import create_shard_schema
+            return create_shard_schema(self, check_if_exists, sync_schema, verbosity)
+        # Быстрый путь: копия смигрированной шаблонной схемы (customers/provisioning.py)
+        if sync_schema and not (check_if_exists and schema_exists(self.schema_name)):
+            from .provisioning import clone_from_template
+            if clone_from_template(self.schema_name):
+                return True
+        return super().create_schema(check_if_exists, sync_schema, verbosity)
+
+    def _drop_schema(self, force_drop=False):
+        if self.shard == get_tenant_database_alias():
+            return super()._drop_schema(force_drop)
+        if (self.auto_drop_schema or force_drop) and schema_exists(self.schema_name, self.shard):
+            from .backups import drop_schema
+            self.pre_drop()
+            drop_schema(self.schema_name, alias=self.shard)
+
 class Domain(DomainMixin):
     pass
 
@@ -78,6 +118,48 @@ class Payment(models.Model):
     def __str__(self):
         return f"{self.tenant.name if self.tenant else 'Unknown'} - {self.amount} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Платеж могли перенести на другую организацию: пересчитываются обе (customers/ledger.py)
+        instance._loaded_tenant_id = instance.__dict__.get('tenant_id')
+        return instance
+
+
+class PaymentSummary(models.Model):
+    """Итоги платежей организации; поддерживаются сигналами Payment (customers/ledger.py)"""
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='payment_summary')
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Всего оплачено')
+    payment_count = models.PositiveIntegerField(default=0)
+    first_payment_date = models.DateField(null=True, blank=True)
+    last_payment_date = models.DateField(null=True, blank=True, db_index=True, verbose_name='Последний платеж')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Итоги платежей'
+        verbose_name_plural = 'Итоги платежей'
+
+    def __str__(self):
+        return f"{self.client_id}: {self.total_paid}"
+
+
+class RevenueMonth(models.Model):
+    """Поступления от организации за календарный месяц (month — первое число)"""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='revenue_months')
+    month = models.DateField(db_index=True)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Выручка за месяц'
+        verbose_name_plural = 'Выручка по месяцам'
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'month'], name='revenue_month_client_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id} {self.month:%Y-%m}: {self.amount}"
+
 class MailSettings(models.Model):
     email_host = models.CharField(max_length=255, default='', blank=True, null=True)
     email_port = models.IntegerField(default=587)
@@ -114,3 +196,244 @@ class ContactMessage(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.email}"
+
+
+class PendingFileDeletion(models.Model):
+    """
+    Очередь удаления файлов тенантов. Запись добавляется в той же транзакции,
+    что и удаление данных, и обрабатывается после коммита (media_app/deletion.py).
+    Пустой name означает весь каталог тенанта.
+    """
+    schema_name = models.CharField(max_length=63, db_index=True)
+    name = models.CharField(max_length=255, blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Файл к удалению'
+        verbose_name_plural = 'Очередь удаления файлов'
+
+    def __str__(self):
+        return f"{self.schema_name}/{self.name or '*'}"
+
+
+class TenantStats(models.Model):
+    """
+    Сводные показатели организации для списка в панели суперпользователя.
+    Собираются одним запросом UNION ALL по схемам (customers/stats.py),
+    поэтому список не переключается в схему каждого тенанта.
+    """
+    client = models.OneToOneField(Client, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    user_count = models.PositiveIntegerField(default=0, verbose_name='Пользователей')
+    task_count = models.PositiveIntegerField(default=0, verbose_name='Задач')
+    media_bytes = models.BigIntegerField(default=0, verbose_name='Объем медиа (байт)')
+    last_activity = models.DateTimeField(null=True, blank=True, verbose_name='Последняя активность')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Статистика организации'
+        verbose_name_plural = 'Статистика организаций'
+
+    def __str__(self):
+        return f"{self.client_id}: {self.user_count} / {self.task_count}"
+
+
+class TenantUsageSample(models.Model):
+    """
+    Замер потребления ресурсов организацией. Записывается командой
+    collect_tenant_metering по расписанию (customers/metering.py); панель
+    суперпользователя читает последние замеры, а не системные каталоги.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='usage_samples')
+    collected_at = models.DateTimeField(db_index=True, verbose_name='Время замера')
+    db_bytes = models.BigIntegerField(default=0, verbose_name='Размер схемы (байт)')
+    row_estimate = models.BigIntegerField(default=0, verbose_name='Записей (оценка)')
+    media_bytes = models.BigIntegerField(default=0, verbose_name='Объем медиа (байт)')
+    request_count = models.PositiveIntegerField(default=0, verbose_name='Запросов с прошлого замера')
+
+    class Meta:
+        verbose_name = 'Замер потребления'
+        verbose_name_plural = 'Замеры потребления'
+        indexes = [
+            models.Index(fields=['client', '-collected_at'], name='usage_client_collected_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id} @ {self.collected_at:%Y-%m-%d %H:%M}"
+
+
+class TenantAdmin(models.Model):
+    """
+    Справочник администраторов всех тенантов в публичной схеме.
+    Копия TenantUser с ролью ADMIN, синхронизируется сигналами
+    (customers/admin_directory.py), пересобирается командой rebuild_admin_directory.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='admins')
+    user_id = models.BigIntegerField(verbose_name='ID пользователя в схеме тенанта')
+    username = models.CharField(max_length=150)
+    email = models.EmailField(blank=True)
+    first_name = models.CharField(max_length=150, blank=True)
+    last_name = models.CharField(max_length=150, blank=True)
+    is_active = models.BooleanField(default=True)
+    last_login = models.DateTimeField(null=True, blank=True)
+    # Логин, имя и email в нижнем регистре: поиск по подстроке через триграммный индекс
+    search_text = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Администратор организации'
+        verbose_name_plural = 'Администраторы организаций'
+        constraints = [
+            models.UniqueConstraint(fields=['client', 'user_id'], name='tenant_admin_client_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['username'], name='tenant_admin_username_idx'),
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='tenant_admin_search_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.username} ({self.client_id})"
+
+    def get_full_name(self):
+        full_name = f"{self.first_name} {self.last_name}".strip()
+        return full_name or self.username
+
+
+class TenantProvisioning(models.Model):
+    """
+    Заявка на создание организации. Регистрация только сохраняет заявку и
+    сразу отвечает 202; схема, домен и администратор создаются в фоне
+    (customers/provisioning.py), страница регистрации опрашивает статус.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'В очереди'),
+        ('RUNNING', 'Создается'),
+        ('READY', 'Готово'),
+        ('FAILED', 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    error = models.TextField(blank=True, default='')
+
+    company_name = models.CharField(max_length=100)
+    schema_name = models.CharField(max_length=63, db_index=True)
+    domain = models.CharField(max_length=253)
+    tenant_url = models.CharField(max_length=300)
+    phone = models.CharField(max_length=20)
+    telegram = models.CharField(max_length=100, blank=True, default='')
+    email = models.EmailField(blank=True, default='')
+    contact_person = models.CharField(max_length=255, blank=True, default='')
+    subscription_plan = models.ForeignKey('SubscriptionPlan', on_delete=models.SET_NULL, null=True, blank=True)
+    admin_username = models.CharField(max_length=150)
+    admin_email = models.EmailField()
+    # Только хэш; очищается после создания администратора
+    admin_password_hash = models.CharField(max_length=255, blank=True, default='')
+
+    client = models.OneToOneField(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='provisioning')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Заявка на создание организации'
+        verbose_name_plural = 'Заявки на создание организаций'
+
+    def __str__(self):
+        return f"{self.schema_name} ({self.status})"
+
+
+class BackupJob(models.Model):
+    """
+    Резервная копия базы или одной схемы. pg_dump выполняется в фоне
+    (customers/backups.py), страница обслуживания БД опрашивает прогресс.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'В очереди'),
+        ('RUNNING', 'Выполняется'),
+        ('READY', 'Готово'),
+        ('FAILED', 'Ошибка'),
+    ]
+    FORMAT_CHOICES = [
+        ('custom', 'Архив pg_dump (-Fc)'),
+        ('directory', 'Каталог pg_dump (-Fd)'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    error = models.TextField(blank=True, default='')
+    # Пустая схема — полный дамп базы
+    schema_name = models.CharField(max_length=63, blank=True, default='', db_index=True)
+    client = models.ForeignKey(Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='backups')
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default='custom')
+    # Имя файла или каталога в BACKUP_DIR
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0, verbose_name='Размер (байт)')
+    tables_total = models.PositiveIntegerField(default=0)
+    tables_done = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Резервная копия'
+        verbose_name_plural = 'Резервные копии'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+    @property
+    def is_full(self):
+        return not self.schema_name
+
+    @property
+    def progress(self):
+        if self.status == 'READY':
+            return 100
+        if not self.tables_total:
+            return 0
+        return min(99, self.tables_done * 100 // self.tables_total)
+
+
+class RestoreJob(models.Model):
+    """
+    Восстановление схемы организации из ее резервной копии. Схема
+    собирается рядом под временным именем и подменяет текущую
+    переименованием (customers/backups.py), другие организации не затрагиваются.
+    """
+    STATUS_CHOICES = BackupJob.STATUS_CHOICES
+    STAGE_CHOICES = [
+        ('restore', 'Распаковка архива'),
+        ('copy', 'Загрузка в основную базу'),
+        ('swap', 'Подмена схемы'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    backup = models.ForeignKey(BackupJob, on_delete=models.SET_NULL, null=True, related_name='restores')
+    schema_name = models.CharField(max_length=63, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Восстановление из копии'
+        verbose_name_plural = 'Восстановления из копий'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.schema_name} ({self.status})"
+
+    @property
+    def suffix(self):
+        return self.pk.hex[:8]
+
+    @property
+    def staging_schema(self):
+        return f"{self.schema_name[:44]}__restore_{self.suffix}"
+
+    @property
+    def old_schema(self):
+        return f"{self.schema_name[:48]}__old_{self.suffix}"
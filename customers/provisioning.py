@@ -0,0 +1,144 @@
+"""
+Быстрое создание схемы нового тенанта копированием шаблонной схемы.
+
+Обычно django-tenants создает пустую схему и прогоняет в ней все миграции
+прямо в запросе регистрации. При заданном TENANT_TEMPLATE_SCHEMA схема
+копируется SQL-функцией clone_schema из заранее смигрированного шаблона
+вместе с таблицей django_migrations.
+
+Шаблон используется, только если в нем применены все миграции проекта;
+иначе (например, после деплоя забыли обновить шаблон) схема создается
+обычным способом. Шаблон создается и обновляется командой
+prepare_tenant_template, ее нужно запускать после migrate_schemas.
+
+Регистрация не ждет создания схемы: заявка (TenantProvisioning)
+выполняется в фоне функцией provision_tenant, а зависшие после
+перезапуска процесса заявки доделывает команда provision_pending_tenants.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.utils import timezone
+from django_tenants.clone import CloneSchema
+from django_tenants.utils import schema_exists
+
+logger = logging.getLogger(__name__)
+
+_expected_migrations = None
+
+
+def get_template_schema():
+    return getattr(settings, 'TENANT_TEMPLATE_SCHEMA', '')
+
+
+def expected_migrations():
+    """Все миграции проекта на диске; в процессе они не меняются"""
+    global _expected_migrations
+    if _expected_migrations is None:
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        _expected_migrations = set(loader.graph.nodes)
+    return _expected_migrations
+
+
+def missing_migrations(schema_name, alias=DEFAULT_DB_ALIAS):
+    """Миграции, не примененные в схеме (None — схемы или таблицы миграций нет)"""
+    if not schema_exists(schema_name, alias):
+        return None
+    db = connections[alias]
+    qn = db.ops.quote_name
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = %s AND table_name = 'django_migrations'",
+            [schema_name],
+        )
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(f'SELECT app, name FROM {qn(schema_name)}.django_migrations')
+        applied = set(cursor.fetchall())
+    return expected_migrations() - applied
+
+
+def clone_from_template(schema_name):
+    """Создает схему копией шаблона. False — шаблон не настроен или устарел."""
+    template = get_template_schema()
+    if not template:
+        return False
+    missing = missing_migrations(template)
+    if missing is None:
+        logger.warning('Tenant template schema %s does not exist, migrating %s from scratch', template, schema_name)
+        return False
+    if missing:
+        logger.warning(
+            'Tenant template schema %s is missing %d migrations (%s), migrating %s from scratch',
+            template, len(missing), ', '.join(sorted(f'{app}.{name}' for app, name in missing)[:5]), schema_name,
+        )
+        return False
+
+    CloneSchema().clone_schema(template, schema_name)
+    connection.set_schema_to_public()
+    return True
+
+
+def schedule_provisioning(job):
+    from config.background import run_in_background
+    run_in_background(provision_tenant, job.pk, dedupe_key=f'provision:{job.pk}')
+
+
+def provision_tenant(job_id):
+    """Создает организацию, домен и администратора по заявке. Повторный вызов безопасен."""
+    from users_app.models import TenantUser
+    from django_tenants.utils import tenant_context
+    from .models import Client, Domain, TenantProvisioning
+    from .sharding import default_shard
+
+    with transaction.atomic():
+        job = TenantProvisioning.objects.select_for_update(skip_locked=True) \
+            .filter(pk=job_id, status__in=['PENDING', 'RUNNING']).first()
+        if job is None:
+            return
+        job.status = 'RUNNING'
+        job.save(update_fields=['status', 'updated_at'])
+
+    try:
+        # DDL в PostgreSQL транзакционна: при ошибке схема откатывается вместе с Client.
+        # Схема в другом шарде (customers/sharding.py) создается во вложенной транзакции его базы
+        with transaction.atomic(), transaction.atomic(using=default_shard()):
+            client = Client.objects.create(
+                name=job.company_name,
+                schema_name=job.schema_name,
+                phone=job.phone,
+                telegram=job.telegram,
+                email=job.email,
+                contact_person=job.contact_person,
+                subscription_plan_id=job.subscription_plan_id,
+            )
+            Domain.objects.create(domain=job.domain, tenant=client, is_primary=True)
+            with tenant_context(client):
+                TenantUser.objects.create(
+                    username=job.admin_username,
+                    email=job.admin_email,
+                    password_hash=job.admin_password_hash,
+                    role='ADMIN',
+                    is_active=True,
+                )
+            TenantProvisioning.objects.filter(pk=job.pk).update(
+                status='READY', client=client, admin_password_hash='', error='', updated_at=timezone.now(),
+            )
+    except Exception as e:
+        logger.exception('Failed to provision tenant %s', job.schema_name)
+        TenantProvisioning.objects.filter(pk=job.pk, status='RUNNING').update(
+            status='FAILED', error=str(e), admin_password_hash='', updated_at=timezone.now(),
+        )
+    finally:
+        connection.set_schema_to_public()
+
+
+def stale_provisioning_jobs(running_minutes=10):
+    """Заявки, потерянные при перезапуске процесса: в очереди или «создаются» слишком долго"""
+    from .models import TenantProvisioning
+    threshold = timezone.now() - timedelta(minutes=running_minutes)
+    return TenantProvisioning.objects.filter(status='PENDING', created_at__lt=threshold) | \
+        TenantProvisioning.objects.filter(status='RUNNING', updated_at__lt=threshold)
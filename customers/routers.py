@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import connections
+from django_tenants.routers import TenantSyncRouter
+from django_tenants.utils import get_public_schema_name, get_tenant_database_alias
+
+from .sharding import shard_aliases, tenant_connection, tenant_db_alias
+
+
+class TenantShardRouter(TenantSyncRouter):
+    """
+    Модели TENANT_APPS читаются и пишутся в базе шарда текущей организации
+    (customers/sharding.py), общие приложения — только в default.
+    """
+
+    def _db_for_model(self, model, instance=None):
+        if not self.app_in_list(model._meta.app_label, settings.TENANT_APPS):
+            return None
+        alias = tenant_db_alias()
+        # Загруженный объект сохраняется туда, откуда прочитан (например, в миграциях шарда)
+        if instance is not None and instance._state.db and instance._state.db != alias:
+            return instance._state.db
+        if alias == get_tenant_database_alias():
+            return None
+        tenant_connection(alias)
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_model(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_model(model, hints.get('instance'))
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_tenant_database_alias() or db not in shard_aliases():
+            return super().allow_migrate(db, app_label, model_name, **hints)
+        # В публичной схеме остальных шардов — только очередь удаления файлов:
+        # она пишется в одной транзакции с данными тенанта (media_app/deletion.py)
+        if connections[db].schema_name == get_public_schema_name():
+            return app_label == 'customers' and model_name == 'pendingfiledeletion'
+        if not self.app_in_list(app_label, settings.TENANT_APPS):
+            return False
+        return None
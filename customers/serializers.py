@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from customers.models import Client
+from customers.models import Client, TenantProvisioning
 
 class TenantRegistrationSerializer(serializers.Serializer):
     """
@@ -19,6 +19,9 @@ class TenantRegistrationSerializer(serializers.Serializer):
     def validate_subdomain(self, value):
         if Client.objects.filter(schema_name=value).exists():
             raise serializers.ValidationError("Subdomain already exists.")
+        # Организация с таким поддоменом может еще создаваться в фоне
+        if TenantProvisioning.objects.filter(schema_name=value, status__in=['PENDING', 'RUNNING']).exists():
+            raise serializers.ValidationError("Subdomain already exists.")
         if value in ['public', 'www', 'admin']:
             raise serializers.ValidationError("Invalid subdomain.")
         return value
@@ -0,0 +1,295 @@
+"""
+Размещение схем организаций в нескольких базах PostgreSQL (шардах).
+
+Публичная схема (Client, Domain, платежи и т.д.) всегда в базе default.
+Схема организации находится в базе Client.shard — одном из алиасов
+settings.TENANT_SHARDS (DATABASES задаются переменной DB_SHARDS). Запросы
+моделей TENANT_APPS направляет туда customers.routers.TenantShardRouter;
+пока шард один, все работает как раньше, без лишних запросов.
+
+Транзакции и select_for_update по данным тенанта открываются через
+tenant_atomic(): transaction.atomic() без using относится к default.
+
+migrate_schemas --database <алиас> мигрирует только организации этого
+шарда (GET_EXECUTOR_FUNCTION = get_shard_executor), все шарды по очереди —
+команда migrate_shards. В публичной схеме шарда создается только таблица
+очереди удаления файлов (PendingFileDeletion).
+
+Перенос организации в другой шард без остановки (move_tenant, команда
+move_tenant) идет логической репликацией PostgreSQL:
+    1. структура схемы переносится pg_dump --schema-only / pg_restore;
+    2. источник публикует таблицы схемы (CREATE PUBLICATION ... FOR TABLES
+       IN SCHEMA, PostgreSQL 15+), шард-получатель подписывается и копирует
+       данные, пока организация продолжает работать;
+    3. на время переключения организация отключается (is_active), после
+       паузы на завершение начатых запросов ждем, пока подписка догонит
+       текущую позицию WAL источника, и переносим значения sequence;
+    4. Client.shard переключается, организация снова включена, подписка и
+       публикация удаляются.
+Нужны wal_level = logical на источнике и права на CREATE PUBLICATION /
+CREATE SUBSCRIPTION; получатель подключается к источнику по адресу из
+DATABASES. Медиа-файлы общие для всех шардов и не переносятся.
+"""
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django_tenants.utils import get_public_schema_name, get_tenant_database_alias
+
+logger = logging.getLogger(__name__)
+
+_schema_shards = {}
+_schema_shards_version = None
+
+
+def shard_aliases():
+    return list(getattr(settings, 'TENANT_SHARDS', None) or [get_tenant_database_alias()])
+
+
+def default_shard():
+    """Шард для новых организаций"""
+    return getattr(settings, 'TENANT_DEFAULT_SHARD', None) or get_tenant_database_alias()
+
+
+def shard_for_schema(schema_name):
+    """Шард схемы по Client; кэш процесса сбрасывается вместе с кэшем тенантов"""
+    global _schema_shards_version
+    default = get_tenant_database_alias()
+    if len(shard_aliases()) == 1:
+        return default
+
+    from .models import Client
+    from .tenant_cache import get_tenant_cache_version
+    version = get_tenant_cache_version()
+    if version != _schema_shards_version:
+        _schema_shards.clear()
+        _schema_shards_version = version
+    if schema_name not in _schema_shards:
+        shard = Client.objects.using(default).filter(schema_name=schema_name) \
+            .values_list('shard', flat=True).first()
+        _schema_shards[schema_name] = shard or default
+    return _schema_shards[schema_name]
+
+
+def tenant_db_alias():
+    """База схемы, в которой сейчас выполняется код (публичная — default)"""
+    default = get_tenant_database_alias()
+    tenant = getattr(connections[default], 'tenant', None)
+    if tenant is None or tenant.schema_name == get_public_schema_name():
+        return default
+    # Client из запроса знает свой шард, FakeTenant из schema_context — нет
+    return getattr(tenant, 'shard', None) or shard_for_schema(tenant.schema_name)
+
+
+def tenant_connection(alias=None):
+    """Соединение шарда, переключенное на схему текущего тенанта"""
+    default = get_tenant_database_alias()
+    alias = alias or tenant_db_alias()
+    connection = connections[alias]
+    if alias != default:
+        tenant = connections[default].tenant
+        if connection.schema_name != tenant.schema_name:
+            connection.set_tenant(tenant)
+    return connection
+
+
+def tenant_atomic(**kwargs):
+    return transaction.atomic(using=tenant_db_alias(), **kwargs)
+
+
+def schemas_by_shard(clients):
+    """{шард: {схема: id организации}} для queryset организаций"""
+    result = {}
+    for schema_name, client_id, shard in clients.values_list('schema_name', 'id', 'shard'):
+        result.setdefault(shard, {})[schema_name] = client_id
+    return result
+
+
+def create_shard_schema(client, check_if_exists=False, sync_schema=True, verbosity=1):
+    """TenantMixin.create_schema для организации не в default: пустая схема и миграции в ее шарде"""
+    from django.core.management import call_command
+    from django_tenants.utils import schema_exists
+
+    connection = connections[client.shard]
+    if check_if_exists and schema_exists(client.schema_name, client.shard):
+        return False
+    if sync_schema:
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA {connection.ops.quote_name(client.schema_name)}')
+        call_command(
+            'migrate_schemas', tenant=True, schema_name=client.schema_name, database=client.shard,
+            interactive=False, verbosity=verbosity,
+        )
+    connection.set_schema_to_public()
+    return True
+
+
+def get_shard_executor(codename=None):
+    """Исполнитель migrate_schemas, пропускающий организации других шардов"""
+    from django_tenants.migration_executors import get_executor
+    base = get_executor(codename)
+
+    class ShardExecutor(base):
+        def run_migrations(self, tenants=None):
+            return super().run_migrations(shard_tenants(self.options.get('database'), tenants))
+
+    return ShardExecutor
+
+
+def shard_tenants(alias, schema_names):
+    from .models import Client
+    default = get_tenant_database_alias()
+    alias = alias or default
+    other = set(Client.objects.using(default).exclude(shard=alias).values_list('schema_name', flat=True))
+    # Публичная схема мигрирует во всех шардах, роутер оставляет в остальных только очередь удаления.
+    # Схемы без организации (временная схема восстановления) мигрируют в указанной базе
+    return [name for name in (schema_names or []) if name not in other]
+
+
+def replication_name(schema_name):
+    """Имя публикации, подписки и слота: только a-z, 0-9 и _"""
+    return re.sub(r'[^a-z0-9_]', '_', f'move_{schema_name}'.lower())[:63]
+
+
+def replication_conninfo(alias):
+    """Строка подключения к шарду alias для подписки на другом сервере"""
+    db = settings.DATABASES[alias]
+    params = {
+        'host': db.get('HOST') or 'localhost',
+        'port': db.get('PORT') or 5432,
+        'dbname': db['NAME'],
+        'user': db['USER'],
+        'password': db.get('PASSWORD'),
+    }
+
+    def quote(value):
+        return "'" + str(value).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+    return ' '.join(f'{key}={quote(value)}' for key, value in params.items() if value)
+
+
+def drain_seconds():
+    """Пауза на завершение начатых запросов; при LocMemCache — до истечения кэша тенантов"""
+    if 'LocMemCache' in settings.CACHES['default']['BACKEND']:
+        return getattr(settings, 'TENANT_CACHE_TIMEOUT', 60) + 1
+    return 5
+
+
+def wait_for(check, timeout, what):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f'Не дождались: {what} ({timeout} с)')
+        time.sleep(1)
+
+
+def fetch_one(alias, sql, params=None):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+
+
+def execute(alias, sql, params=None):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def copy_sequences(source, target, schema_name):
+    """Логическая репликация не переносит значения sequence"""
+    qn = connections[target].ops.quote_name
+    with connections[source].cursor() as cursor:
+        cursor.execute(
+            'SELECT sequencename, last_value FROM pg_sequences WHERE schemaname = %s AND last_value IS NOT NULL',
+            [schema_name],
+        )
+        values = cursor.fetchall()
+    with connections[target].cursor() as cursor:
+        for name, last_value in values:
+            cursor.execute('SELECT setval(%s::regclass, %s, true)', [f'{qn(schema_name)}.{qn(name)}', last_value])
+    return len(values)
+
+
+def drop_replication(source, target, name):
+    execute(target, f'DROP SUBSCRIPTION IF EXISTS {connections[target].ops.quote_name(name)}')
+    execute(source, f'DROP PUBLICATION IF EXISTS {connections[source].ops.quote_name(name)}')
+
+
+def move_tenant(client, target, drop_source=False, timeout=3600, drain=None, log=logger.info):
+    """Переносит схему организации в шард target (см. описание модуля)"""
+    from django_tenants.utils import schema_exists
+    from .backups import drop_schema, pg_connection_args, run_pg_tool
+    from .models import Client
+    from .tenant_cache import bump_tenant_cache_version
+
+    source, schema_name = client.shard, client.schema_name
+    if target not in shard_aliases():
+        raise ValueError(f'Неизвестный шард {target}; доступны: {", ".join(shard_aliases())}')
+    if target == source:
+        raise ValueError(f'Организация уже в шарде {target}')
+    if schema_exists(schema_name, target):
+        raise ValueError(f'В шарде {target} уже есть схема {schema_name}')
+
+    name = replication_name(schema_name)
+    qn = connections[source].ops.quote_name
+    workdir = tempfile.mkdtemp(prefix=f'{name}_')
+    was_active = client.is_active
+    frozen = switched = False
+    try:
+        log('Перенос структуры схемы')
+        dump = os.path.join(workdir, 'schema.dump')
+        run_pg_tool('pg_dump', [*pg_connection_args(alias=source), '-Fc', '--schema-only', '-n', schema_name, '-f', dump], alias=source)
+        run_pg_tool('pg_restore', [*pg_connection_args(alias=target), '--no-owner', '--exit-on-error', dump], alias=target)
+
+        log('Начальное копирование данных')
+        execute(source, f'CREATE PUBLICATION {qn(name)} FOR TABLES IN SCHEMA {qn(schema_name)}')
+        execute(target, f'CREATE SUBSCRIPTION {qn(name)} CONNECTION %s PUBLICATION {qn(name)}', [replication_conninfo(source)])
+        wait_for(lambda: fetch_one(target, """
+            SELECT COUNT(*) > 0 AND bool_and(r.srsubstate = 'r')
+            FROM pg_subscription_rel r JOIN pg_subscription s ON s.oid = r.srsubid
+            WHERE s.subname = %s
+            """, [name])[0], timeout, 'начальное копирование')
+
+        drain = drain_seconds() if drain is None else drain
+        log(f'Переключение: организация отключена, ожидание {drain} с')
+        Client.objects.filter(pk=client.pk).update(is_active=False)
+        bump_tenant_cache_version()
+        frozen = True
+        time.sleep(drain)
+
+        lsn = fetch_one(source, 'SELECT pg_current_wal_lsn()')[0]
+        # confirmed_flush_lsn слота — позиция, до которой получатель применил изменения
+        wait_for(lambda: fetch_one(source, """
+            SELECT COALESCE(bool_and(confirmed_flush_lsn >= %s::pg_lsn), false)
+            FROM pg_replication_slots WHERE slot_name = %s
+            """, [lsn, name])[0], timeout, 'применение последних изменений')
+        sequences = copy_sequences(source, target, schema_name)
+
+        Client.objects.filter(pk=client.pk).update(shard=target, is_active=was_active)
+        bump_tenant_cache_version()
+        switched = True
+        log(f'Организация переключена на {target} (sequence: {sequences})')
+    except BaseException:
+        # BaseException: и при Ctrl+C организация не остается отключенной
+        if not switched:
+            if frozen:
+                Client.objects.filter(pk=client.pk).update(is_active=was_active)
+                bump_tenant_cache_version()
+            try:
+                drop_replication(source, target, name)
+                drop_schema(schema_name, alias=target)
+            except Exception:
+                logger.exception('Cleanup after failed move of %s to %s failed', schema_name, target)
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    client.shard, client.is_active = target, was_active
+    drop_replication(source, target, name)
+    if drop_source:
+        drop_schema(schema_name, alias=source)
+        log(f'Схема удалена из {source}')
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender='users_app.TenantUser')
+@receiver(post_delete, sender='users_app.TenantUser')
+@receiver(post_save, sender='tasks.Task')
+@receiver(post_delete, sender='tasks.Task')
+@receiver(post_save, sender='media_app.Media')
+@receiver(post_delete, sender='media_app.Media')
+def refresh_tenant_stats(sender, **kwargs):
+    """Статистика в списке организаций обновляется в фоне, повторные изменения склеиваются"""
+    from .stats import schedule_stats_refresh
+    schedule_stats_refresh()
+
+
+@receiver(post_save, sender='users_app.TenantUser')
+def sync_admin_directory(sender, instance, **kwargs):
+    """Справочник администраторов в публичной схеме (customers/admin_directory.py)"""
+    from .admin_directory import sync_tenant_admin
+    sync_tenant_admin(instance)
+
+
+@receiver(post_delete, sender='users_app.TenantUser')
+def remove_from_admin_directory(sender, instance, **kwargs):
+    from .admin_directory import remove_tenant_admin
+    remove_tenant_admin(instance)
+
+
+@receiver(post_save, sender='customers.Client')
+@receiver(post_delete, sender='customers.Client')
+@receiver(post_save, sender='customers.Domain')
+@receiver(post_delete, sender='customers.Domain')
+@receiver(post_save, sender='customers.SubscriptionPlan')
+@receiver(post_delete, sender='customers.SubscriptionPlan')
+def invalidate_tenant_cache(sender, **kwargs):
+    """Статус, подписка и домены организаций кэшируются в процессах (customers/tenant_cache.py)"""
+    from .tenant_cache import bump_tenant_cache_version
+    bump_tenant_cache_version()
+
+
+@receiver(post_save, sender='customers.Payment')
+@receiver(post_delete, sender='customers.Payment')
+def refresh_payment_ledger(sender, instance, **kwargs):
+    """Итоги и помесячная выручка организации (customers/ledger.py)"""
+    from .ledger import refresh_client_ledger
+    refresh_client_ledger(instance.tenant_id)
+    previous = getattr(instance, '_loaded_tenant_id', None)
+    if previous != instance.tenant_id:
+        refresh_client_ledger(previous)
+    instance._loaded_tenant_id = instance.tenant_id
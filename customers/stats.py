@@ -0,0 +1,103 @@
+"""
+Сбор TenantStats по всем схемам без переключения search_path.
+
+Для каждой схемы строится подзапрос с явно указанной схемой
+("<schema>"."tasks_task" и т.п.), подзапросы объединяются через UNION ALL
+пачками по STATS_BATCH_SIZE схем. Результат записывается одним upsert.
+
+Схемы каждого шарда (customers/sharding.py) опрашиваются в базе этого шарда.
+
+Сбор запускается командой collect_tenant_stats (по расписанию), а по одной
+схеме — в фоне после изменения пользователей, задач и медиа (customers/signals.py).
+"""
+from django.db import connection, connections
+
+from .models import Client, TenantStats
+from .sharding import schemas_by_shard
+
+STATS_BATCH_SIZE = 200
+
+
+def _stats_tables():
+    from media_app.models import Media, MediaBlob
+    from tasks.models import Task
+    from users_app.models import TenantUser
+    return {
+        'user': TenantUser._meta.db_table,
+        'task': Task._meta.db_table,
+        'media': Media._meta.db_table,
+        'blob': MediaBlob._meta.db_table,
+    }
+
+
+def migrated_schemas(schema_names, tables, using='default'):
+    """Схемы, в которых есть все нужные таблицы (новая схема может быть еще не смигрирована)"""
+    if not schema_names:
+        return set()
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT table_schema FROM information_schema.tables
+            WHERE table_schema = ANY(%s) AND table_name = ANY(%s)
+            GROUP BY table_schema HAVING COUNT(DISTINCT table_name) = %s
+            """,
+            [list(schema_names), list(tables.values()), len(tables)],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _schema_select(schema_name, tables):
+    qn = connection.ops.quote_name
+    t = {key: f'{qn(schema_name)}.{qn(table)}' for key, table in tables.items()}
+    # Место считается как в media_app.blobs.get_storage_used: содержимое по хэшу один раз
+    return f"""
+        SELECT %s::bigint,
+            (SELECT COUNT(*) FROM {t['user']}),
+            (SELECT COUNT(*) FROM {t['task']}),
+            (SELECT COALESCE(SUM(size), 0) FROM {t['blob']})
+                + (SELECT COALESCE(SUM(file_size), 0) FROM {t['media']} WHERE blob_id IS NULL),
+            GREATEST(
+                (SELECT MAX(updated_at) FROM {t['task']}),
+                (SELECT MAX(uploaded_at) FROM {t['media']}),
+                (SELECT MAX(last_login) FROM {t['user']})
+            )"""
+
+
+def collect_tenant_stats(clients=None):
+    """Обновляет TenantStats для clients (по умолчанию — всех организаций). Возвращает число строк."""
+    if clients is None:
+        clients = Client.objects.exclude(schema_name='public')
+    tables = _stats_tables()
+
+    rows = []
+    for shard, schemas in schemas_by_shard(clients).items():
+        schema_names = sorted(migrated_schemas(schemas, tables, shard))
+        for start in range(0, len(schema_names), STATS_BATCH_SIZE):
+            batch = schema_names[start:start + STATS_BATCH_SIZE]
+            sql = '\nUNION ALL\n'.join(_schema_select(schema_name, tables) for schema_name in batch)
+            with connections[shard].cursor() as cursor:
+                cursor.execute(sql, [schemas[schema_name] for schema_name in batch])
+                rows.extend(cursor.fetchall())
+
+    stats = [
+        TenantStats(client_id=client_id, user_count=users, task_count=tasks, media_bytes=media_bytes, last_activity=last_activity)
+        for client_id, users, tasks, media_bytes, last_activity in rows
+    ]
+    TenantStats.objects.bulk_create(
+        stats, update_conflicts=True, unique_fields=['client'],
+        update_fields=['user_count', 'task_count', 'media_bytes', 'last_activity', 'updated_at'],
+    )
+    return len(stats)
+
+
+def refresh_current_tenant_stats():
+    """Обновление статистики тенанта, в схеме которого выполняется код"""
+    collect_tenant_stats(Client.objects.filter(schema_name=connection.schema_name))
+
+
+def schedule_stats_refresh():
+    from config.background import run_in_background
+    schema_name = getattr(connection, 'schema_name', 'public')
+    if schema_name == 'public':
+        return
+    run_in_background(refresh_current_tenant_stats, dedupe_key=f'tenant-stats:{schema_name}')
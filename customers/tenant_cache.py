@@ -0,0 +1,112 @@
+"""
+Кэш определения тенанта по имени хоста в памяти процесса.
+
+TenantMainMiddleware на каждый запрос читает Domain и Client из публичной
+схемы. Здесь результат (организация с тарифом и список ее доменов)
+хранится в ограниченном LRU-кэше процесса (TENANT_CACHE_SIZE записей,
+не дольше TENANT_CACHE_TIMEOUT секунд).
+
+Сохранение/удаление Client, Domain и SubscriptionPlan увеличивает версию в
+общем кэше Django (customers/signals.py); процесс, увидевший новую версию,
+очищает свой кэш. Массовые update() сигналов не вызывают — после них нужно
+вызвать bump_tenant_cache_version(). При LocMemCache версия видна только
+своему процессу, и другие воркеры узнают об изменении по истечении таймаута.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'tenant_cache:ver'
+
+
+def get_tenant_cache_version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def bump_tenant_cache_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+class TenantCache:
+    """Потокобезопасный LRU: имя хоста -> (организация или None, домены, срок)"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get_size(self):
+        return getattr(settings, 'TENANT_CACHE_SIZE', 1024)
+
+    def get_timeout(self):
+        return getattr(settings, 'TENANT_CACHE_TIMEOUT', 60)
+
+    def check_version(self):
+        version = get_tenant_cache_version()
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+    def get(self, hostname, loader):
+        """
+        Организация для hostname (копия, ее можно менять в запросе) или None.
+        loader(hostname) -> (Client или None, список Domain) вызывается при промахе.
+        """
+        self.check_version()
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(hostname)
+            if entry is not None and entry[2] > now:
+                self.entries.move_to_end(hostname)
+            else:
+                entry = None
+
+        if entry is None:
+            version = self.version
+            tenant, domains = loader(hostname)
+            entry = (tenant, tuple(domains), now + self.get_timeout())
+            with self.lock:
+                # Версия могла смениться, пока шел запрос к базе: такой результат не сохраняем
+                if version == self.version:
+                    self.entries[hostname] = entry
+                    self.entries.move_to_end(hostname)
+                    while len(self.entries) > self.get_size():
+                        self.entries.popitem(last=False)
+
+        tenant, domains, _ = entry
+        if tenant is None:
+            return None
+        tenant = copy.copy(tenant)
+        tenant.cached_domains = domains
+        return tenant
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+tenant_cache = TenantCache()
+
+
+def load_tenant(hostname):
+    from .models import Domain
+    domain = Domain.objects.select_related('tenant', 'tenant__subscription_plan').filter(domain=hostname).first()
+    if domain is None:
+        return None, []
+    return domain.tenant, list(Domain.objects.filter(tenant_id=domain.tenant_id))
+
+
+def get_tenant_domains(tenant):
+    """Домены организации: из кэша, если она получена через CachedTenantMainMiddleware"""
+    domains = getattr(tenant, 'cached_domains', None)
+    if domains is not None:
+        return list(domains)
+    return list(tenant.domains.all())
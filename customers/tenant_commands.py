@@ -0,0 +1,201 @@
+"""
+Основа для management-команд, выполняющих работу в каждой схеме тенанта.
+
+    class Command(TenantCommand):
+        def handle_tenant(self, client, **options):
+            ...                      # выполняется внутри schema_context(client.schema_name)
+            return {'created': 3}    # счетчики суммируются в итоговом отчете
+
+Общие параметры:
+    --tenants acme,demo*   только указанные схемы (допускаются шаблоны fnmatch)
+    --workers N            число процессов; у каждого свое соединение с БД
+    --timeout S            ограничение времени на одного тенанта (секунды)
+    --checkpoint FILE      файл с обработанными схемами: после сбоя повторный
+                           запуск продолжит с необработанных; после успешного
+                           прохода файл удаляется
+    --restart              игнорировать существующий checkpoint
+"""
+import importlib
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from fnmatch import fnmatch
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django_tenants.utils import schema_context
+
+# Параметры, которые нельзя или не нужно передавать в дочерние процессы
+RUNNER_OPTIONS = {'stdout', 'stderr', 'tenants', 'workers', 'timeout', 'checkpoint', 'restart'}
+
+
+class TenantTimeout(Exception):
+    pass
+
+
+@contextmanager
+def time_limit(seconds):
+    """SIGALRM в основном потоке процесса; без SIGALRM (Windows) ограничение не действует"""
+    if not seconds or not hasattr(signal, 'SIGALRM'):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise TenantTimeout(f'превышено время {seconds} с')
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.alarm(int(seconds))
+    try:
+        yield
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def run_tenant(command_module, schema_name, options, timeout):
+    """
+    Выполняет handle_tenant одной схемы; вызывается в текущем или дочернем процессе.
+    Возвращает (схема, статус, счетчики, ошибка, секунды).
+    """
+    from .models import Client
+    from .sharding import tenant_connection
+    command = importlib.import_module(command_module).Command()
+    started = time.monotonic()
+    try:
+        client = Client.objects.get(schema_name=schema_name)
+        with time_limit(timeout), schema_context(schema_name):
+            # Данные тенанта — в базе его шарда (customers/sharding.py)
+            db = tenant_connection()
+            if timeout and db.vendor == 'postgresql':
+                # Сигнал не прервет запрос, ждущий ответа базы: ограничиваем и его
+                with db.cursor() as cursor:
+                    cursor.execute('SET statement_timeout = %s', [timeout * 1000])
+            try:
+                counters = command.handle_tenant(client, **options) or {}
+            finally:
+                if timeout and db.vendor == 'postgresql':
+                    with db.cursor() as cursor:
+                        cursor.execute('SET statement_timeout = 0')
+        status, error = 'ok', ''
+    except TenantTimeout as e:
+        counters, status, error = {}, 'timeout', str(e)
+    except Exception as e:
+        counters, status, error = {}, 'failed', f'{type(e).__name__}: {e}'
+    return schema_name, status, counters, error, time.monotonic() - started
+
+
+def _init_worker():
+    # При запуске через spawn/forkserver Django в дочернем процессе еще не настроен
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+class TenantCommand(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', help='Схемы через запятую, допускаются шаблоны (acme,demo*)')
+        parser.add_argument('--workers', type=int, default=1, help='Количество параллельных процессов')
+        parser.add_argument('--timeout', type=int, default=0, help='Ограничение времени на тенанта, секунды (0 — без ограничения)')
+        parser.add_argument('--checkpoint', help='Файл для продолжения после сбоя')
+        parser.add_argument('--restart', action='store_true', help='Начать заново, игнорируя checkpoint')
+        self.add_tenant_arguments(parser)
+
+    def add_tenant_arguments(self, parser):
+        """Собственные параметры команды"""
+
+    def handle_tenant(self, client, **options):
+        raise NotImplementedError
+
+    def get_clients(self, selector):
+        from .models import Client
+        clients = Client.objects.exclude(schema_name='public').order_by('schema_name')
+        if not selector:
+            return list(clients)
+        patterns = [p.strip() for p in selector.split(',') if p.strip()]
+        selected = [c for c in clients if any(fnmatch(c.schema_name, p) for p in patterns)]
+        if not selected:
+            raise CommandError(f'Не найдено ни одной схемы по шаблону: {selector}')
+        return selected
+
+    def load_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return {'command': self.__module__, 'done': []}
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('command') != self.__module__:
+            raise CommandError(f'{path} создан другой командой ({state.get("command")})')
+        return state
+
+    def save_checkpoint(self, path, state):
+        if not path:
+            return
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        if options['restart'] and checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        state = self.load_checkpoint(checkpoint)
+        done = set(state['done'])
+
+        clients = self.get_clients(options['tenants'])
+        pending = [c.schema_name for c in clients if c.schema_name not in done]
+        if done:
+            self.stdout.write(f"Продолжение по {checkpoint}: пропущено уже обработанных схем {len(clients) - len(pending)}")
+
+        tenant_options = {k: v for k, v in options.items() if k not in RUNNER_OPTIONS}
+        names = {c.schema_name: c.name for c in clients}
+        totals, failures = {}, {}
+        started = time.monotonic()
+
+        for index, (schema_name, status, counters, error, elapsed) in enumerate(
+                self.run_all(pending, tenant_options, options), 1):
+            label = f"[{index}/{len(pending)}] {names[schema_name]} ({schema_name})"
+            if status == 'ok':
+                for key, value in counters.items():
+                    totals[key] = totals.get(key, 0) + value
+                details = ' '.join(f'{k}={v}' for k, v in counters.items())
+                self.stdout.write(f"{label}: готово за {elapsed:.1f} с {details}".rstrip())
+                state['done'].append(schema_name)
+                self.save_checkpoint(checkpoint, state)
+            else:
+                failures[schema_name] = error
+                self.stdout.write(self.style.ERROR(f"{label}: {'таймаут' if status == 'timeout' else 'ошибка'}: {error}"))
+
+        summary = ' '.join(f'{k}={v}' for k, v in totals.items())
+        self.stdout.write(f"Обработано схем: {len(pending) - len(failures)} из {len(pending)} за {time.monotonic() - started:.1f} с {summary}".rstrip())
+        if failures:
+            raise CommandError(
+                f"Не удалось обработать схем: {len(failures)} ({', '.join(sorted(failures))})"
+                + (f". Повторный запуск с --checkpoint {checkpoint} продолжит с них." if checkpoint else '')
+            )
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS('Все схемы обработаны'))
+
+    def run_all(self, schema_names, tenant_options, options):
+        """Результаты run_tenant по мере готовности"""
+        workers = max(options['workers'], 1)
+        timeout = options['timeout']
+        if workers == 1 or len(schema_names) <= 1:
+            for schema_name in schema_names:
+                yield run_tenant(self.__module__, schema_name, tenant_options, timeout)
+            return
+
+        # Соединения родителя закрываются до fork, дочерние процессы откроют свои
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [
+                executor.submit(run_tenant, self.__module__, schema_name, tenant_options, timeout)
+                for schema_name in schema_names
+            ]
+            for future in as_completed(futures):
+                yield future.result()
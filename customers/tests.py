@@ -1,3 +1,130 @@
-from django.test import TestCase
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from customers.ledger import add_months, revenue_series
+from customers.throttling import TokenBucket, get_client_ident
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        patcher = mock.patch('customers.throttling.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_retry_after(self):
+        # 60 в минуту: токен раз в секунду, залп до 2 запросов
+        bucket = TokenBucket('test:burst', rate=60, capacity=2)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 1)
+
+    def test_rejected_request_does_not_consume(self):
+        bucket = TokenBucket('test:refund', rate=60, capacity=1)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 1)
+        self.assertEqual(bucket.consume(), 1)
+        self.now += 1
+        self.assertEqual(bucket.consume(), 0)
+
+    def test_refill(self):
+        bucket = TokenBucket('test:refill', rate=60, capacity=2)
+        bucket.consume()
+        bucket.consume()
+        self.now += 1
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 1)
+        # Простой дольше залпа наполняет ведро целиком, но не больше capacity
+        self.now += 60
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 1)
+
+    def test_retry_after_rounds_up_to_seconds(self):
+        # 6 в минуту: токен раз в 10 секунд
+        bucket = TokenBucket('test:slow', rate=6, capacity=1)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 10)
+        self.now += 2.5
+        self.assertEqual(bucket.consume(), 8)
+
+
+class ClientIdentTests(SimpleTestCase):
+    def request(self, forwarded=None):
+        meta = {'REMOTE_ADDR': '10.0.0.1'}
+        if forwarded:
+            meta['HTTP_X_FORWARDED_FOR'] = forwarded
+        request = RequestFactory().get('/', **meta)
+        request.user = SimpleNamespace(is_authenticated=False)
+        return request
+
+    def test_authenticated_user(self):
+        request = self.request('1.1.1.1')
+        request.user = SimpleNamespace(is_authenticated=True, pk=7, role='admin')
+        self.assertEqual(get_client_ident(request), 'tenant:7')
+
+    @override_settings(API_THROTTLE={'NUM_PROXIES': 0})
+    def test_forwarded_for_ignored_without_proxies(self):
+        self.assertEqual(get_client_ident(self.request('1.1.1.1')), 'ip:10.0.0.1')
+
+    @override_settings(API_THROTTLE={'NUM_PROXIES': 1})
+    def test_address_added_by_trusted_proxy(self):
+        self.assertEqual(get_client_ident(self.request('6.6.6.6, 2.2.2.2')), 'ip:2.2.2.2')
+        self.assertEqual(get_client_ident(self.request('2.2.2.2')), 'ip:2.2.2.2')
+        self.assertEqual(get_client_ident(self.request()), 'ip:10.0.0.1')
+
+
+class RevenueSeriesTests(SimpleTestCase):
+    def series(self, rows, **kwargs):
+        with mock.patch('customers.ledger.timezone.now', return_value=datetime(2026, 6, 15, 12, 0)), \
+                mock.patch('customers.ledger.RevenueMonth.objects.filter') as filter_months:
+            filter_months.return_value.values_list.return_value = rows
+            series = revenue_series(**kwargs)
+        return series, filter_months
+
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2026, 1, 31), -1), date(2025, 12, 1))
+        self.assertEqual(add_months(date(2025, 11, 1), 14), date(2027, 1, 1))
+
+    def test_loads_window_before_first_month(self):
+        _, filter_months = self.series([], months=4, window=3)
+        filter_months.assert_called_once_with(month__gte=date(2025, 12, 1), month__lte=date(2026, 6, 1))
+
+    def test_churn_across_window_boundary(self):
+        rows = [
+            # Заплатил до начала ряда: считается платящим, пока оплата в окне
+            (1, date(2026, 1, 1), Decimal('300')),
+            (2, date(2026, 4, 1), Decimal('90')),
+        ]
+        series, _ = self.series(rows, months=4, window=3)
+        self.assertEqual([item['month'] for item in series], ['2026-03-01', '2026-04-01', '2026-05-01', '2026-06-01'])
+
+        march, april, may, june = series
+        self.assertEqual(march['revenue'], '0.00')
+        self.assertEqual(march['mrr'], '100.00')
+        self.assertEqual((march['paying_clients'], march['new_clients'], march['churned_clients']), (1, 0, 0))
+
+        # Январская оплата вышла из окна: клиент 1 ушел, клиент 2 новый
+        self.assertEqual(april['revenue'], '90.00')
+        self.assertEqual(april['mrr'], '30.00')
+        self.assertEqual((april['paying_clients'], april['new_clients'], april['churned_clients']), (1, 1, 1))
+        self.assertEqual(april['churned_mrr'], '100.00')
+        self.assertEqual(april['churn_rate'], 1.0)
+
+        for item in (may, june):
+            self.assertEqual(item['mrr'], '30.00')
+            self.assertEqual((item['new_clients'], item['churned_clients'], item['churn_rate']), (0, 0, 0.0))
+
+    def test_no_clients(self):
+        series, _ = self.series([], months=2)
+        self.assertEqual(series[-1]['churn_rate'], 0.0)
+        self.assertEqual(series[-1]['mrr'], '0.00')
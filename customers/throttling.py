@@ -0,0 +1,211 @@
+"""
+Ограничение частоты запросов по тенанту и пользователю.
+
+Используется token bucket в варианте GCRA: для каждого ключа в кэше хранится
+"теоретическое время прихода" (TAT) следующего запроса в миллисекундах.
+Каждый запрос атомарно сдвигает TAT через cache.incr, поэтому счетчик
+корректно работает при нескольких воркерах gunicorn с общим кэшем (Redis,
+Memcached, БД). Лимиты тенанта выводятся из его тарифного плана.
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_THROTTLE_SETTINGS = {
+    # Запросов в минуту на одного пользователя (или IP для анонимов)
+    'USER_RATE': 120,
+    # Запросов в минуту на тенанта в расчете на одно место тарифа (max_users)
+    'TENANT_RATE_PER_SEAT': 60,
+    # Верхняя граница для тенанта независимо от тарифа
+    'TENANT_RATE_MAX': 3000,
+    # Сколько мест считать у тенанта без тарифа
+    'NO_PLAN_SEATS': 5,
+    # Отдельные (более строгие) лимиты для запросов к AI
+    'AI_USER_RATE': 10,
+    'AI_TENANT_RATE_PER_SEAT': 2,
+    'AI_TENANT_RATE_MAX': 120,
+    # Сколько секунд лимит можно "выбрать" залпом
+    'BURST_SECONDS': 10,
+    # Время жизни закэшированного размера тарифа
+    'PLAN_CACHE_TIMEOUT': 300,
+    # Число доверенных прокси перед приложением: адрес анонима берется из
+    # X-Forwarded-For на столько позиций справа, при 0 — REMOTE_ADDR
+    'NUM_PROXIES': 0,
+}
+
+
+def get_throttle_settings():
+    return {**DEFAULT_THROTTLE_SETTINGS, **getattr(settings, 'API_THROTTLE', {})}
+
+
+class TokenBucket:
+    """
+    Token bucket поверх кэша Django.
+    rate — запросов в минуту, capacity — максимальный размер залпа.
+    """
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.interval_ms = max(1, int(60000 / rate))
+        self.capacity = max(1, capacity)
+        # Запись живет, пока ведро не наполнится полностью
+        self.timeout = int(self.interval_ms * self.capacity / 1000) + 1
+
+    def consume(self):
+        """Забирает один токен. Возвращает 0 или число секунд до следующей попытки."""
+        now = int(time.time() * 1000)
+        tolerance = self.interval_ms * self.capacity
+        cache.add(self.key, now, self.timeout)
+        try:
+            tat = cache.incr(self.key, self.interval_ms)
+        except ValueError:
+            # Ключ успел истечь между add и incr
+            cache.set(self.key, now + self.interval_ms, self.timeout)
+            return 0
+
+        if tat < now + self.interval_ms:
+            # Ведро простаивало и успело наполниться: начинаем отсчет заново
+            cache.set(self.key, now + self.interval_ms, self.timeout)
+            return 0
+
+        if tat - now > tolerance:
+            self.refund()
+            return max(1, -(-(tat - tolerance - now) // 1000))
+
+        cache.touch(self.key, self.timeout)
+        return 0
+
+    def refund(self):
+        try:
+            cache.decr(self.key, self.interval_ms)
+        except ValueError:
+            pass
+
+
+def get_plan_seats(tenant):
+    """Количество мест (max_users) тарифа тенанта, с кэшированием по id тарифа"""
+    plan_id = getattr(tenant, 'subscription_plan_id', None)
+    if not plan_id:
+        return None
+
+    def load():
+        from customers.models import SubscriptionPlan
+        plan = SubscriptionPlan.objects.filter(id=plan_id).values_list('max_users', flat=True).first()
+        return plan or 0
+
+    return cache.get_or_set(f'throttle:plan:{plan_id}', load, get_throttle_settings()['PLAN_CACHE_TIMEOUT'])
+
+
+def get_limits(tenant, scope):
+    """Возвращает (лимит пользователя, лимит тенанта) в запросах в минуту"""
+    conf = get_throttle_settings()
+    prefix = 'AI_' if scope == 'ai' else ''
+    user_rate = conf[f'{prefix}USER_RATE']
+
+    if tenant is None or tenant.schema_name == 'public':
+        return user_rate, None
+
+    seats = get_plan_seats(tenant)
+    if seats is None:
+        seats = conf['NO_PLAN_SEATS']
+    tenant_rate = min(conf[f'{prefix}TENANT_RATE_PER_SEAT'] * max(seats, 1), conf[f'{prefix}TENANT_RATE_MAX'])
+    return user_rate, tenant_rate
+
+
+def get_client_ident(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        user_type = 'tenant' if hasattr(user, 'role') else 'public'
+        return f'{user_type}:{user.pk}'
+    # Левые адреса X-Forwarded-For задает сам клиент, доверять можно только добавленным прокси
+    num_proxies = get_throttle_settings()['NUM_PROXIES']
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies > 0 and forwarded:
+        addrs = forwarded.split(',')
+        ip = addrs[-min(num_proxies, len(addrs))].strip()
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return f'ip:{ip}'
+
+
+def check_rate(request, scope='api'):
+    """
+    Списывает токен из ведра пользователя и ведра тенанта.
+    Возвращает 0, если запрос разрешен, иначе число секунд для Retry-After.
+    """
+    conf = get_throttle_settings()
+    tenant = getattr(request, 'tenant', None)
+    schema = tenant.schema_name if tenant is not None else 'public'
+    user_rate, tenant_rate = get_limits(tenant, scope)
+
+    buckets = []
+    if user_rate:
+        buckets.append(TokenBucket(
+            f'throttle:{scope}:{schema}:u:{get_client_ident(request)}',
+            user_rate, int(user_rate * conf['BURST_SECONDS'] / 60) or 1,
+        ))
+    if tenant_rate:
+        buckets.append(TokenBucket(
+            f'throttle:{scope}:{schema}:t',
+            tenant_rate, int(tenant_rate * conf['BURST_SECONDS'] / 60) or 1,
+        ))
+
+    consumed = []
+    for bucket in buckets:
+        wait = bucket.consume()
+        if wait:
+            # Не списываем токен пользователя, если запрос отклонен по лимиту тенанта
+            for taken in consumed:
+                taken.refund()
+            return wait
+        consumed.append(bucket)
+    return 0
+
+
+def throttled_response(wait):
+    response = JsonResponse({
+        'status': 'error',
+        'message': f'Слишком много запросов. Повторите через {wait} сек.'
+    }, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+class TenantRateThrottle(BaseThrottle):
+    """Throttle для DRF: лимиты по тенанту и пользователю. Retry-After выставляет DRF по wait()."""
+    scope = 'api'
+
+    def allow_request(self, request, view):
+        self._wait = check_rate(request, getattr(view, 'throttle_scope', None) or self.scope)
+        return not self._wait
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+def throttle_view(scope='api'):
+    """Декоратор для обычных (не DRF) view, в т.ч. AJAX-эндпоинтов дашборда"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            wait = check_rate(request, scope)
+            if wait:
+                return throttled_response(wait)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ThrottleMixin:
+    """Примесь для class-based AJAX view: проверка лимитов до обработки запроса"""
+    throttle_scope = 'api'
+
+    def dispatch(self, request, *args, **kwargs):
+        wait = check_rate(request, self.throttle_scope)
+        if wait:
+            return throttled_response(wait)
+        return super().dispatch(request, *args, **kwargs)
@@ -1,7 +1,10 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import TenantRegistrationViewSet
+from .views import RevenueSeriesView, TenantRegistrationViewSet
 
 router = DefaultRouter()
 router.register(r'registration', TenantRegistrationViewSet, basename='tenant-registration')
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('revenue/', RevenueSeriesView.as_view(), name='revenue_series'),
+]
@@ -2,11 +2,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
 from django.db import transaction
 from django_tenants.utils import tenant_context
 import random
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
+from django.urls import reverse
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.contrib.auth.decorators import user_passes_test
@@ -18,19 +20,24 @@ from django.utils import timezone
 from datetime import timedelta
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-import subprocess
-import os
-from datetime import datetime
-from django.db import connection
+from django.db import connections
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
 from django.core.mail import get_connection, send_mail
 from django.contrib.auth.hashers import make_password
-from .models import Client, Domain, Payment, SubscriptionPlan, MailSettings, ContactMessage, UserProfile
+from .models import Client, Domain, Payment, SubscriptionPlan, MailSettings, ContactMessage, UserProfile, TenantAdmin, TenantProvisioning, BackupJob, RestoreJob
+from .provisioning import schedule_provisioning
+from .admin_directory import search_tenant_admins
+from .metering import latest_usage
+from .ledger import client_total_paid, revenue_series, total_revenue
+from .backups import active_restore_schemas, create_backup_job, download_name, iter_backup, schedule_backup, schedule_restore
+from .sharding import shard_aliases
 from users_app.models import TenantUser
+from users_app.permissions import IsPlatformSuperuser
+from users_app.principal_cache import bump_principal_version
 from .serializers import TenantRegistrationSerializer
-from django.db.models import Sum, Max
+from django.db.models import Count, F
 
 
 def superuser_required(user):
@@ -69,10 +76,10 @@ def superuser_finance(request):
     """Страница финансов: сводная таблица платежей по клиентам"""
     search_query = request.GET.get('search', '')
     
-    # Аннотируем клиентов общей суммой платежей и датой последнего платежа
+    # Сумма платежей и дата последнего платежа — из сводки (customers/ledger.py), без агрегации платежей
     queryset = Client.objects.exclude(schema_name='public').annotate(
-        total_paid=Sum('payments__amount'),
-        last_payment_date=Max('payments__date')
+        total_paid=F('payment_summary__total_paid'),
+        last_payment_date=F('payment_summary__last_payment_date')
     ).select_related('subscription_plan')
     
     if search_query:
@@ -93,6 +100,22 @@ def superuser_finance(request):
     return render(request, 'customers/superuser_finance.html', context)
 
 
+class RevenueSeriesView(APIView):
+    """
+    Помесячная выручка, MRR и отток по сводкам платежей (customers/ledger.py).
+    GET /api/customers/revenue/?months=12&window=3
+    """
+    permission_classes = [IsPlatformSuperuser]
+
+    def get(self, request):
+        try:
+            months = min(max(int(request.query_params.get('months', 12)), 1), 120)
+            window = min(max(int(request.query_params.get('window', 3)), 1), 12)
+        except ValueError:
+            return Response({'error': 'months и window должны быть целыми числами'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'months': months, 'window': window, 'series': revenue_series(months, window)})
+
+
 @user_passes_test(superuser_required, login_url='/admin/login/')
 def superuser_client_payments(request, tenant_id):
     """Управление платежами конкретного клиента"""
@@ -102,7 +125,7 @@ def superuser_client_payments(request, tenant_id):
     context = {
         'tenant': tenant,
         'payments': payments,
-        'total_paid': payments.aggregate(Sum('amount'))['amount__sum'] or 0
+        'total_paid': client_total_paid(tenant)
     }
     return render(request, 'customers/superuser_client_payments.html', context)
 
@@ -274,7 +297,7 @@ def superuser_dashboard(request):
         'tenants_count': tenants.count(),
         'active_tenants': tenants.filter(is_active=True).count(),
         'blocked_tenants': tenants.filter(is_active=False).count(),
-        'total_revenue': Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0,
+        'total_revenue': total_revenue(),
         'recent_tenants': tenants.order_by('-created_on')[:5],
     }
     return render(request, 'customers/superuser_dashboard.html', context)
@@ -296,7 +319,7 @@ def public_tariffs(request):
 def superuser_tenants(request):
     """Список всех организаций"""
     
-    queryset = Client.objects.all().exclude(schema_name='public').select_related('subscription_plan')
+    queryset = Client.objects.all().exclude(schema_name='public').select_related('subscription_plan', 'stats')
     today = timezone.now().date()
     
     # Статистика для графического представления
@@ -327,6 +350,11 @@ def superuser_tenants(request):
         stats['expired_pct'] = (stats['expired'] / stats['total']) * 100
         stats['no_plan_pct'] = (stats['no_plan'] / stats['total']) * 100
     
+    # Фильтр по шарду БД (customers/sharding.py)
+    shard = request.GET.get('shard', '')
+    if shard:
+        queryset = queryset.filter(shard=shard)
+
     # Поиск
     search_query = request.GET.get('search', '')
     if search_query:
@@ -338,20 +366,14 @@ def superuser_tenants(request):
     
     page_obj, sort_by, per_page = get_paginated_data(request, queryset, '-created_on')
     
-    # Добавляем количество пользователей для каждой организации на текущей странице
+    # Показатели организаций берутся из TenantStats (customers/stats.py), без входа в схемы
     for tenant in page_obj:
-        try:
-            with tenant_context(tenant):
-                tenant.user_count = TenantUser.objects.count()
-                if tenant.subscription_plan:
-                    tenant.user_limit = tenant.subscription_plan.max_users
-                    tenant.user_percent = min(int((tenant.user_count / tenant.user_limit) * 100), 100) if tenant.user_limit > 0 else 0
-                else:
-                    tenant.user_limit = 0
-                    tenant.user_percent = 0
-        except Exception as e:
-            print(f"Error counting users for tenant {tenant.schema_name}: {e}")
-            tenant.user_count = 0
+        stats_row = getattr(tenant, 'stats', None)
+        tenant.user_count = stats_row.user_count if stats_row else 0
+        if tenant.subscription_plan:
+            tenant.user_limit = tenant.subscription_plan.max_users
+            tenant.user_percent = min(int((tenant.user_count / tenant.user_limit) * 100), 100) if tenant.user_limit > 0 else 0
+        else:
             tenant.user_limit = 0
             tenant.user_percent = 0
     
@@ -362,6 +384,8 @@ def superuser_tenants(request):
         'search_query': search_query,
         'today': timezone.now().date(),
         'stats': stats,
+        'shards': shard_aliases() if len(shard_aliases()) > 1 else [],
+        'shard': shard,
     }
     return render(request, 'customers/superuser_tenants.html', context)
 
@@ -379,6 +403,15 @@ def superuser_tenant_edit(request, tenant_id):
         tenant.telegram = request.POST.get('telegram')
         tenant.contact_person = request.POST.get('contact_person')
         tenant.can_admin_delete_media = 'can_admin_delete_media' in request.POST
+        tenant.image_transcode_enabled = 'image_transcode_enabled' in request.POST
+        tenant.keep_original_images = 'keep_original_images' in request.POST
+        if request.POST.get('image_transcode_format') in dict(Client.IMAGE_FORMAT_CHOICES):
+            tenant.image_transcode_format = request.POST['image_transcode_format']
+        try:
+            tenant.image_max_dimension = min(max(int(request.POST.get('image_max_dimension', tenant.image_max_dimension)), 320), 10000)
+            tenant.image_quality = min(max(int(request.POST.get('image_quality', tenant.image_quality)), 1), 100)
+        except ValueError:
+            pass
         
         plan_id = request.POST.get('subscription_plan')
         months = int(request.POST.get('subscription_months', 1))
@@ -407,7 +440,7 @@ def superuser_tenant_edit(request, tenant_id):
         'tenant': tenant,
         'plans': plans,
         'payments': tenant.payments.all().order_by('-date')[:5],
-        'total_paid': tenant.payments.aggregate(Sum('amount'))['amount__sum'] or 0,
+        'total_paid': client_total_paid(tenant),
         'today': timezone.now().date(),
     }
     return render(request, 'customers/superuser_tenant_form.html', context)
@@ -428,6 +461,9 @@ def superuser_tenant_toggle_status(request, tenant_id):
     try:
         with tenant_context(tenant):
             TenantUser.objects.all().update(is_active=tenant.is_active)
+        TenantAdmin.objects.filter(client=tenant).update(is_active=tenant.is_active)
+        # update() не вызывает сигналы: сбрасываем кэш аутентификации тенанта вручную
+        bump_principal_version(tenant.schema_name)
     except Exception as e:
         messages.warning(request, f'Статус организации изменен, но возникла ошибка при обновлении пользователей: {e}')
     
@@ -549,32 +585,9 @@ def superuser_admins(request):
         Q(is_superuser=True) | Q(is_staff=True)
     ).select_related('profile', 'profile__tenant').order_by('username')
     
-    # 2. Администраторы тенантов (собираем из всех схем)
-    tenant_admins = []
-    tenants = Client.objects.exclude(schema_name='public')
-    
+    # 2. Администраторы тенантов: справочник в публичной схеме (customers/admin_directory.py)
     search_query = request.GET.get('search', '')
-    
-    for tenant in tenants:
-        try:
-            with tenant_context(tenant):
-                # Ищем пользователей с ролью ADMIN в схеме тенанта
-                admins = TenantUser.objects.filter(role='ADMIN')
-                
-                if search_query:
-                    admins = admins.filter(
-                        Q(username__icontains=search_query) | 
-                        Q(email__icontains=search_query) |
-                        Q(first_name__icontains=search_query) |
-                        Q(last_name__icontains=search_query)
-                    )
-                
-                for admin in admins:
-                    # Добавляем информацию о тенанте для отображения в шаблоне
-                    admin.tenant_obj = tenant 
-                    tenant_admins.append(admin)
-        except Exception as e:
-            print(f"Error fetching admins for tenant {tenant.schema_name}: {e}")
+    tenant_admins = search_tenant_admins(search_query).order_by('client__name', 'username')
 
     # Поиск для администраторов платформы
     if search_query:
@@ -587,10 +600,11 @@ def superuser_admins(request):
 
     # Для администраторов платформы оставим пагинацию
     page_obj, sort_by, per_page = get_paginated_data(request, platform_admins, 'username')
+    tenant_admins_page = Paginator(tenant_admins, per_page).get_page(request.GET.get('tenant_page'))
     
     context = {
         'page_obj': page_obj,
-        'tenant_admins': tenant_admins,
+        'tenant_admins': tenant_admins_page,
         'sort_by': sort_by,
         'per_page': per_page,
         'search_query': search_query,
@@ -1072,134 +1086,132 @@ class TenantRegistrationViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['post'])
     def register(self, request):
+        """
+        Принимает заявку и сразу отвечает 202: схема, домен и администратор
+        создаются в фоне (customers/provisioning.py), статус — в provisioning.
+        """
         serializer = TenantRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             data = serializer.validated_data
             
-            try:
-                with transaction.atomic():
-                    # 1. Создаем клиента (тенанта)
-                    client = Client.objects.create(
-                        name=data['company_name'],
-                        schema_name=data['subdomain'],
-                        phone=data['phone'],
-                        telegram=data.get('telegram', ''),
-                        email=data.get('email', ''),
-                        contact_person=data.get('contact_person', ''),
-                        subscription_plan_id=data['subscription_plan']
-                    )
-                    
-                    # 2. Создаем домен
-                    host = request.get_host().split(':')[0]
-                    if host == '127.0.0.1' or host == 'localhost':
-                        base_domain = 'localhost'
-                    else:
-                        # Если мы на qtrace.ru, то base_domain будет qtrace.ru
-                        # Если мы на 192.168.1.220.nip.io, то base_domain будет 192.168.1.220.nip.io
-                        base_domain = host
-
-                    domain = Domain.objects.create(
-                        domain=f"{data['subdomain']}.{base_domain}",
-                        tenant=client,
-                        is_primary=True
-                    )
-                    
-                    # 3. Создаем администратора внутри схемы тенанта
-                    with tenant_context(client):
-                        admin_user = TenantUser.objects.create(
-                            username=data['admin_username'],
-                            email=data['admin_email'],
-                            role='ADMIN',
-                            is_active=True
-                        )
-                        admin_user.set_password(data['admin_password'])
-                        admin_user.save()
-                        
-                    # Определяем протокол и порт для ссылки
-                    protocol = 'https' if request.is_secure() else 'http'
-                    port = request.get_port()
-                    
-                    # Убираем порт, если он стандартный для протокола или если мы в https и порт 80 (ошибка прокси)
-                    if (protocol == 'https' and (port == 443 or port == 80)) or (protocol == 'http' and port == 80):
-                        port_str = ""
-                    else:
-                        port_str = f":{port}"
-                    
-                    return Response({
-                        'message': 'Заявка на регистрацию принята. Организация будет активирована после проверки администратором.',
-                        'tenant_url': f"{protocol}://{domain.domain}{port_str}/"
-                    }, status=status.HTTP_201_CREATED)
-                    
-            except Exception as e:
-                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            host = request.get_host().split(':')[0]
+            if host == '127.0.0.1' or host == 'localhost':
+                base_domain = 'localhost'
+            else:
+                # Если мы на qtrace.ru, то base_domain будет qtrace.ru
+                # Если мы на 192.168.1.220.nip.io, то base_domain будет 192.168.1.220.nip.io
+                base_domain = host
+            domain = f"{data['subdomain']}.{base_domain}"
+
+            # Определяем протокол и порт для ссылки
+            protocol = 'https' if request.is_secure() else 'http'
+            port = request.get_port()
+            
+            # Убираем порт, если он стандартный для протокола или если мы в https и порт 80 (ошибка прокси)
+            if (protocol == 'https' and (port == 443 or port == 80)) or (protocol == 'http' and port == 80):
+                port_str = ""
+            else:
+                port_str = f":{port}"
+
+            with transaction.atomic():
+                job = TenantProvisioning.objects.create(
+                    company_name=data['company_name'],
+                    schema_name=data['subdomain'],
+                    domain=domain,
+                    tenant_url=f"{protocol}://{domain}{port_str}/",
+                    phone=data['phone'],
+                    telegram=data.get('telegram', ''),
+                    email=data.get('email', ''),
+                    contact_person=data.get('contact_person', ''),
+                    subscription_plan_id=data['subscription_plan'],
+                    admin_username=data['admin_username'],
+                    admin_email=data['admin_email'],
+                    admin_password_hash=make_password(data['admin_password']),
+                )
+                schedule_provisioning(job)
+
+            return Response({
+                'job_id': str(job.pk),
+                'status': job.status,
+                'status_url': reverse('register_status', args=[job.pk]),
+            }, status=status.HTTP_202_ACCEPTED)
                 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['get'])
+    def provisioning(self, request, pk=None):
+        """Статус заявки для опроса со страницы регистрации"""
+        job = get_object_or_404(TenantProvisioning, pk=pk)
+        data = {'job_id': str(job.pk), 'status': job.status}
+        if job.status == 'READY':
+            data['message'] = 'Заявка на регистрацию принята. Организация будет активирована после проверки администратором.'
+            data['tenant_url'] = job.tenant_url
+        elif job.status == 'FAILED':
+            data['error'] = job.error or 'Ошибка при создании организации'
+        return Response(data)
+
+def find_dead_schemas():
+    """
+    "Мертвые" схемы во всех шардах: есть в PG, но нет в Django — [(шард, схема)].
+    Временные схемы восстановления не трогаем; схема, оставшаяся в старом шарде
+    после move_tenant без --drop-source, зарегистрирована и тоже не считается мертвой.
+    """
+    registered_schemas = set(Client.objects.values_list('schema_name', flat=True))
+    protected_schemas = {'public', settings.TENANT_TEMPLATE_SCHEMA} | active_restore_schemas()
+    dead_schemas = []
+    for alias in shard_aliases():
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT nspname FROM pg_namespace WHERE nspname NOT LIKE 'pg_%' AND nspname != 'information_schema'")
+            dead_schemas += [
+                (alias, row[0]) for row in cursor.fetchall()
+                if row[0] not in registered_schemas and row[0] not in protected_schemas
+            ]
+    return dead_schemas
+
+
 @user_passes_test(superuser_required, login_url='/admin/login/')
 def superuser_db_management(request):
     """Страница управления базой данных"""
     print(f"DEBUG: superuser_db_management called, method={request.method}")
-    with connection.cursor() as cursor:
-        # Размер базы данных
-        cursor.execute("SELECT pg_size_pretty(pg_database_size(current_database()))")
-        db_size = cursor.fetchone()[0]
-        
-        # Список всех схем в PostgreSQL
-        cursor.execute("SELECT nspname FROM pg_namespace WHERE nspname NOT LIKE 'pg_%' AND nspname != 'information_schema'")
-        db_schemas = [row[0] for row in cursor.fetchall()]
-        
-        # Список схем, зарегистрированных в Django
-        registered_schemas = set(Client.objects.values_list('schema_name', flat=True))
-        
-        # "Мертвые" схемы (есть в PG, но нет в Django)
-        dead_schemas = [s for s in db_schemas if s not in registered_schemas and s != 'public']
-        
-        # Статистика по таблицам
-        cursor.execute("""
-            SELECT relname, n_live_tup 
-            FROM pg_stat_user_tables 
-            ORDER BY n_live_tup DESC 
-            LIMIT 10
-        """)
-        top_tables = cursor.fetchall()
-
-    # Список бэкапов
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-    backups = []
-    if os.path.exists(backup_dir):
-        for f in os.listdir(backup_dir):
-            if f.endswith('.sql'):
-                path = os.path.join(backup_dir, f)
-                backups.append({
-                    'name': f,
-                    'size': f"{os.path.getsize(path) / 1024 / 1024:.2f} MB",
-                    'date': datetime.fromtimestamp(os.path.getmtime(path))
-                })
-    backups.sort(key=lambda x: x['date'], reverse=True)
+    # Размер каждой базы-шарда и число организаций в ней
+    shard_counts = dict(
+        Client.objects.exclude(schema_name='public').values_list('shard').annotate(count=Count('id'))
+    )
+    db_sizes = []
+    for alias in shard_aliases():
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT pg_size_pretty(pg_database_size(current_database()))")
+            db_sizes.append({'alias': alias, 'size': cursor.fetchone()[0], 'tenants': shard_counts.get(alias, 0)})
+    dead_schemas = find_dead_schemas()
+
+    # Потребление по организациям — из последнего замера collect_tenant_metering
+    usage_collected_at, usage_samples = latest_usage()
+
+    backup_jobs = BackupJob.objects.select_related('client')[:50]
 
     return render(request, 'customers/superuser_db_management.html', {
-        'db_size': db_size,
+        'db_sizes': db_sizes,
         'dead_schemas': dead_schemas,
-        'top_tables': top_tables,
-        'backups': backups
+        'usage_collected_at': usage_collected_at,
+        'usage_samples': usage_samples[:20],
+        'backup_jobs': backup_jobs,
+        'restore_jobs': RestoreJob.objects.select_related('backup')[:10],
+        'backup_clients': Client.objects.exclude(schema_name='public').order_by('name'),
     })
 
 @user_passes_test(superuser_required, login_url='/admin/login/')
 def superuser_db_cleanup_tenants(request):
     """Очистка "мертвых" схем"""
     if request.method == 'POST':
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT nspname FROM pg_namespace WHERE nspname NOT LIKE 'pg_%' AND nspname != 'information_schema'")
-            db_schemas = [row[0] for row in cursor.fetchall()]
-            registered_schemas = set(Client.objects.values_list('schema_name', flat=True))
-            dead_schemas = [s for s in db_schemas if s not in registered_schemas and s != 'public']
-            
-            count = 0
-            for schema in dead_schemas:
-                cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
-                count += 1
-            
-            messages.success(request, f'Успешно удалено "мертвых" схем: {count}')
+        from media_app.deletion import enqueue_tenant_directory_deletion
+        from .backups import drop_schema
+        count = 0
+        for alias, schema in find_dead_schemas():
+            drop_schema(schema, alias)
+            enqueue_tenant_directory_deletion(schema)
+            count += 1
+
+        messages.success(request, f'Успешно удалено "мертвых" схем: {count}')
     return redirect('superuser_db_management')
 
 @user_passes_test(superuser_required, login_url='/admin/login/')
@@ -1207,130 +1219,63 @@ def superuser_db_vacuum(request):
     """Выполнение VACUUM ANALYZE"""
     if request.method == 'POST':
         # VACUUM нельзя выполнять внутри транзакции
-        with connection.cursor() as cursor:
-            # PostgreSQL требует, чтобы VACUUM запускался вне транзакционных блоков
-            cursor.execute("COMMIT") 
-            cursor.execute("VACUUM ANALYZE")
+        for alias in shard_aliases():
+            with connections[alias].cursor() as cursor:
+                # PostgreSQL требует, чтобы VACUUM запускался вне транзакционных блоков
+                cursor.execute("COMMIT") 
+                cursor.execute("VACUUM ANALYZE")
         messages.success(request, 'Оптимизация базы данных (VACUUM ANALYZE) успешно завершена.')
     return redirect('superuser_db_management')
 
 @user_passes_test(superuser_required, login_url='/admin/login/')
 def superuser_db_backup(request):
-    """Создание бэкапа"""
+    """Постановка резервной копии в очередь: всей базы или одной организации"""
     if request.method == 'POST':
-        import shutil
-        print("DEBUG: superuser_db_backup POST received")
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-            
-        filename = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sql"
-        filepath = os.path.join(backup_dir, filename)
-        
-        db_settings = settings.DATABASES['default']
-        os.environ['PGPASSWORD'] = db_settings['PASSWORD']
-        
-        # Попытка найти pg_dump
-        pg_dump_path = shutil.which('pg_dump')
-        if not pg_dump_path and os.name == 'nt':
-            possible_paths = [
-                r'C:\Program Files\PostgreSQL\17\bin\pg_dump.exe',
-                r'C:\Program Files\PostgreSQL\16\bin\pg_dump.exe',
-                r'C:\Program Files\PostgreSQL\15\bin\pg_dump.exe',
-                r'C:\Program Files\PostgreSQL\14\bin\pg_dump.exe',
-            ]
-            for p in possible_paths:
-                if os.path.exists(p):
-                    pg_dump_path = p
-                    break
-        
-        if not pg_dump_path:
-            msg = "Утилита pg_dump не найдена в системе. Пожалуйста, установите PostgreSQL или добавьте путь к bin в PATH."
-            print(f"DEBUG: {msg}")
-            messages.error(request, msg)
-            return redirect('superuser_db_management')
-
-        cmd = [
-            pg_dump_path,
-            '-h', db_settings.get('HOST', 'localhost') or 'localhost',
-            '-U', db_settings['USER'],
-            '-p', str(db_settings.get('PORT', 5432) or 5432),
-            '-f', filepath,
-            db_settings['NAME']
-        ]
-        
-        print(f"DEBUG: Running command: {' '.join(cmd)}")
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"DEBUG: pg_dump success: {result.stdout}")
-            messages.success(request, f'Резервная копия {filename} успешно создана.')
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr or str(e)
-            print(f"DEBUG: pg_dump failed: {error_msg}")
-            messages.error(request, f'Ошибка pg_dump: {error_msg}')
-        except Exception as e:
-            print(f"DEBUG: backup error: {e}")
-            messages.error(request, f'Ошибка при создании бэкапа: {e}')
-            
+        schema_name = request.POST.get('schema_name', '')
+        client = None
+        if schema_name:
+            client = get_object_or_404(Client.objects.exclude(schema_name='public'), schema_name=schema_name)
+        job = create_backup_job(client)
+        schedule_backup(job)
+        messages.success(request, f'Резервная копия {job.filename} поставлена в очередь.')
     return redirect('superuser_db_management')
 
+
 @user_passes_test(superuser_required, login_url='/admin/login/')
-def superuser_db_restore(request, filename):
-    """Восстановление из бэкапа"""
+def superuser_db_backup_status(request):
+    """Прогресс резервных копий и восстановлений для страницы обслуживания БД"""
+    ids = request.GET.getlist('id')[:50]
+    jobs = [
+        {'id': str(job.pk), 'status': job.status, 'progress': job.progress, 'error': job.error}
+        for job in BackupJob.objects.filter(pk__in=ids)
+    ]
+    jobs += [
+        {'id': str(job.pk), 'status': job.status, 'stage': job.get_stage_display(), 'error': job.error}
+        for job in RestoreJob.objects.filter(pk__in=ids)
+    ]
+    return JsonResponse({'jobs': jobs})
+
+
+@user_passes_test(superuser_required, login_url='/admin/login/')
+def superuser_db_backup_download(request, job_id):
+    job = get_object_or_404(BackupJob, pk=job_id, status='READY')
+    response = StreamingHttpResponse(iter_backup(job), content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="{download_name(job)}"'
+    if job.format == 'custom':
+        response['Content-Length'] = job.size
+    return response
+
+@user_passes_test(superuser_required, login_url='/admin/login/')
+def superuser_db_restore(request, job_id):
+    """Восстановление схемы организации из ее резервной копии (в фоне)"""
     if request.method == 'POST':
-        import shutil
-        print(f"DEBUG: superuser_db_restore POST received for {filename}")
-        backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-        filepath = os.path.join(backup_dir, filename)
-        
-        if not os.path.exists(filepath):
-            messages.error(request, 'Файл бэкапа не найден.')
-            return redirect('superuser_db_management')
-            
-        db_settings = settings.DATABASES['default']
-        os.environ['PGPASSWORD'] = db_settings['PASSWORD']
-        
-        # Попытка найти psql
-        psql_path = shutil.which('psql')
-        if not psql_path and os.name == 'nt':
-            possible_paths = [
-                r'C:\Program Files\PostgreSQL\17\bin\psql.exe',
-                r'C:\Program Files\PostgreSQL\16\bin\psql.exe',
-                r'C:\Program Files\PostgreSQL\15\bin\psql.exe',
-                r'C:\Program Files\PostgreSQL\14\bin\psql.exe',
-            ]
-            for p in possible_paths:
-                if os.path.exists(p):
-                    psql_path = p
-                    break
-        
-        if not psql_path:
-            msg = "Утилита psql не найдена в системе. Пожалуйста, установите PostgreSQL или добавьте путь к bin в PATH."
-            print(f"DEBUG: {msg}")
-            messages.error(request, msg)
-            return redirect('superuser_db_management')
-
-        # Для восстановления psql
-        cmd = [
-            psql_path,
-            '-h', db_settings.get('HOST', 'localhost') or 'localhost',
-            '-U', db_settings['USER'],
-            '-p', str(db_settings.get('PORT', 5432) or 5432),
-            '-d', db_settings['NAME'],
-            '-f', filepath
-        ]
-        
-        print(f"DEBUG: Running command: {' '.join(cmd)}")
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            print(f"DEBUG: psql success: {result.stdout}")
-            messages.success(request, f'База данных успешно восстановлена из {filename}.')
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr or str(e)
-            print(f"DEBUG: psql failed: {error_msg}")
-            messages.error(request, f'Ошибка psql: {error_msg}')
-        except Exception as e:
-            print(f"DEBUG: restore error: {e}")
-            messages.error(request, f'Ошибка при восстановлении: {e}')
-            
+        backup = get_object_or_404(BackupJob.objects.exclude(schema_name=''), pk=job_id, status='READY')
+        if not Client.objects.filter(schema_name=backup.schema_name).exists():
+            messages.error(request, f'Организация со схемой {backup.schema_name} не найдена.')
+        elif RestoreJob.objects.filter(schema_name=backup.schema_name, status__in=['PENDING', 'RUNNING']).exists():
+            messages.error(request, f'Схема {backup.schema_name} уже восстанавливается.')
+        else:
+            job = RestoreJob.objects.create(backup=backup, schema_name=backup.schema_name)
+            schedule_restore(job)
+            messages.success(request, f'Восстановление {backup.schema_name} из {backup.filename} поставлено в очередь.')
     return redirect('superuser_db_management')
@@ -33,3 +33,11 @@ def get_attr(obj, attr_name):
         return getattr(obj, attr_name)
     except AttributeError:
         return None
+
+@register.filter(name='media_thumb')
+def media_thumb(media, size=160):
+    """
+    URL миниатюры (для видео — кадра-заставки) медиа-файла или пустая строка.
+    Использование: {{ media|media_thumb:320 }}
+    """
+    return media.thumbnail_url(size) or ''
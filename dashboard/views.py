@@ -1,5 +1,4 @@
 from django.shortcuts import render, redirect, get_object_or_404
-import os
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import views as auth_views
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, View
@@ -9,12 +8,13 @@ from django import forms
 from django.forms import inlineformset_factory
 from django.contrib import messages
 
-from django.db.models import Sum, Max, Q, Prefetch
+from django.db.models import Max, Q, Prefetch
 from tasks.models import (
     Task, TaskStage, TaskTemplate, TaskTemplateStage, TaskStagePause,
     Product, Specification, TransferNote, Operation, ClientOrder
 )
 from media_app.models import Media
+from media_app.blobs import get_storage_used, get_transcode_savings
 from users_app.models import TenantUser, Department, Position
 from users_app.utils import generate_quick_login_token, validate_quick_login_token
 from django.contrib.auth import login
@@ -26,6 +26,8 @@ from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
+from customers.throttling import ThrottleMixin
+from customers.tenant_cache import get_tenant_domains
 
 # --- Mixins ---
 
@@ -157,10 +159,11 @@ def home(request):
             context['users_percent'] = min(int((context['employees_count'] / plan.max_users) * 100), 100)
         
         context['storage_limit_gb'] = plan.storage_gb
-        # Расчет занимаемого места через поле file_size
-        total_bytes = Media.objects.aggregate(total=Sum('file_size'))['total'] or 0
+        # Одинаковые файлы хранятся один раз и учитываются в квоте один раз
+        total_bytes = get_storage_used()
         context['storage_used_bytes'] = total_bytes
         context['storage_used_mb'] = round(total_bytes / (1024 * 1024), 2)
+        context['storage_saved_mb'] = round(get_transcode_savings() / (1024 * 1024), 2)
         if plan.storage_gb > 0:
             limit_bytes = plan.storage_gb * 1024 * 1024 * 1024
             context['storage_percent'] = min(int((total_bytes / limit_bytes) * 100), 100)
@@ -651,23 +654,11 @@ class TaskDeleteView(LoginRequiredMixin, DeleteView):
             return Task.objects.all()
         return Task.objects.none()
 
-    def delete(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        # Удаляем связанные файлы перед удалением объекта из БД
-        for media in self.object.media.all():
-            if media.file:
-                if os.path.isfile(media.file.path):
-                    os.remove(media.file.path)
-        
-        # Также удаляем медиа, привязанные к этапам этой задачи
-        for stage in self.object.stages.all():
-            for media in stage.media.all():
-                if media.file:
-                    if os.path.isfile(media.file.path):
-                        os.remove(media.file.path)
-        
-        messages.success(request, f"Задача {self.object.external_id} и все связанные данные успешно удалены.")
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        # Файлы медиа задачи и ее этапов ставятся в очередь удаления сигналами
+        # при каскадном удалении (media_app.signals) и удаляются после коммита
+        messages.success(self.request, f"Задача {self.object.external_id} и все связанные данные успешно удалены.")
+        return super().form_valid(form)
 
 # --- Task Templates (Reference System) ---
 
@@ -818,7 +809,7 @@ class TaskTemplateDeleteView(LoginRequiredMixin, PreserveQueryParamsMixin, Delet
 
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(require_POST, name='dispatch')
-class CreateTaskFromTemplateAjaxView(LoginRequiredMixin, TemplateView):
+class CreateTaskFromTemplateAjaxView(LoginRequiredMixin, ThrottleMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         template_id = kwargs.get('pk')
         try:
@@ -1222,7 +1213,7 @@ class MediaListView(LoginRequiredMixin, ListView):
     context_object_name = 'media_files'
     paginate_by = 12
     
-    def get_queryset(self):
+    def get_visible_media(self):
         user = self.request.user
         queryset = Media.objects.select_related('uploaded_by', 'task', 'stage')
         
@@ -1231,16 +1222,53 @@ class MediaListView(LoginRequiredMixin, ListView):
         if hasattr(user, 'role'):
             # Админ тенанта видит ВСЕ файлы предприятия
             if user.role == 'ADMIN':
-                return queryset.order_by('-uploaded_at')
+                return queryset
             # Обычный сотрудник видит только свои файлы
-            return queryset.filter(uploaded_by=user).order_by('-uploaded_at')
+            return queryset.filter(uploaded_by=user)
         
         elif getattr(user, 'is_superuser', False):
             # Суперпользователь платформы видит всё
-            return queryset.order_by('-uploaded_at')
+            return queryset
             
         return Media.objects.none()
 
+    def get_queryset(self):
+        queryset = self.get_visible_media()
+
+        similar_id = self.request.GET.get('similar')
+        if similar_id and similar_id.isdigit():
+            # Похожие на выбранный файл по перцептивному хэшу (media_app/metadata.py)
+            from media_app.metadata import find_near_duplicates
+            media = get_object_or_404(queryset, pk=similar_id)
+            self.similar_to = media
+            ids = [candidate.pk for candidate, distance in find_near_duplicates(media, queryset)]
+            return queryset.filter(pk__in=ids).order_by('-uploaded_at')
+
+        # Фильтры по метаданным, извлеченным при загрузке: файлы не открываются
+        media_type = self.request.GET.get('type')
+        if media_type in ('image', 'video'):
+            queryset = queryset.filter(mime_type__startswith=f'{media_type}/')
+        # Разбор как в MediaViewSet; некорректная граница не применяется, но пользователь об этом узнает
+        from tasks.filters import parse_float
+        for param, lookup in (('duration_min', 'duration__gte'), ('duration_max', 'duration__lte')):
+            value = self.request.GET.get(param)
+            if not value:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: parse_float(value)})
+            except ValueError:
+                messages.error(self.request, f'Некорректная длительность: «{value}». Укажите число секунд.')
+        return queryset.order_by('-uploaded_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['media_type'] = self.request.GET.get('type', '')
+        context['similar_to'] = getattr(self, 'similar_to', None)
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        context['page_params'] = params.urlencode()
+        return context
+
 class MediaCreateView(LoginRequiredMixin, CreateView):
     model = Media
     form_class = MediaForm
@@ -1317,7 +1345,7 @@ class HelpView(LoginRequiredMixin, TemplateView):
 # --- Positions (AJAX) ---
 
 @method_decorator(csrf_exempt, name='dispatch')
-class PositionCreateAjaxView(LoginRequiredMixin, CreateView):
+class PositionCreateAjaxView(LoginRequiredMixin, ThrottleMixin, CreateView):
     model = Position
     fields = ['name']
 
@@ -1689,7 +1717,7 @@ class EmployeeDeleteView(LoginRequiredMixin, PreserveQueryParamsMixin, DeleteVie
 
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(require_POST, name='dispatch')
-class TaskStatusUpdateAjaxView(LoginRequiredMixin, UpdateView):
+class TaskStatusUpdateAjaxView(LoginRequiredMixin, ThrottleMixin, UpdateView):
     model = Task
     fields = ['status']
 
@@ -1714,7 +1742,7 @@ class TaskStatusUpdateAjaxView(LoginRequiredMixin, UpdateView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(require_POST, name='dispatch')
-class TaskStageMediaUploadAjaxView(LoginRequiredMixin, TemplateView):
+class TaskStageMediaUploadAjaxView(LoginRequiredMixin, ThrottleMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         stage_id = kwargs.get('pk')
         try:
@@ -1773,15 +1801,18 @@ def generate_qr_code(request, pk):
     target_domain = None
     
     if hasattr(request, 'tenant'):
+        # Домены организации уже загружены вместе с ней (customers/tenant_cache.py)
+        domains = get_tenant_domains(request.tenant)
+
         # 1. Ищем основной домен
-        primary = request.tenant.domains.filter(is_primary=True).first()
+        primary = next((domain for domain in domains if domain.is_primary), None)
         if primary:
             target_domain = primary.domain
             
         # 2. Если мы на localhost/127.0.0.1 (разработка), пытаемся найти nip.io домен
         if 'localhost' in host or '127.0.0.1' in host:
             nip_domain = None
-            for domain in request.tenant.domains.all():
+            for domain in domains:
                 if 'nip.io' in domain.domain:
                     nip_domain = domain.domain
                     break
@@ -1848,7 +1879,7 @@ def quick_login(request, token):
 
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(require_POST, name='dispatch')
-class TaskStageCreateAjaxView(LoginRequiredMixin, TemplateView):
+class TaskStageCreateAjaxView(LoginRequiredMixin, ThrottleMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         task_id = kwargs.get('pk')
         try:
@@ -1884,7 +1915,7 @@ class TaskStageCreateAjaxView(LoginRequiredMixin, TemplateView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(require_POST, name='dispatch')
-class TaskStageStatusUpdateAjaxView(LoginRequiredMixin, TemplateView):
+class TaskStageStatusUpdateAjaxView(LoginRequiredMixin, ThrottleMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         stage_id = kwargs.get('pk')
         try:
@@ -1926,7 +1957,7 @@ class TaskStageStatusUpdateAjaxView(LoginRequiredMixin, TemplateView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(require_POST, name='dispatch')
-class TaskStageToggleAjaxView(LoginRequiredMixin, TemplateView):
+class TaskStageToggleAjaxView(LoginRequiredMixin, ThrottleMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         stage_id = kwargs.get('pk')
         try:
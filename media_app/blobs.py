@@ -0,0 +1,100 @@
+"""
+Хранение медиа по хэшу содержимого с подсчетом ссылок.
+
+Файл лежит в хранилище тенанта по пути
+    tenant_media/ГГГГ/ММ/ab/<sha256>.<расширение>
+и описывается строкой MediaBlob. Каждая запись Media, ссылающаяся на blob,
+увеличивает ref_count; файл удаляется с диска, когда уходит последняя ссылка.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db.models import F, Q, Sum
+
+from customers.sharding import tenant_atomic
+from .deletion import cancel_file_deletions, enqueue_file_deletions
+from .models import Media, MediaBlob, sharded_media_path
+
+
+def blob_name(sha256, ext, when=None):
+    """Месяц первой загрузки и первые символы хэша: tenant_media/ГГГГ/ММ/ab/<sha256>.расш"""
+    return sharded_media_path(sha256, ext, when)
+
+
+def hash_file(file):
+    """SHA-256 и размер файла, читаются потоково частями"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def acquire_blob(sha256, size, ext, write, name=None):
+    """
+    Возвращает MediaBlob для содержимого с увеличенным ref_count.
+    write(name) вызывается, только если такого содержимого еще нет в хранилище.
+    name — имя для нового blob, если файл уже записан заранее (прямая загрузка).
+    """
+    with tenant_atomic():
+        MediaBlob.objects.get_or_create(
+            sha256=sha256,
+            defaults={'name': name or blob_name(sha256, ext), 'size': size},
+        )
+        blob = MediaBlob.objects.select_for_update().get(sha256=sha256)
+        # Файл мог остаться в очереди удаления после ухода последней ссылки
+        cancel_file_deletions([blob.name])
+        if not default_storage.exists(blob.name):
+            write(blob.name)
+        blob.ref_count += 1
+        blob.save(update_fields=['ref_count'])
+        return blob
+
+
+def store_file(field_file):
+    """Сохраняет еще не записанный файл Media по хэшу содержимого"""
+    upload = field_file.file
+    sha256, size = hash_file(upload)
+    ext = os.path.splitext(field_file.name or '')[1]
+
+    def write(name):
+        default_storage.save(name, upload)
+
+    blob = acquire_blob(sha256, size, ext, write)
+    field_file.name = blob.name
+    field_file._committed = True
+    return blob
+
+
+def release_blob(blob_id, derivatives=None):
+    """
+    Уменьшает ref_count. Когда ссылок не осталось, удаляет запись и ставит
+    сам файл вместе с миниатюрами в очередь удаления.
+    """
+    with tenant_atomic():
+        blob = MediaBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        blob.ref_count = max(blob.ref_count - 1, 0)
+        # Реальные ссылки важнее счетчика: так счетчик сам исправляется после сбоев
+        if blob.ref_count > 0 or Media.objects.filter(Q(blob_id=blob_id) | Q(original_blob_id=blob_id)).exists():
+            blob.save(update_fields=['ref_count'])
+            return
+        blob.delete()
+        enqueue_file_deletions([blob.name, *(derivatives or {}).values()])
+
+
+def get_storage_used():
+    """Занятое место в байтах: каждое содержимое считается один раз"""
+    blobs = MediaBlob.objects.aggregate(total=Sum('size'))['total'] or 0
+    legacy = Media.objects.filter(blob__isnull=True).aggregate(total=Sum('file_size'))['total'] or 0
+    return blobs + legacy
+
+
+def get_transcode_savings():
+    """Сколько байт сэкономило сжатие фотографий при загрузке"""
+    saved = Media.objects.filter(original_size__gt=F('file_size')) \
+        .aggregate(total=Sum(F('original_size') - F('file_size')))['total']
+    return saved or 0
@@ -0,0 +1,186 @@
+"""
+Отложенное удаление файлов тенантов.
+
+Пути к файлам добавляются в PendingFileDeletion (public-схема) в той же
+транзакции, что и удаление записей: при откате транзакции файлы остаются
+на месте, после коммита очередь разбирается пачками в фоне. Необработанные
+из-за сбоя записи дочищает manage.py gc_media.
+
+Чтобы транзакция оставалась одной, очередь тенанта хранится в публичной
+схеме базы его шарда (customers/sharding.py); после переноса организации
+старые записи остаются в прежнем шарде, поэтому разбираются все шарды.
+"""
+import logging
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils._os import safe_join
+
+from config.background import run_in_background
+from customers.models import PendingFileDeletion
+from customers.sharding import shard_aliases, shard_for_schema
+from .storage import is_local_storage
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+
+
+def enqueue_file_deletions(names, schema_name=None):
+    """Ставит файлы хранилища тенанта в очередь на удаление после коммита"""
+    schema_name = schema_name or connection.schema_name
+    rows = [PendingFileDeletion(schema_name=schema_name, name=name) for name in names if name]
+    if not rows:
+        return
+    PendingFileDeletion.objects.using(shard_for_schema(schema_name)).bulk_create(rows)
+    schedule_processing(schema_name)
+
+
+def cancel_file_deletions(names, schema_name=None):
+    """
+    Убирает файлы из очереди (файл снова нужен). Если файл как раз удаляется,
+    ждет завершения, после чего вызывающий код должен проверить его наличие.
+    """
+    schema_name = schema_name or connection.schema_name
+    PendingFileDeletion.objects.using(shard_for_schema(schema_name)) \
+        .filter(schema_name=schema_name, name__in=names).delete()
+
+
+def enqueue_tenant_directory_deletion(schema_name):
+    """Весь каталог тенанта (после удаления организации или ее схемы)"""
+    if schema_name == 'public':
+        return
+    # Организация уже удалена: запись в default, ее разбор тоже проходит по всем шардам
+    PendingFileDeletion.objects.create(schema_name=schema_name, name='')
+    schedule_processing(schema_name)
+
+
+def schedule_processing(schema_name):
+    run_in_background(process_file_deletions, schema_name, dedupe_key=('file_deletions', schema_name))
+
+
+def tenant_root(schema_name):
+    return safe_join(settings.MEDIA_ROOT, schema_name)
+
+
+def delete_path(schema_name, name):
+    """Удаляет файл (или весь каталог тенанта при пустом name); вызывается в схеме тенанта"""
+    if not is_local_storage():
+        if name:
+            default_storage.delete(name)
+        else:
+            default_storage.delete_prefix('tenant_media')
+        return
+
+    if not name:
+        # Только файлы приложения: MEDIA_ROOT совпадает с BASE_DIR, и имя
+        # схемы может совпасть с каталогом проекта
+        root = tenant_root(schema_name)
+        shutil.rmtree(safe_join(root, 'tenant_media'))
+        try:
+            os.rmdir(root)
+        except OSError:
+            pass
+        return
+    try:
+        os.remove(safe_join(tenant_root(schema_name), name))
+    except FileNotFoundError:
+        pass
+
+
+def process_file_deletions(schema_name):
+    """Разбирает очередь схемы во всех шардах. Возвращает количество удаленных записей."""
+    return sum(process_shard_deletions(schema_name, alias) for alias in shard_aliases())
+
+
+def process_shard_deletions(schema_name, alias):
+    processed = 0
+    last_id = 0
+    queue = PendingFileDeletion.objects.using(alias)
+    while True:
+        with transaction.atomic(using=alias):
+            batch = list(
+                queue.select_for_update(skip_locked=True)
+                .filter(schema_name=schema_name, id__gt=last_id, attempts__lt=MAX_ATTEMPTS)
+                .order_by('id')[:BATCH_SIZE]
+            )
+            if not batch:
+                return processed
+
+            done = []
+            for item in batch:
+                try:
+                    delete_path(schema_name, item.name)
+                    done.append(item.id)
+                except FileNotFoundError:
+                    done.append(item.id)
+                except (OSError, ValueError) as e:
+                    logger.warning('Failed to delete %s/%s: %s', schema_name, item.name, e)
+                    queue.filter(id=item.id).update(
+                        attempts=F('attempts') + 1, last_error=str(e)
+                    )
+            queue.filter(id__in=done).delete()
+            processed += len(done)
+            last_id = batch[-1].id
+
+
+def pending_schemas():
+    schemas = set()
+    for alias in shard_aliases():
+        schemas.update(
+            PendingFileDeletion.objects.using(alias).filter(attempts__lt=MAX_ATTEMPTS)
+            .values_list('schema_name', flat=True).distinct()
+        )
+    return schemas
+
+
+def referenced_names():
+    """Все пути хранилища текущей схемы, на которые ссылается БД"""
+    from .models import Media, MediaBlob, MediaUpload
+
+    names = set()
+    for file_name, derivatives in Media.objects.values_list('file', 'derivatives').iterator():
+        names.add(os.path.normpath(file_name))
+        names.update(os.path.normpath(name) for name in (derivatives or {}).values())
+    names.update(os.path.normpath(name) for name in MediaBlob.objects.values_list('name', flat=True).iterator())
+    for upload in MediaUpload.objects.filter(status='ACTIVE').only('id', 'storage_key').iterator():
+        names.add(os.path.normpath(upload.storage_key or upload.part_name))
+    return names
+
+
+def iter_tenant_files(schema_name):
+    """(имя, размер, время изменения) всех файлов tenant_media схемы"""
+    if not is_local_storage():
+        yield from default_storage.iter_objects('tenant_media/')
+        return
+
+    root = tenant_root(schema_name)
+    for dirpath, dirnames, filenames in os.walk(os.path.join(root, 'tenant_media')):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(path, root), st.st_size, st.st_mtime
+
+
+def find_orphan_files(schema_name, min_age_seconds):
+    """
+    Файлы в tenant_media схемы, на которые нет ссылок в БД.
+    Свежие файлы пропускаются: они могут принадлежать еще не закоммиченной загрузке.
+    Возвращает список (имя, размер).
+    """
+    referenced = referenced_names()
+    threshold = time.time() - min_age_seconds
+    orphans = []
+    for name, size, mtime in iter_tenant_files(schema_name):
+        if os.path.normpath(name) not in referenced and mtime < threshold:
+            orphans.append((name, size))
+    return orphans
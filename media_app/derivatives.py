@@ -0,0 +1,128 @@
+"""
+Производные файлы для медиа: миниатюры изображений и кадры-заставки видео.
+
+Производные лежат рядом с оригиналом в хранилище тенанта:
+    tenant_media/foo.jpg -> tenant_media/thumbs/foo_160.jpg, foo_320.jpg, ...
+Кадр видео извлекается через ffmpeg; если ffmpeg не установлен, видео
+помечается как SKIPPED и шаблоны показывают иконку вместо превью.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .models import Media
+from .storage import local_path, save_bytes
+
+logger = logging.getLogger(__name__)
+
+try:
+    # HEIC/HEIF с iPhone; без pillow-heif такие файлы просто не обрабатываются
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.heic', '.heif'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.webm', '.mkv', '.3gp'}
+
+
+def get_thumbnail_sizes():
+    return tuple(sorted(getattr(settings, 'MEDIA_THUMBNAIL_SIZES', (160, 320, 640))))
+
+
+def media_kind(name):
+    ext = os.path.splitext(name or '')[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    if ext in VIDEO_EXTENSIONS:
+        return 'video'
+    return None
+
+
+def derivative_name(name, size):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'thumbs', f'{stem}_{size}.jpg')
+
+
+def render_thumbnails(image, name):
+    """Сохраняет JPEG-миниатюры всех размеров, возвращает {размер: путь в хранилище}"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    derivatives = {}
+    for size in get_thumbnail_sizes():
+        thumb = image.copy()
+        thumb.thumbnail((size, size))
+        thumb_name = derivative_name(name, size)
+        buffer = BytesIO()
+        thumb.save(buffer, 'JPEG', quality=82, optimize=True)
+        save_bytes(thumb_name, buffer.getvalue())
+        derivatives[str(size)] = thumb_name
+    return derivatives
+
+
+def extract_poster_frame(video_path, frame_path):
+    """Кадр на первой секунде (или первый кадр для совсем коротких роликов)"""
+    ffmpeg = shutil.which('ffmpeg')
+    max_size = get_thumbnail_sizes()[-1]
+    for offset in ('1', '0'):
+        subprocess.run([
+            ffmpeg, '-y', '-loglevel', 'error', '-ss', offset, '-i', video_path,
+            '-frames:v', '1', '-vf', f'scale={max_size}:-2', frame_path,
+        ], check=True, timeout=getattr(settings, 'MEDIA_POSTER_TIMEOUT', 60), capture_output=True)
+        if os.path.getsize(frame_path) > 0:
+            return
+    raise ValueError('ffmpeg did not produce a frame')
+
+
+def generate_derivatives(media_id):
+    media = Media.objects.filter(pk=media_id).first()
+    if media is None or not media.file:
+        return
+
+    if media.blob_id:
+        # То же содержимое уже обработано для другой записи: миниатюры общие
+        ready = Media.objects.filter(blob_id=media.blob_id, derivatives_status='READY') \
+            .exclude(pk=media.pk).values_list('derivatives', flat=True).first()
+        if ready:
+            Media.objects.filter(pk=media_id).update(derivatives=ready, derivatives_status='READY')
+            return
+
+    name = media.file.name
+    kind = media_kind(name)
+    derivatives = {}
+    status = 'READY'
+    if kind not in ('image', 'video') or (kind == 'video' and not shutil.which('ffmpeg')):
+        Media.objects.filter(pk=media_id).update(derivatives=derivatives, derivatives_status='SKIPPED')
+        return
+
+    try:
+        with local_path(name) as path:
+            if kind == 'image':
+                with Image.open(path) as image:
+                    # Для JPEG декодируем сразу в уменьшенном масштабе
+                    image.draft('RGB', (get_thumbnail_sizes()[-1],) * 2)
+                    derivatives = render_thumbnails(image, name)
+            else:
+                fd, frame_path = tempfile.mkstemp(suffix='.jpg')
+                os.close(fd)
+                try:
+                    extract_poster_frame(path, frame_path)
+                    with Image.open(frame_path) as image:
+                        derivatives = render_thumbnails(image, name)
+                finally:
+                    os.remove(frame_path)
+    except Exception:
+        logger.exception('Failed to generate derivatives for media %s', media_id)
+        status = 'FAILED'
+
+    # update() вместо save(): не трогаем file_size/title и не вызываем сигналы повторно
+    Media.objects.filter(pk=media_id).update(derivatives=derivatives, derivatives_status=status)
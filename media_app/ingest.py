@@ -0,0 +1,122 @@
+"""
+Обработка нового медиа-файла в фоне после загрузки.
+
+1. Сжатие фотографий, если оно включено у организации (Client.image_transcode_*):
+   уменьшение до максимальной стороны, перекодирование в WebP/JPEG без EXIF.
+   Оригинал сохраняется, только если включено keep_original_images.
+2. Миниатюры и кадры-заставки (media_app/derivatives.py).
+3. Технические метаданные и перцептивный хэш (media_app/metadata.py).
+
+Загрузка не ждет обработки: задача выполняется в пуле config/background.py.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.db import connection
+from PIL import Image, ImageOps
+
+from config.background import run_in_background
+from customers.sharding import tenant_atomic
+from .blobs import acquire_blob, release_blob
+from .derivatives import generate_derivatives
+from .metadata import extract_metadata
+from .models import Media
+from .storage import local_path, save_bytes
+
+logger = logging.getLogger(__name__)
+
+# GIF не трогаем: Pillow сохранит только первый кадр анимации
+TRANSCODABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.heic', '.heif'}
+FORMAT_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+
+def get_transcode_options():
+    """Настройки сжатия текущей организации или None, если сжатие выключено"""
+    from customers.models import Client
+    options = Client.objects.filter(schema_name=connection.schema_name).values(
+        'image_transcode_enabled', 'image_transcode_format', 'image_max_dimension',
+        'image_quality', 'keep_original_images',
+    ).first()
+    if not options or not options['image_transcode_enabled']:
+        return None
+    return options
+
+
+def encode_image(path, image_format, max_dimension, quality):
+    """Уменьшенное и перекодированное изображение (bytes); метаданные не копируются"""
+    with Image.open(path) as image:
+        # Для JPEG декодируем сразу в уменьшенном масштабе
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if image_format == 'WEBP' and has_alpha:
+            image = image.convert('RGBA')
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        buffer = BytesIO()
+        if image_format == 'WEBP':
+            image.save(buffer, 'WEBP', quality=quality, method=4)
+        else:
+            image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+
+def transcode_image(media_id, options):
+    """Сжимает фотографию и подменяет содержимое Media. Возвращает сэкономленные байты."""
+    media = Media.objects.filter(pk=media_id).first()
+    if media is None or not media.blob_id or media.original_size is not None:
+        return 0
+    if os.path.splitext(media.file.name)[1].lower() not in TRANSCODABLE_EXTENSIONS:
+        return 0
+
+    image_format = options['image_transcode_format']
+    quality = min(max(options['image_quality'], 1), 100)
+    with local_path(media.file.name) as path:
+        data = encode_image(path, image_format, options['image_max_dimension'], quality)
+
+    with tenant_atomic():
+        media = Media.objects.select_for_update().get(pk=media_id)
+        if media.original_size is not None:
+            return 0
+        if len(data) >= media.file_size:
+            # Файл уже достаточно компактный: оставляем как есть
+            Media.objects.filter(pk=media_id).update(original_size=media.file_size)
+            return 0
+
+        blob = acquire_blob(
+            hashlib.sha256(data).hexdigest(), len(data), FORMAT_EXTENSIONS[image_format],
+            lambda name: save_bytes(name, data),
+        )
+        old_blob_id = media.blob_id
+        keep_original = options['keep_original_images']
+        Media.objects.filter(pk=media_id).update(
+            blob=blob, file=blob.name, file_size=len(data), original_size=media.file_size,
+            original_blob_id=old_blob_id if keep_original else None,
+        )
+        if not keep_original:
+            release_blob(old_blob_id)
+        return media.file_size - len(data)
+
+
+def process_new_media(media_id):
+    options = get_transcode_options()
+    if options:
+        try:
+            saved = transcode_image(media_id, options)
+            if saved:
+                logger.info('Media %s transcoded, saved %s bytes', media_id, saved)
+        except Exception:
+            # Не удалось сжать: остается исходный файл, миниатюры строим как обычно
+            logger.exception('Failed to transcode media %s', media_id)
+    generate_derivatives(media_id)
+    # После миниатюр: хэш видео считается по кадру-заставке
+    extract_metadata(media_id)
+
+
+def schedule_ingest(media):
+    run_in_background(process_new_media, media.pk)
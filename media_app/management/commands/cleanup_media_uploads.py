@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+from customers.models import Client
+from media_app.uploads import cleanup_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Удаляет незавершенные загрузки по частям и их временные файлы во всех тенантах'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int,
+            default=getattr(settings, 'MEDIA_UPLOAD_STALE_HOURS', 24),
+            help='Через сколько часов без активности загрузка считается брошенной'
+        )
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public')
+        total = 0
+
+        for client in clients:
+            with schema_context(client.schema_name):
+                removed = cleanup_stale_uploads(options['hours'])
+            if removed:
+                self.stdout.write(f"{client.name} ({client.schema_name}): удалено {removed}")
+            total += removed
+
+        self.stdout.write(self.style.SUCCESS(f"Всего удалено незавершенных загрузок: {total}"))
@@ -0,0 +1,101 @@
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django_tenants.utils import schema_context
+from customers.models import Client
+from customers.sharding import tenant_atomic
+from media_app.blobs import acquire_blob, hash_file
+from media_app.deletion import enqueue_file_deletions
+from media_app.derivatives import generate_derivatives
+from media_app.storage import is_local_storage
+from media_app.models import Media, MediaBlob
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит существующие медиа-файлы в хранилище по хэшу содержимого и удаляет дубликаты. '
+        'Обрабатывает только еще не перенесенные записи, поэтому может быть запущена повторно после прерывания.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+
+    def handle(self, *args, **options):
+        if not is_local_storage():
+            raise CommandError('Команда работает только с файлами на диске (MEDIA_STORAGE_BACKEND=local).')
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+
+        total_moved = total_freed = 0
+        for client in clients:
+            with schema_context(client.schema_name):
+                moved, freed, missing = self.dedupe_schema()
+            if moved or missing:
+                self.stdout.write(
+                    f"{client.name} ({client.schema_name}): перенесено {moved}, "
+                    f"освобождено {freed / 1024 ** 2:.1f} МБ, файлов не найдено {missing}"
+                )
+            total_moved += moved
+            total_freed += freed
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Всего перенесено файлов: {total_moved}, освобождено {total_freed / 1024 ** 2:.1f} МБ"
+        ))
+
+    def dedupe_schema(self):
+        moved = freed = missing = 0
+        handled = set()
+
+        for media in Media.objects.filter(blob__isnull=True).exclude(file='').iterator():
+            if media.pk in handled:
+                continue
+            name = media.file.name
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+
+            path = default_storage.path(name)
+            with default_storage.open(name, 'rb') as f:
+                sha256, size = hash_file(f)
+
+            written = []
+
+            def link(blob_name):
+                # Исходный файл удаляется только после коммита: при откате Media.file остается верным
+                target = default_storage.path(blob_name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copyfile(path, target)
+                written.append(blob_name)
+
+            with tenant_atomic():
+                blob = acquire_blob(sha256, size, os.path.splitext(name)[1], link)
+                old_derivatives = list((media.derivatives or {}).values())
+                # На один старый файл могут ссылаться несколько записей
+                same_file = Media.objects.filter(file=name, blob__isnull=True)
+                ids = list(same_file.values_list('id', flat=True))
+                same_file.update(
+                    file=blob.name, blob=blob, file_size=size,
+                    derivatives={}, derivatives_status='PENDING',
+                )
+                if len(ids) > 1:
+                    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + len(ids) - 1)
+                enqueue_file_deletions(old_derivatives)
+
+            if os.path.exists(path):
+                os.remove(path)
+                if not written:
+                    # Такое содержимое уже хранилось: копия больше не нужна
+                    freed += size
+            for media_id in ids:
+                generate_derivatives(media_id)
+            handled.update(ids)
+            moved += len(ids)
+
+        return moved, freed, missing
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django_tenants.utils import schema_context
+from customers.models import Client
+from media_app.deletion import delete_path, find_orphan_files, process_file_deletions
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает очередь удаления файлов и удаляет файлы tenant_media, '
+        'на которые нет ссылок в БД. Тенанты обрабатываются параллельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+        parser.add_argument('--workers', type=int, default=4, help='Количество тенантов, обрабатываемых одновременно')
+        parser.add_argument(
+            '--min-age-hours', type=float, default=24,
+            help='Не трогать файлы моложе указанного возраста (могут относиться к незавершенной загрузке)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+        clients = list(clients)
+
+        total_files = total_bytes = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = {pool.submit(self.collect_schema, client.schema_name, options): client for client in clients}
+            for future in as_completed(futures):
+                client = futures[future]
+                try:
+                    queued, orphans, freed = future.result()
+                except Exception as e:
+                    self.stderr.write(f"{client.name} ({client.schema_name}): ошибка {e}")
+                    continue
+                if queued or orphans:
+                    self.stdout.write(
+                        f"{client.name} ({client.schema_name}): из очереди {queued}, "
+                        f"без ссылок {orphans} ({freed / 1024 ** 2:.1f} МБ)"
+                    )
+                total_files += orphans
+                total_bytes += freed
+
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} файлов без ссылок: {total_files} ({total_bytes / 1024 ** 2:.1f} МБ)"
+        ))
+
+    def collect_schema(self, schema_name, options):
+        try:
+            with schema_context(schema_name):
+                queued = 0 if options['dry_run'] else process_file_deletions(schema_name)
+                orphans = find_orphan_files(schema_name, options['min_age_hours'] * 3600)
+                if not options['dry_run']:
+                    for name, size in orphans:
+                        delete_path(schema_name, name)
+            return queued, len(orphans), sum(size for name, size in orphans)
+        finally:
+            # Каждый поток работает со своим соединением
+            connection.close()
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+from customers.models import Client
+from media_app.models import Media
+from media_app.derivatives import generate_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры и кадры-заставки для медиа-файлов, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Повторить файлы, для которых построение завершилось ошибкой'
+        )
+        parser.add_argument(
+            '--all', action='store_true', dest='rebuild',
+            help='Перестроить миниатюры для всех файлов (например, после смены MEDIA_THUMBNAIL_SIZES)'
+        )
+
+    def handle(self, *args, **options):
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+
+        statuses = ['PENDING']
+        if options['retry_failed']:
+            statuses.append('FAILED')
+
+        total = 0
+        for client in clients:
+            with schema_context(client.schema_name):
+                media = Media.objects.all()
+                if not options['rebuild']:
+                    media = media.filter(derivatives_status__in=statuses)
+                processed = 0
+                for media_id in media.values_list('id', flat=True).iterator():
+                    generate_derivatives(media_id)
+                    processed += 1
+            if processed:
+                self.stdout.write(f"{client.name} ({client.schema_name}): обработано {processed}")
+            total += processed
+
+        self.stdout.write(self.style.SUCCESS(f"Всего обработано медиа-файлов: {total}"))
@@ -0,0 +1,99 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context
+from customers.models import Client
+from customers.sharding import tenant_atomic
+from media_app.blobs import blob_name
+from media_app.derivatives import derivative_name
+from media_app.storage import is_local_storage
+from media_app.models import Media, MediaBlob
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит файлы в шардированные каталоги tenant_media/ГГГГ/ММ/ab/ и обновляет пути в БД. '
+        'Каждый файл переносится в отдельной транзакции, поэтому команду можно прервать и запустить снова. '
+        'Файлы, еще не перенесенные в хранилище по хэшу, сначала обрабатывает dedupe_media.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Обработать только указанную схему тенанта')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать файлы для переноса')
+
+    def handle(self, *args, **options):
+        if not is_local_storage():
+            raise CommandError('Команда работает только с файлами на диске (MEDIA_STORAGE_BACKEND=local).')
+        clients = Client.objects.exclude(schema_name='public')
+        if options['schema']:
+            clients = clients.filter(schema_name=options['schema'])
+
+        total = 0
+        for client in clients:
+            with schema_context(client.schema_name):
+                moved, missing = self.shard_schema(options['dry_run'])
+            if moved or missing:
+                self.stdout.write(f"{client.name} ({client.schema_name}): перенесено {moved}, файлов не найдено {missing}")
+            total += moved
+
+        verb = 'Будет перенесено' if options['dry_run'] else 'Перенесено'
+        self.stdout.write(self.style.SUCCESS(f"{verb} файлов: {total}"))
+
+    def shard_schema(self, dry_run):
+        moved = missing = 0
+        for blob in MediaBlob.objects.order_by('id').iterator():
+            target = blob_name(blob.sha256, os.path.splitext(blob.name)[1], blob.created_at)
+            if blob.name == target:
+                continue
+            if dry_run:
+                moved += 1
+                continue
+            if self.move_blob(blob, target):
+                moved += 1
+            else:
+                missing += 1
+        return moved, missing
+
+    def move_blob(self, blob, target):
+        source_path = default_storage.path(blob.name)
+        target_path = default_storage.path(target)
+        # После прерванного запуска файл мог уже лежать на новом месте
+        if not os.path.exists(source_path) and not os.path.exists(target_path):
+            return False
+
+        with tenant_atomic():
+            blob = MediaBlob.objects.select_for_update().get(pk=blob.pk)
+            old_name = blob.name
+
+            if os.path.exists(source_path):
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                os.replace(source_path, target_path)
+
+            for media in Media.objects.filter(blob=blob).only('id', 'derivatives'):
+                derivatives = {}
+                for size, thumb_name in (media.derivatives or {}).items():
+                    new_thumb = derivative_name(target, size)
+                    thumb_source = default_storage.path(thumb_name)
+                    if os.path.exists(thumb_source):
+                        thumb_target = default_storage.path(new_thumb)
+                        os.makedirs(os.path.dirname(thumb_target), exist_ok=True)
+                        os.replace(thumb_source, thumb_target)
+                    derivatives[size] = new_thumb
+                Media.objects.filter(pk=media.pk).update(file=target, derivatives=derivatives)
+
+            blob.name = target
+            blob.save(update_fields=['name'])
+
+        # Каталог миниатюр вложен в каталог файла: удаляем снизу вверх
+        self.remove_empty_dirs(os.path.join(os.path.dirname(default_storage.path(old_name)), 'thumbs'))
+        return True
+
+    def remove_empty_dirs(self, path):
+        root = default_storage.path('tenant_media')
+        while path.startswith(root) and path != root:
+            try:
+                os.rmdir(path)
+            except OSError:
+                return
+            path = os.path.dirname(path)
@@ -0,0 +1,164 @@
+"""
+Технические метаданные медиа-файла: MIME-тип, размеры в пикселях,
+длительность и кодек видео, перцептивный хэш.
+
+Извлекаются в фоне после загрузки (media_app/ingest.py) и хранятся в
+индексированных столбцах Media, чтобы фильтры списка и поиск похожих
+файлов не открывали файлы во время запроса.
+
+Перцептивный хэш — 64-битный dHash (16 hex-символов) по изображению или
+кадру-заставке видео. Похожие файлы отличаются в нескольких битах;
+хэш разбит на 4 части по 16 бит с индексом на каждой (см. Media.Meta):
+если расстояние Хэмминга не больше 3, хотя бы одна часть совпадает точно,
+и кандидатов можно выбрать по индексу.
+"""
+import json
+import logging
+import mimetypes
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Substr
+from PIL import Image, ImageOps
+
+from .derivatives import media_kind
+from .models import Media
+from .storage import local_path
+
+logger = logging.getLogger(__name__)
+
+PHASH_BANDS = 4
+PHASH_BAND_LENGTH = 4
+# Больше 3 отличающихся бит поиск по частям хэша не гарантирует
+NEAR_DUPLICATE_DISTANCE = PHASH_BANDS - 1
+
+
+def image_phash(image):
+    """dHash: сравнение соседних пикселей уменьшенного до 9x8 серого изображения"""
+    image = ImageOps.exif_transpose(image).convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return f'{value:016x}'
+
+
+def phash_distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def probe_video(path):
+    """Длительность, размеры и кодек первой видеодорожки через ffprobe"""
+    output = subprocess.run([
+        shutil.which('ffprobe'), '-v', 'error', '-print_format', 'json',
+        '-show_format', '-show_streams', '-select_streams', 'v:0', path,
+    ], check=True, timeout=getattr(settings, 'MEDIA_POSTER_TIMEOUT', 60), capture_output=True).stdout
+    info = json.loads(output or b'{}')
+    stream = (info.get('streams') or [{}])[0]
+    duration = stream.get('duration') or info.get('format', {}).get('duration')
+    width, height = stream.get('width'), stream.get('height')
+    # Видео с телефона, снятое вертикально, хранится повернутым
+    rotation = stream.get('tags', {}).get('rotate') or next(
+        (s.get('rotation') for s in stream.get('side_data_list', []) if 'rotation' in s), 0)
+    if width and height and abs(int(float(rotation))) % 180 == 90:
+        width, height = height, width
+    return {
+        'duration': float(duration) if duration else None,
+        'width': width,
+        'height': height,
+        'codec': stream.get('codec_name', ''),
+    }
+
+
+def poster_phash(media):
+    """Хэш по наибольшей миниатюре: файл маленький, а у видео это единственный кадр"""
+    if not media.derivatives:
+        return ''
+    name = media.derivatives[str(max(int(size) for size in media.derivatives))]
+    with media.file.storage.open(name, 'rb') as f, Image.open(f) as image:
+        return image_phash(image)
+
+
+def extract_metadata(media_id):
+    media = Media.objects.filter(pk=media_id).first()
+    if media is None or not media.file:
+        return
+
+    if media.blob_id:
+        # То же содержимое уже разобрано для другой записи
+        ready = Media.objects.filter(blob_id=media.blob_id, metadata_status='READY').exclude(pk=media.pk) \
+            .values('mime_type', 'width', 'height', 'duration', 'codec', 'phash').first()
+        if ready:
+            Media.objects.filter(pk=media_id).update(metadata_status='READY', **ready)
+            return
+
+    name = media.file.name
+    kind = media_kind(name)
+    values = {'mime_type': mimetypes.guess_type(name)[0] or 'application/octet-stream'}
+    status = 'READY'
+    if kind is None or (kind == 'video' and not shutil.which('ffprobe')):
+        Media.objects.filter(pk=media_id).update(metadata_status='SKIPPED', **values)
+        return
+
+    try:
+        with local_path(name) as path:
+            if kind == 'image':
+                with Image.open(path) as image:
+                    values['mime_type'] = image.get_format_mimetype() or values['mime_type']
+                    values['codec'] = image.format or ''
+                    width, height = image.size
+                    # EXIF Orientation 5-8: снимок повернут на 90°
+                    if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+                        width, height = height, width
+                    values['width'], values['height'] = width, height
+                    if not media.derivatives:
+                        image.draft('RGB', (64, 64))
+                        values['phash'] = image_phash(image)
+            else:
+                values.update(probe_video(path))
+        if 'phash' not in values:
+            values['phash'] = poster_phash(media)
+    except Exception:
+        logger.exception('Failed to extract metadata for media %s', media_id)
+        status = 'FAILED'
+
+    Media.objects.filter(pk=media_id).update(metadata_status=status, **values)
+
+
+def phash_band_filter(phash):
+    """Условие «хотя бы одна 16-битная часть хэша совпадает» по индексам Media"""
+    condition = Q()
+    for band in range(PHASH_BANDS):
+        start = band * PHASH_BAND_LENGTH
+        condition |= Q(**{f'phash_{band}': phash[start:start + PHASH_BAND_LENGTH]})
+    return condition
+
+
+def annotate_phash_bands(queryset):
+    """Те же выражения, что и в индексах Media.Meta, чтобы запрос их использовал"""
+    return queryset.annotate(**{
+        f'phash_{band}': Substr('phash', band * PHASH_BAND_LENGTH + 1, PHASH_BAND_LENGTH)
+        for band in range(PHASH_BANDS)
+    })
+
+
+def find_near_duplicates(media, queryset=None, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """Похожие файлы (без самого media), от самых близких: [(Media, расстояние), ...]"""
+    if not media.phash:
+        return []
+    max_distance = min(max_distance, NEAR_DUPLICATE_DISTANCE)
+    queryset = queryset if queryset is not None else Media.objects.all()
+    candidates = annotate_phash_bands(queryset.exclude(pk=media.pk).exclude(phash='')) \
+        .filter(phash_band_filter(media.phash))
+    matches = []
+    for candidate in candidates:
+        distance = phash_distance(media.phash, candidate.phash)
+        if distance <= max_distance:
+            matches.append((candidate, distance))
+    matches.sort(key=lambda item: (item[1], -item[0].pk))
+    return matches
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0006_alter_media_stage_alter_media_task'),
+        ('tasks', '0015_alter_operation_options_operation_data_type_and_more'),
+        ('users_app', '0011_remove_tenantuser_can_delete_media'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['task', '-uploaded_at'], name='media_task_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['stage', '-uploaded_at'], name='media_stage_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at'], name='media_author_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['-uploaded_at'], name='media_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:44
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0007_media_filter_indexes'),
+        ('tasks', '0016_taskstagepause_task_filter_indexes'),
+        ('users_app', '0011_remove_tenantuser_can_delete_media'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Исходное имя файла')),
+                ('total_size', models.BigIntegerField(verbose_name='Размер файла (байт)')),
+                ('received_size', models.BigIntegerField(default=0, verbose_name='Получено (байт)')),
+                ('sha256', models.CharField(max_length=64, verbose_name='Контрольная сумма SHA-256')),
+                ('status', models.CharField(choices=[('ACTIVE', 'Загружается'), ('COMPLETE', 'Завершена'), ('ABORTED', 'Отменена')], default='ACTIVE', max_length=20, verbose_name='Статус')),
+                ('title', models.CharField(blank=True, max_length=200, verbose_name='Название')),
+                ('recording_start', models.DateTimeField(blank=True, null=True, verbose_name='Начало съемки')),
+                ('recording_end', models.DateTimeField(blank=True, null=True, verbose_name='Конец съемки')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('media', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='media_app.media', verbose_name='Медиа-файл')),
+                ('stage', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_uploads', to='tasks.taskstage', verbose_name='Этап')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_uploads', to='tasks.task', verbose_name='Задача')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_uploads', to='users_app.tenantuser', verbose_name='Загрузил')),
+            ],
+            options={
+                'verbose_name': 'Загрузка по частям',
+                'verbose_name_plural': 'Загрузки по частям',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
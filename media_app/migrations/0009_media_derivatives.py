@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0008_mediaupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='media',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Миниатюры'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='derivatives_status',
+            field=models.CharField(choices=[('PENDING', 'Ожидает обработки'), ('READY', 'Готово'), ('SKIPPED', 'Не поддерживается'), ('FAILED', 'Ошибка')], db_index=True, default='PENDING', max_length=20, verbose_name='Статус миниатюр'),
+        ),
+    ]
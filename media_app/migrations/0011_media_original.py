@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0010_media_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='media',
+            name='original_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='original_for', to='media_app.mediablob', verbose_name='Оригинал'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='original_size',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Размер до сжатия (байт)'),
+        ),
+    ]
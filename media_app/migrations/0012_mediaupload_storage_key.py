@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0011_media_original'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaupload',
+            name='storage_key',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Объект в хранилище'),
+        ),
+    ]
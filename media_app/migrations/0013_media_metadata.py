@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:00
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0012_mediaupload_storage_key'),
+        ('tasks', '0016_taskstagepause_task_filter_indexes'),
+        ('users_app', '0011_remove_tenantuser_can_delete_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='media',
+            name='codec',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Кодек'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='Длительность (с)'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота (px)'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='metadata_status',
+            field=models.CharField(choices=[('PENDING', 'Ожидает обработки'), ('READY', 'Готово'), ('SKIPPED', 'Не поддерживается'), ('FAILED', 'Ошибка')], db_index=True, default='PENDING', max_length=20, verbose_name='Статус метаданных'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='mime_type',
+            field=models.CharField(blank=True, db_index=True, max_length=100, verbose_name='MIME-тип'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='phash',
+            field=models.CharField(blank=True, max_length=16, verbose_name='Перцептивный хэш'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина (px)'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['mime_type', '-uploaded_at'], name='media_mime_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['duration'], name='media_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(django.db.models.functions.text.Substr('phash', 1, 4), name='media_phash_0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(django.db.models.functions.text.Substr('phash', 5, 4), name='media_phash_1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(django.db.models.functions.text.Substr('phash', 9, 4), name='media_phash_2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(django.db.models.functions.text.Substr('phash', 13, 4), name='media_phash_3_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_app', '0013_media_metadata'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='media',
+            name='media_mime_uploaded_idx',
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(fields=['mime_type', '-uploaded_at'], name='media_mime_uploaded_idx', opclasses=['varchar_pattern_ops', '']),
+        ),
+    ]
@@ -1,43 +1,67 @@
 from django.db import models
+from django.db.models.functions import Substr
 from users_app.models import TenantUser
+from customers.sharding import tenant_atomic
 
 
 from tasks.models import Task, TaskStage
 import os
+import uuid
 from django.utils import timezone
 
+def sharded_media_path(key, ext, when=None):
+    """
+    Путь в хранилище тенанта: tenant_media/ГГГГ/ММ/ab/<key>.расширение.
+    Каталоги по месяцам и первым символам ключа (хэша) не дают одной
+    директории разрастись до сотен тысяч файлов.
+    """
+    when = timezone.localtime(when) if when else timezone.localtime()
+    return os.path.join('tenant_media', when.strftime('%Y'), when.strftime('%m'), key[:2], f'{key}{ext.lower()}')
+
+
 def get_media_upload_path(instance, filename):
     """
-    Формирует путь и имя файла: кто_что_когда.расширение
+    Имя файла без обращений к связанным объектам: случайный ключ в
+    шардированном каталоге. Обычно не используется: новые файлы сохраняются
+    по хэшу содержимого (см. media_app/blobs.py).
     """
-    who = "unknown"
-    if instance.uploaded_by:
-        who = instance.uploaded_by.get_full_name() or instance.uploaded_by.username
-    
-    what = "media"
-    if instance.stage:
-        what = instance.stage.name
-    elif instance.task:
-        what = instance.task.title
-        
-    when = timezone.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Очистка имени от спецсимволов для файловой системы
-    import re
-    def slugify(value):
-        value = re.sub(r'[^\w\s-]', '', value).strip().lower()
-        return re.sub(r'[-\s]+', '_', value)
-
-    ext = os.path.splitext(filename)[1]
-    new_filename = f"{slugify(who)}_{slugify(what)}_{when}{ext}"
-    
-    return os.path.join('tenant_media/', new_filename)
+    return sharded_media_path(uuid.uuid4().hex, os.path.splitext(filename)[1])
+
+class MediaBlob(models.Model):
+    """
+    Содержимое файла, адресуемое по SHA-256. Одинаковые файлы, загруженные
+    к разным задачам и этапам, хранятся на диске один раз.
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='Контрольная сумма SHA-256')
+    name = models.CharField(max_length=255, verbose_name='Путь в хранилище')
+    size = models.BigIntegerField(default=0, verbose_name='Размер (байт)')
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Содержимое файла'
+        verbose_name_plural = 'Содержимое файлов'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count})"
+
 
 class Media(models.Model):
     """Модель медиа-файла для тенанта"""
+    DERIVATIVES_STATUS_CHOICES = [
+        ('PENDING', 'Ожидает обработки'),
+        ('READY', 'Готово'),
+        ('SKIPPED', 'Не поддерживается'),
+        ('FAILED', 'Ошибка'),
+    ]
+
     title = models.CharField(max_length=200, verbose_name='Название', blank=True)
     file = models.FileField(upload_to=get_media_upload_path, verbose_name='Файл')
     file_size = models.BigIntegerField(default=0, verbose_name='Размер файла (байт)')
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name='media', null=True, blank=True, verbose_name='Содержимое')
+    # Сжатие при загрузке: исходный размер и (если у организации включено хранение) исходный файл
+    original_size = models.BigIntegerField(null=True, blank=True, verbose_name='Размер до сжатия (байт)')
+    original_blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name='original_for', null=True, blank=True, verbose_name='Оригинал')
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='media', null=True, blank=True, verbose_name='Задача')
     stage = models.ForeignKey(TaskStage, on_delete=models.CASCADE, related_name='media', null=True, blank=True, verbose_name='Этап')
     uploaded_by = models.ForeignKey(TenantUser, on_delete=models.CASCADE, related_name='media', null=True, blank=True, verbose_name='Загрузил')
@@ -48,32 +72,147 @@ class Media(models.Model):
     
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')
 
+    # Миниатюры и кадр-заставка: {"160": "tenant_media/thumbs/..._160.jpg", ...}
+    derivatives = models.JSONField(default=dict, blank=True, verbose_name='Миниатюры')
+    derivatives_status = models.CharField(max_length=20, choices=DERIVATIVES_STATUS_CHOICES, default='PENDING', db_index=True, verbose_name='Статус миниатюр')
+
+    # Технические метаданные, извлекаются в фоне (media_app/metadata.py)
+    mime_type = models.CharField(max_length=100, blank=True, db_index=True, verbose_name='MIME-тип')
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name='Ширина (px)')
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name='Высота (px)')
+    duration = models.FloatField(null=True, blank=True, verbose_name='Длительность (с)')
+    codec = models.CharField(max_length=50, blank=True, verbose_name='Кодек')
+    phash = models.CharField(max_length=16, blank=True, verbose_name='Перцептивный хэш')
+    metadata_status = models.CharField(max_length=20, choices=DERIVATIVES_STATUS_CHOICES, default='PENDING', db_index=True, verbose_name='Статус метаданных')
+
     class Meta:
         verbose_name = 'Медиа-файл'
         verbose_name_plural = 'Медиа-файлы'
         ordering = ['-uploaded_at']
+        # Под фильтры MediaViewSet: выборка по задаче/этапу/автору сразу в порядке загрузки
+        indexes = [
+            models.Index(fields=['task', '-uploaded_at'], name='media_task_uploaded_idx'),
+            models.Index(fields=['stage', '-uploaded_at'], name='media_stage_uploaded_idx'),
+            models.Index(fields=['uploaded_by', '-uploaded_at'], name='media_author_uploaded_idx'),
+            models.Index(fields=['-uploaded_at'], name='media_uploaded_idx'),
+            # ?type= фильтрует по префиксу (LIKE 'image/%'): обычный btree при
+            # не-C collation его не обслуживает, нужен varchar_pattern_ops
+            models.Index(
+                fields=['mime_type', '-uploaded_at'], name='media_mime_uploaded_idx',
+                opclasses=['varchar_pattern_ops', ''],
+            ),
+            models.Index(fields=['duration'], name='media_duration_idx'),
+            # Части перцептивного хэша для поиска похожих (см. media_app.metadata)
+            models.Index(Substr('phash', 1, 4), name='media_phash_0_idx'),
+            models.Index(Substr('phash', 5, 4), name='media_phash_1_idx'),
+            models.Index(Substr('phash', 9, 4), name='media_phash_2_idx'),
+            models.Index(Substr('phash', 13, 4), name='media_phash_3_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.file and (not self.file_size or self.file_size == 0):
-            try:
-                self.file_size = self.file.size
-            except Exception:
-                pass
-                
-        if not self.title and self.file:
-            who = "unknown"
-            if self.uploaded_by:
-                who = self.uploaded_by.get_full_name() or self.uploaded_by.username
-            
-            what = "media"
-            if self.stage:
-                what = self.stage.name
-            elif self.task:
-                what = self.task.title
-                
-            when = timezone.now().strftime("%d.%m.%Y %H:%M")
-            self.title = f"{who} - {what} ({when})"
-        super().save(*args, **kwargs)
+        old_blob_id = self.blob_id
+        with tenant_atomic():
+            if self.file and not self.file._committed:
+                # Новый файл сохраняется по хэшу содержимого, повторы не пишутся на диск
+                from .blobs import store_file
+                self.blob = store_file(self.file)
+                self.file_size = self.blob.size
+
+            if self.file and (not self.file_size or self.file_size == 0):
+                try:
+                    self.file_size = self.file.size
+                except Exception:
+                    pass
+
+            if not self.title and self.file:
+                # Только уже загруженные объекты: лишних запросов при сохранении нет
+                uploaded_by = self.get_cached_relation('uploaded_by')
+                stage = self.get_cached_relation('stage')
+                task = self.get_cached_relation('task')
+
+                who = "unknown"
+                if uploaded_by:
+                    who = uploaded_by.get_full_name() or uploaded_by.username
+
+                what = "media"
+                if stage:
+                    what = stage.name
+                elif task:
+                    what = task.title
+
+                when = timezone.now().strftime("%d.%m.%Y %H:%M")
+                self.title = f"{who} - {what} ({when})"
+            super().save(*args, **kwargs)
+
+            if old_blob_id and old_blob_id != self.blob_id:
+                from .blobs import release_blob
+                release_blob(old_blob_id)
 
     def __str__(self):
         return self.title
+
+    @property
+    def saved_bytes(self):
+        """Сколько байт сэкономило сжатие при загрузке"""
+        if self.original_size is None:
+            return 0
+        return max(self.original_size - self.file_size, 0)
+
+    def get_cached_relation(self, field_name):
+        """Связанный объект, если он уже присвоен или загружен, иначе None"""
+        return self._meta.get_field(field_name).get_cached_value(self, default=None)
+
+    @property
+    def is_video(self):
+        return os.path.splitext(self.file.name or '')[1].lower() in ('.mp4', '.mov', '.avi', '.webm', '.mkv', '.3gp')
+
+    def thumbnail_url(self, size=160):
+        """URL наименьшей миниатюры не меньше size (или наибольшей из имеющихся)"""
+        if not self.derivatives:
+            return None
+        sizes = sorted(int(s) for s in self.derivatives)
+        chosen = next((s for s in sizes if s >= int(size)), sizes[-1])
+        return self.file.storage.url(self.derivatives[str(chosen)])
+
+
+class MediaUpload(models.Model):
+    """Возобновляемая загрузка файла по частям (крупные видео с мобильных устройств)"""
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Загружается'),
+        ('COMPLETE', 'Завершена'),
+        ('ABORTED', 'Отменена'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255, verbose_name='Исходное имя файла')
+    total_size = models.BigIntegerField(verbose_name='Размер файла (байт)')
+    received_size = models.BigIntegerField(default=0, verbose_name='Получено (байт)')
+    sha256 = models.CharField(max_length=64, verbose_name='Контрольная сумма SHA-256')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE', verbose_name='Статус')
+
+    # Атрибуты будущего Media
+    title = models.CharField(max_length=200, blank=True, verbose_name='Название')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='media_uploads', null=True, blank=True, verbose_name='Задача')
+    stage = models.ForeignKey(TaskStage, on_delete=models.CASCADE, related_name='media_uploads', null=True, blank=True, verbose_name='Этап')
+    uploaded_by = models.ForeignKey(TenantUser, on_delete=models.CASCADE, related_name='media_uploads', null=True, blank=True, verbose_name='Загрузил')
+    recording_start = models.DateTimeField(null=True, blank=True, verbose_name='Начало съемки')
+    recording_end = models.DateTimeField(null=True, blank=True, verbose_name='Конец съемки')
+    media = models.OneToOneField(Media, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload', verbose_name='Медиа-файл')
+    # Прямая загрузка в объектное хранилище: имя объекта, куда клиент загружает файл
+    storage_key = models.CharField(max_length=255, blank=True, verbose_name='Объект в хранилище')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Загрузка по частям'
+        verbose_name_plural = 'Загрузки по частям'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+    @property
+    def part_name(self):
+        """Путь временного файла относительно хранилища тенанта"""
+        return os.path.join('tenant_media', 'uploads', f'{self.id}.part')
@@ -0,0 +1,63 @@
+"""
+Объектное хранилище (S3, MinIO и совместимые) с префиксом тенанта.
+
+Ключи объектов: <AWS_LOCATION>/<схема тенанта>/tenant_media/..., так же как
+на диске у TenantFileSystemStorage. Требует пакет django-storages[s3].
+Для локальной проверки подходит MinIO:
+    docker run -p 9000:9000 minio/minio server /data
+    AWS_S3_ENDPOINT_URL=http://localhost:9000
+"""
+import base64
+
+from django.conf import settings
+from django.db import connection
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+
+class TenantS3Storage(S3Storage):
+
+    @property
+    def location(self):
+        base = self._base_location.strip('/')
+        schema_name = getattr(connection, 'schema_name', 'public')
+        return f'{base}/{schema_name}' if base else schema_name
+
+    @location.setter
+    def location(self, value):
+        # S3Storage присваивает location из настроек в __init__
+        self._base_location = value or ''
+
+    def object_key(self, name):
+        return self._normalize_name(clean_name(name))
+
+    def presigned_put_url(self, name, content_type=None, sha256=None, expires_in=None):
+        """
+        URL для загрузки объекта напрямую клиентом (PUT).
+        Возвращает (url, заголовки, которые клиент обязан передать).
+        """
+        params = {'Bucket': self.bucket_name, 'Key': self.object_key(name)}
+        headers = {}
+        if content_type:
+            params['ContentType'] = content_type
+            headers['Content-Type'] = content_type
+        if sha256:
+            # Хранилище само проверит контрольную сумму при приеме объекта
+            checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+            params['ChecksumSHA256'] = checksum
+            headers['x-amz-checksum-sha256'] = checksum
+        url = self.bucket.meta.client.generate_presigned_url(
+            'put_object', Params=params,
+            ExpiresIn=expires_in or getattr(settings, 'MEDIA_DIRECT_UPLOAD_EXPIRE', 3600),
+        )
+        return url, headers
+
+    def iter_objects(self, prefix):
+        """(имя относительно тенанта, размер, время изменения) для объектов с префиксом"""
+        root = self.object_key('')
+        root = root.rstrip('/') + '/'
+        for obj in self.bucket.objects.filter(Prefix=self.object_key(prefix)):
+            yield obj.key[len(root):], obj.size, obj.last_modified.timestamp()
+
+    def delete_prefix(self, prefix):
+        self.bucket.objects.filter(Prefix=self.object_key(prefix).rstrip('/') + '/').delete()
@@ -1,8 +1,59 @@
+import re
+
 from rest_framework import serializers
-from .models import Media
+from .models import Media, MediaUpload
 
 class MediaSerializer(serializers.ModelSerializer):
+    thumbnails = serializers.SerializerMethodField()
+
     class Meta:
         model = Media
-        fields = ['id', 'title', 'file', 'task', 'recording_start', 'recording_end', 'uploaded_by', 'uploaded_at']
-        read_only_fields = ('uploaded_by', 'uploaded_at')
+        fields = [
+            'id', 'title', 'file', 'task', 'recording_start', 'recording_end', 'uploaded_by', 'uploaded_at',
+            'thumbnails', 'derivatives_status', 'file_size', 'original_size',
+            'mime_type', 'width', 'height', 'duration', 'codec', 'metadata_status'
+        ]
+        read_only_fields = (
+            'uploaded_by', 'uploaded_at', 'derivatives_status', 'file_size', 'original_size',
+            'mime_type', 'width', 'height', 'duration', 'codec', 'metadata_status'
+        )
+
+    def get_thumbnails(self, obj):
+        """{размер: URL} миниатюр изображения или кадра-заставки видео"""
+        request = self.context.get('request')
+        thumbnails = {}
+        for size, name in (obj.derivatives or {}).items():
+            url = obj.file.storage.url(name)
+            thumbnails[size] = request.build_absolute_uri(url) if request else url
+        return thumbnails
+
+
+class MediaUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MediaUpload
+        fields = [
+            'id', 'filename', 'total_size', 'sha256', 'title', 'task', 'stage',
+            'recording_start', 'recording_end', 'received_size', 'status', 'media'
+        ]
+        read_only_fields = ('id', 'received_size', 'status', 'media')
+
+    def validate_total_size(self, value):
+        from .uploads import get_max_upload_size
+        if value <= 0:
+            raise serializers.ValidationError('Размер файла должен быть больше нуля.')
+        if value > get_max_upload_size():
+            raise serializers.ValidationError('Файл слишком большой.')
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError('Ожидается SHA-256 в шестнадцатеричном виде.')
+        return value
+
+
+class MediaUploadStatusSerializer(serializers.ModelSerializer):
+    """Краткое состояние загрузки для ответов на части файла"""
+    class Meta:
+        model = MediaUpload
+        fields = ['id', 'received_size', 'total_size', 'status', 'media']
@@ -0,0 +1,184 @@
+"""
+Отдача медиа-файлов тенанта с проверкой доступа.
+
+Django проверяет тенанта и пользователя, а сами байты отдает веб-сервер
+(MEDIA_SERVE_MODE):
+    'nginx'    — заголовок X-Accel-Redirect на internal-location, например
+                     location /protected-media/ { internal; alias /srv/qtrace/; }
+                 (MEDIA_ACCEL_PREFIX='/protected-media/', alias = MEDIA_ROOT)
+    'sendfile' — заголовок X-Sendfile с абсолютным путем (Apache mod_xsendfile, lighttpd)
+    'django'   — отдача из Python с поддержкой Range и If-Modified-Since;
+                 FileResponse использует wsgi.file_wrapper (sendfile в gunicorn)
+При объектном хранилище клиент перенаправляется на подписанную ссылку.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .storage import is_local_storage
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Доступны только файлы тенанта, а не весь MEDIA_ROOT (он совпадает с BASE_DIR)
+SERVED_PREFIX = 'tenant_media/'
+# В шардированных каталогах имена не переиспользуются (хэш содержимого
+# или случайный ключ, см. media_app.models.sharded_media_path)
+IMMUTABLE_RE = re.compile(r'^tenant_media/\d{4}/\d{2}/')
+
+
+class FileRange:
+    """Файловый объект, отдающий только байты [start, start + length)"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+        self.name = file.name
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # gunicorn отправит через sendfile не больше Content-Length байт с текущей позиции
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Возвращает (start, end) включительно для одиночного диапазона,
+    None — если заголовка нет или он не поддерживается (отдаем весь файл),
+    и False — если диапазон вне файла (416).
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-N: последние N байт
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def can_access_media(request):
+    """Файлы тенанта доступны его пользователям и суперпользователю платформы"""
+    user = request.user
+    if not user.is_authenticated:
+        # Мобильное приложение может передать JWT вместо сессии
+        from users_app.authentication import TenantJWTAuthentication
+        try:
+            result = TenantJWTAuthentication().authenticate(request)
+        except Exception:
+            result = None
+        if result is None:
+            return False
+        user = result[0]
+
+    if getattr(user, 'is_superuser', False):
+        return True
+    # TenantUser аутентифицируется в схеме текущего тенанта (см. users_app.backends)
+    return hasattr(user, 'role') and user.is_active
+
+
+def cache_control(path):
+    if IMMUTABLE_RE.match(path):
+        return 'private, max-age=31536000, immutable'
+    return 'private, max-age=%d' % getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+
+
+def serve_media(request, path):
+    schema_name = request.tenant.schema_name
+    path = path.lstrip('/')
+    if not path.startswith(SERVED_PREFIX):
+        raise Http404
+    if not can_access_media(request):
+        return HttpResponse(status=403)
+
+    if not is_local_storage():
+        response = HttpResponseRedirect(default_storage.url(path))
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, schema_name, path)
+        st = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+
+    if mode == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(f'{prefix}{schema_name}/{path}')
+    elif mode == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = serve_file(request, full_path, st, content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Cache-Control'] = cache_control(path)
+    return response
+
+
+def serve_file(request, full_path, st, content_type):
+    """Отдача из Python: Range, If-Modified-Since, Last-Modified"""
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), st.st_mtime):
+        return HttpResponseNotModified()
+
+    size = st.st_size
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    # If-Range: диапазон действителен, только если файл не менялся
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and if_range and if_range != http_date(st.st_mtime):
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    f = open(full_path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(FileRange(f, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(f, content_type=content_type)
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(st.st_mtime)
+    return response
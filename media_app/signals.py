@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from customers.models import Client
+from .models import Media
+
+
+@receiver(post_save, sender=Media)
+def schedule_media_ingest(sender, instance, created, **kwargs):
+    """Сжатие и миниатюры нового файла выполняются в фоне после коммита, загрузка не ждет их"""
+    if created and instance.file:
+        from .ingest import schedule_ingest
+        schedule_ingest(instance)
+
+
+@receiver(post_delete, sender=Media)
+def release_media_blob(sender, instance, **kwargs):
+    """Файл на диске удаляется вместе с последней ссылающейся на него записью"""
+    from .blobs import release_blob
+    if instance.original_blob_id:
+        release_blob(instance.original_blob_id)
+    if instance.blob_id:
+        release_blob(instance.blob_id, instance.derivatives)
+    elif instance.file and not Media.objects.filter(file=instance.file.name).exists():
+        # Файл, еще не перенесенный в хранилище по хэшу (см. dedupe_media)
+        from .deletion import enqueue_file_deletions
+        enqueue_file_deletions([instance.file.name, *(instance.derivatives or {}).values()])
+
+
+@receiver(post_delete, sender=Client)
+def delete_tenant_files(sender, instance, **kwargs):
+    """Схема удаленной организации удаляется django-tenants, файлы — здесь"""
+    from .deletion import enqueue_tenant_directory_deletion
+    enqueue_tenant_directory_deletion(instance.schema_name)
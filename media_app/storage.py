@@ -0,0 +1,61 @@
+"""
+Работа с файлами медиа независимо от хранилища.
+
+По умолчанию файлы лежат на диске (TenantFileSystemStorage), при
+MEDIA_STORAGE_BACKEND=s3 — в объектном хранилище (media_app/s3_storage.py).
+Код, которому нужен локальный путь (Pillow, ffmpeg), получает его через
+local_path(): для объектного хранилища файл временно скачивается.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+def is_local_storage(storage=None):
+    storage = storage or default_storage
+    try:
+        storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+
+@contextmanager
+def local_path(name):
+    """Путь к файлу на локальном диске на время блока with"""
+    if is_local_storage():
+        yield default_storage.path(name)
+        return
+
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(name)[1])
+    try:
+        with os.fdopen(fd, 'wb') as target, default_storage.open(name, 'rb') as source:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def save_bytes(name, data):
+    """Записывает содержимое ровно под именем name (существующий файл заменяется)"""
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(data))
+
+
+def store_local_file(name, path):
+    """Переносит локальный файл (например, собранную загрузку) в хранилище под именем name"""
+    if is_local_storage():
+        target = default_storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        return name
+    with open(path, 'rb') as f:
+        name = default_storage.save(name, File(f))
+    os.remove(path)
+    return name
@@ -1,3 +1,85 @@
-from django.test import TestCase
+import importlib.util
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase
+
+from media_app.metadata import NEAR_DUPLICATE_DISTANCE, phash_band_filter, phash_distance
+from media_app.serving import parse_range
+
+
+@skipUnless(importlib.util.find_spec('storages') and importlib.util.find_spec('boto3'), 'нужен django-storages[s3]')
+class TenantS3StorageObjectKeyTests(SimpleTestCase):
+    def setUp(self):
+        from media_app.s3_storage import TenantS3Storage
+        self.storage = TenantS3Storage(bucket_name='media', location='qtrace')
+        previous = connection.tenant
+        connection.set_schema('acme')
+        self.addCleanup(connection.set_tenant, previous)
+
+    def test_key_has_tenant_prefix(self):
+        self.assertEqual(self.storage.object_key('tenant_media/a/b.jpg'), 'qtrace/acme/tenant_media/a/b.jpg')
+
+    def test_key_is_cleaned(self):
+        self.assertEqual(self.storage.object_key('tenant_media\\a//./b.jpg'), 'qtrace/acme/tenant_media/a/b.jpg')
+
+
+class ParseRangeTests(SimpleTestCase):
+    def parse(self, header, size=1000):
+        return parse_range(header, size)
+
+    def test_no_header(self):
+        self.assertIsNone(self.parse(None))
+        self.assertIsNone(self.parse(''))
+
+    def test_single_range(self):
+        self.assertEqual(self.parse('bytes=0-499'), (0, 499))
+        self.assertEqual(self.parse('bytes=500-'), (500, 999))
+
+    def test_end_is_clamped_to_size(self):
+        self.assertEqual(self.parse('bytes=900-5000'), (900, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(self.parse('bytes=-100'), (900, 999))
+        self.assertEqual(self.parse('bytes=-5000'), (0, 999))
+
+    def test_unsatisfiable(self):
+        self.assertIs(self.parse('bytes=1000-'), False)
+        self.assertIs(self.parse('bytes=500-100'), False)
+        self.assertIs(self.parse('bytes=-0'), False)
+
+    def test_multi_range_serves_whole_file(self):
+        self.assertIsNone(self.parse('bytes=0-99,200-299'))
+
+    def test_unsupported_unit_or_malformed(self):
+        self.assertIsNone(self.parse('items=0-10'))
+        self.assertIsNone(self.parse('bytes=-'))
+        self.assertIsNone(self.parse('bytes=a-b'))
+
+
+class PhashBandFilterTests(SimpleTestCase):
+    def band_lookups(self, condition):
+        lookups = {}
+        for child in condition.children:
+            if isinstance(child, tuple):
+                lookups[child[0]] = child[1]
+            else:
+                lookups.update(self.band_lookups(child))
+        return lookups
+
+    def test_one_lookup_per_band(self):
+        condition = phash_band_filter('0123456789abcdef')
+        self.assertEqual(condition.connector, 'OR')
+        self.assertEqual(self.band_lookups(condition), {
+            'phash_0': '0123', 'phash_1': '4567', 'phash_2': '89ab', 'phash_3': 'cdef',
+        })
+
+    def test_near_duplicate_shares_a_band(self):
+        # По принципу Дирихле при расстоянии до NEAR_DUPLICATE_DISTANCE хотя бы одна часть совпадает
+        phash = 'f0f0f0f0f0f0f0f0'
+        value = int(phash, 16)
+        for bits in ((0, 16, 32), (63, 47, 31), (1, 2, 3)):
+            other = f'{value ^ sum(1 << bit for bit in bits):016x}'
+            self.assertEqual(phash_distance(phash, other), NEAR_DUPLICATE_DISTANCE)
+            lookups = set(self.band_lookups(phash_band_filter(other)).items())
+            self.assertTrue(lookups & set(self.band_lookups(phash_band_filter(phash)).items()))
@@ -0,0 +1,275 @@
+"""
+Возобновляемая загрузка медиа по частям.
+
+Протокол:
+    POST   /api/media-uploads/                 — создать загрузку (filename, total_size, sha256, ...)
+    GET    /api/media-uploads/<id>/            — текущее смещение (received_size) для возобновления
+    PUT    /api/media-uploads/<id>/chunk/      — очередная часть, заголовок Content-Range: bytes a-b/total
+    POST   /api/media-uploads/<id>/complete/   — проверка SHA-256 и создание Media
+    DELETE /api/media-uploads/<id>/            — отмена
+
+Части дописываются во временный файл (tenant_media/uploads/<id>.part в
+хранилище тенанта, а при объектном хранилище — в MEDIA_UPLOAD_TEMP_DIR на
+диске веб-узла), поэтому тело запроса не буферизуется целиком.
+
+Прямая загрузка в объектное хранилище (MEDIA_STORAGE_BACKEND=s3):
+    POST   /api/media-uploads/direct/          — создать загрузку, получить ссылку для PUT
+    PUT    <upload_url>                        — клиент загружает файл прямо в хранилище
+    POST   /api/media-uploads/<id>/complete/   — проверка объекта и создание Media
+"""
+import hashlib
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+from customers.sharding import tenant_atomic
+from .blobs import acquire_blob, blob_name
+from .deletion import enqueue_file_deletions
+from .models import Media, MediaUpload
+from .storage import is_local_storage, store_local_file
+
+READ_BLOCK_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class UploadError(Exception):
+    """Ошибка протокола загрузки; status — HTTP-код ответа"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def get_max_upload_size():
+    return getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', 4 * 1024 ** 3)
+
+
+def get_max_chunk_size():
+    return getattr(settings, 'MEDIA_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 ** 2)
+
+
+def part_path(upload):
+    if is_local_storage():
+        return default_storage.path(upload.part_name)
+    temp_dir = getattr(settings, 'MEDIA_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir()
+    return os.path.join(temp_dir, connection.schema_name, upload.part_name)
+
+
+def start_upload(upload):
+    """Создает пустой временный файл для новой загрузки"""
+    path = part_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def parse_content_range(header, total_size):
+    """Возвращает (start, end) включительно или None, если заголовок не передан"""
+    if not header:
+        return None
+    match = CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        raise UploadError('Некорректный заголовок Content-Range')
+    start, end, total = match.groups()
+    start, end = int(start), int(end)
+    if end < start or end >= total_size or (total != '*' and int(total) != total_size):
+        raise UploadError('Content-Range не соответствует размеру файла')
+    return start, end
+
+
+def append_chunk(upload_id, stream, content_range, content_length):
+    """
+    Дописывает часть файла. Повторно присланные байты (клиент не получил ответ
+    и отправил часть заново) пропускаются. Возвращает обновленную загрузку.
+    """
+    with tenant_atomic():
+        upload = MediaUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status != 'ACTIVE':
+            raise UploadError('Загрузка уже завершена или отменена', status=409)
+
+        byte_range = parse_content_range(content_range, upload.total_size)
+        if byte_range is None:
+            if content_length is None:
+                raise UploadError('Не указан размер части (Content-Length)', status=411)
+            start = upload.received_size
+            length = content_length
+        else:
+            start = byte_range[0]
+            length = byte_range[1] - byte_range[0] + 1
+
+        if length > get_max_chunk_size():
+            raise UploadError('Слишком большая часть файла', status=413)
+        if start > upload.received_size:
+            raise UploadError('Пропущена часть файла', status=409, offset=upload.received_size)
+        if start + length > upload.total_size:
+            raise UploadError('Данные выходят за размер файла')
+
+        skip = upload.received_size - start
+        remaining = length
+        written = 0
+        with open(part_path(upload), 'r+b') as f:
+            f.seek(upload.received_size)
+            while remaining > 0:
+                block = stream.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                if skip:
+                    dropped = min(skip, len(block))
+                    block = block[dropped:]
+                    skip -= dropped
+                if block:
+                    f.write(block)
+                    written += len(block)
+            # Обрезаем возможный хвост от прерванной ранее записи
+            f.truncate()
+
+        upload.received_size += written
+        upload.save(update_fields=['received_size', 'updated_at'])
+
+    if remaining > 0:
+        # Соединение оборвалось: полученное уже сохранено, ошибка — после коммита
+        raise UploadError('Часть файла получена не полностью', status=400, offset=upload.received_size)
+    return upload
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def direct_uploads_available():
+    return not is_local_storage()
+
+
+def start_direct_upload(upload, content_type=None):
+    """
+    Готовит прямую загрузку в объектное хранилище, возвращает (url, заголовки) для PUT.
+    Файл загружается, даже если такое содержимое уже хранится: знание хэша
+    не доказывает, что у клиента есть сам файл. Дубликат удаляется после
+    проверки (acquire_direct_blob).
+    """
+    ext = os.path.splitext(upload.filename)[1]
+    # Собственное имя объекта загрузки: чужой объект с тем же хэшем за него не сойдет
+    upload.storage_key = blob_name(f'{upload.sha256.lower()}_{upload.id.hex[:12]}', ext)
+    upload.save(update_fields=['storage_key', 'updated_at'])
+    return default_storage.presigned_put_url(upload.storage_key, content_type, upload.sha256)
+
+
+def acquire_direct_blob(upload):
+    """Проверяет объект, загруженный клиентом напрямую, и регистрирует его как blob"""
+    if not default_storage.exists(upload.storage_key):
+        raise UploadError('Файл еще не загружен в хранилище', status=409)
+    if default_storage.size(upload.storage_key) != upload.total_size:
+        raise UploadError('Размер загруженного файла не совпадает', status=409)
+
+    def copy_object(name):
+        # Файл blob пропал из хранилища: восстанавливаем его из загрузки
+        with default_storage.open(upload.storage_key) as f:
+            default_storage.save(name, f)
+
+    blob = acquire_blob(
+        upload.sha256.lower(), upload.total_size, os.path.splitext(upload.filename)[1], copy_object,
+        name=upload.storage_key,
+    )
+    if blob.name != upload.storage_key:
+        # Такое содержимое уже хранилось: загруженная копия не нужна
+        enqueue_file_deletions([upload.storage_key])
+    return blob
+
+
+def acquire_part_blob(upload):
+    """Проверяет собранный из частей файл и переносит его в хранилище"""
+    if upload.received_size != upload.total_size:
+        raise UploadError('Файл получен не полностью', status=409, offset=upload.received_size)
+
+    path = part_path(upload)
+    if file_sha256(path) != upload.sha256.lower():
+        # Данные повреждены: начинаем загрузку заново (счетчик сбрасывает complete_upload)
+        open(path, 'wb').close()
+        raise UploadError('Контрольная сумма не совпадает', status=422, offset=0)
+
+    def move_part(name):
+        store_local_file(name, path)
+
+    blob = acquire_blob(upload.sha256.lower(), upload.total_size, os.path.splitext(upload.filename)[1], move_part)
+    # Такое содержимое уже было в хранилище: временный файл не понадобился
+    discard_part(upload)
+    return blob
+
+
+def complete_upload(upload_id):
+    """Проверяет размер и контрольную сумму, переносит файл на место и создает Media"""
+    try:
+        return _complete_upload(upload_id)
+    except UploadError as e:
+        if e.status == 422:
+            # Изменения внутри транзакции откатились, временный файл уже очищен
+            MediaUpload.objects.filter(pk=upload_id).update(received_size=0, updated_at=timezone.now())
+        raise
+
+
+def _complete_upload(upload_id):
+    with tenant_atomic():
+        upload = MediaUpload.objects.select_for_update().get(pk=upload_id)
+        if upload.status == 'COMPLETE' and upload.media_id:
+            return upload
+        if upload.status != 'ACTIVE':
+            raise UploadError('Загрузка отменена', status=409)
+
+        blob = acquire_direct_blob(upload) if upload.storage_key else acquire_part_blob(upload)
+        media = Media(
+            title=upload.title,
+            task=upload.task,
+            stage=upload.stage,
+            uploaded_by=upload.uploaded_by,
+            recording_start=upload.recording_start,
+            recording_end=upload.recording_end,
+            file_size=upload.total_size,
+            blob=blob,
+        )
+        media.file.name = blob.name
+        media.save()
+
+        upload.media = media
+        upload.status = 'COMPLETE'
+        upload.save(update_fields=['media', 'status', 'updated_at'])
+        return upload
+
+
+def discard_part(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def abort_upload(upload):
+    discard_part(upload)
+    upload.status = 'ABORTED'
+    upload.save(update_fields=['status', 'updated_at'])
+
+
+def cleanup_stale_uploads(max_age_hours):
+    """
+    Удаляет незавершенные загрузки текущей схемы, которые не обновлялись
+    дольше max_age_hours, вместе с временными файлами. Возвращает их количество.
+    """
+    threshold = timezone.now() - timedelta(hours=max_age_hours)
+    stale = MediaUpload.objects.filter(updated_at__lt=threshold)
+    count = 0
+    for upload in stale.exclude(status='COMPLETE').iterator():
+        discard_part(upload)
+        count += 1
+    stale.delete()
+    return count
@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
-from .views import MediaViewSet
+from .views import MediaViewSet, MediaUploadViewSet
 
 router = DefaultRouter()
 router.register(r'media', MediaViewSet, basename='media')
+router.register(r'media-uploads', MediaUploadViewSet, basename='media-upload')
 
 urlpatterns = router.urls
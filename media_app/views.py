@@ -1,15 +1,47 @@
-from rest_framework import viewsets, permissions
-from .models import Media
-from .serializers import MediaSerializer
+import mimetypes
+
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from .models import Media, MediaUpload
+from .serializers import MediaSerializer, MediaUploadSerializer, MediaUploadStatusSerializer
+from . import uploads
+from tasks.filters import DeclaredFilterBackend, parse_float, parse_int, parse_range_start, parse_range_end
+
+
+def parse_media_type(value):
+    """image / video -> префикс MIME-типа"""
+    if value not in ('image', 'video'):
+        raise ValueError(value)
+    return f'{value}/'
 
 class MediaViewSet(viewsets.ModelViewSet):
     """
     ViewSet для медиа-файлов.
     Сотрудники видят только свои файлы.
     Администраторы видят все файлы.
+    Фильтры: ?task=<id>&stage=<id>&uploaded_by=<id>
+    &uploaded_from=YYYY-MM-DD&uploaded_to=YYYY-MM-DD&ordering=-uploaded_at
+    &type=image|video&mime_type=video/mp4&duration_min=<с>&duration_max=<с>
+    Похожие файлы: GET /media/<id>/similar/
     """
     serializer_class = MediaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DeclaredFilterBackend, OrderingFilter]
+    filter_params = {
+        'task': ('task_id', parse_int),
+        'stage': ('stage_id', parse_int),
+        'uploaded_by': ('uploaded_by_id', parse_int),
+        'uploaded_from': ('uploaded_at__gte', parse_range_start),
+        'uploaded_to': ('uploaded_at__lt', parse_range_end),
+        'type': ('mime_type__startswith', parse_media_type),
+        'mime_type': ('mime_type', str),
+        'duration_min': ('duration__gte', parse_float),
+        'duration_max': ('duration__lte', parse_float),
+    }
+    ordering_fields = ['uploaded_at', 'file_size', 'title', 'duration']
+    ordering = ['-uploaded_at']
 
     def get_queryset(self):
         user = self.request.user
@@ -33,3 +65,108 @@ class MediaViewSet(viewsets.ModelViewSet):
             serializer.save()
         else:
             pass
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Почти одинаковые фото и видео по перцептивному хэшу, среди доступных пользователю"""
+        from .metadata import find_near_duplicates
+        media = self.get_object()
+        matches = find_near_duplicates(media, self.get_queryset())
+        data = []
+        for candidate, distance in matches:
+            data.append({**self.get_serializer(candidate).data, 'distance': distance})
+        return Response(data)
+
+
+class MediaUploadViewSet(viewsets.GenericViewSet):
+    """
+    Возобновляемая загрузка крупных файлов по частям (см. media_app/uploads.py).
+    Каждый пользователь работает только со своими загрузками.
+    """
+    serializer_class = MediaUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        from users_app.models import TenantUser
+        
+        if isinstance(user, TenantUser):
+            return MediaUpload.objects.filter(uploaded_by=user)
+        elif getattr(user, 'is_superuser', False):
+            return MediaUpload.objects.all()
+        return MediaUpload.objects.none()
+
+    def upload_error(self, error):
+        data = {'error': str(error)}
+        if error.offset is not None:
+            data['received_size'] = error.offset
+        return Response(data, status=error.status)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        from users_app.models import TenantUser
+        
+        upload = serializer.save(uploaded_by=user if isinstance(user, TenantUser) else None)
+        uploads.start_upload(upload)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def direct(self, request):
+        """Прямая загрузка в объектное хранилище: ссылка для PUT, затем complete"""
+        if not uploads.direct_uploads_available():
+            return Response({'error': 'Прямая загрузка доступна только при объектном хранилище'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        from users_app.models import TenantUser
+
+        upload = serializer.save(uploaded_by=user if isinstance(user, TenantUser) else None)
+        content_type = request.data.get('content_type') or mimetypes.guess_type(upload.filename)[0]
+        upload_url, headers = uploads.start_direct_upload(upload, content_type)
+        return Response({
+            **self.get_serializer(upload).data,
+            'upload_url': upload_url,
+            'upload_method': 'PUT',
+            'upload_headers': headers,
+        }, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def destroy(self, request, pk=None):
+        upload = self.get_object()
+        if upload.status == 'ACTIVE':
+            uploads.abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        upload = self.get_object()
+        content_length = request.META.get('CONTENT_LENGTH')
+        try:
+            content_length = int(content_length) if content_length else None
+        except ValueError:
+            content_length = None
+        try:
+            upload = uploads.append_chunk(
+                upload.pk, request.stream, request.META.get('HTTP_CONTENT_RANGE'), content_length
+            )
+        except uploads.UploadError as e:
+            return self.upload_error(e)
+        return Response(MediaUploadStatusSerializer(upload).data)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            upload = uploads.complete_upload(upload.pk)
+        except uploads.UploadError as e:
+            return self.upload_error(e)
+        media = upload.media
+        return Response({
+            **MediaUploadStatusSerializer(upload).data,
+            'media_id': media.id,
+            'media_url': media.file.url,
+        }, status=status.HTTP_201_CREATED)
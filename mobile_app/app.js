@@ -226,18 +226,14 @@ async function saveVideo() {
     stopAndCancelRecording();
     showToast('Сохранение видео...');
 
-    const formData = new FormData();
-    formData.append('file', blob, `mobile_task_${currentTask.id}_${Date.now()}.webm`);
-    formData.append('task', currentTask.id);
-    formData.append('title', `Запись к задаче #${currentTask.id}`);
-    formData.append('recording_start', recordingStartTime.toISOString());
-    formData.append('recording_end', recordingEndTime.toISOString());
-
     const baseUrl = localStorage.getItem('api_base_url');
     try {
-        await fetch(`${baseUrl}/api/media/`, {
-            method: 'POST',
-            body: formData
+        await uploadInChunks(baseUrl, blob, {
+            filename: `mobile_task_${currentTask.id}_${Date.now()}.webm`,
+            task: currentTask.id,
+            title: `Запись к задаче #${currentTask.id}`,
+            recording_start: recordingStartTime.toISOString(),
+            recording_end: recordingEndTime.toISOString()
         });
         showToast('Видео успешно сохранено');
         loadTaskMedia(currentTask.id);
@@ -248,6 +244,63 @@ async function saveVideo() {
     }
 }
 
+// Resumable chunked upload (см. media_app/uploads.py)
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+const UPLOAD_MAX_RETRIES = 5;
+
+async function sha256Hex(blob) {
+    const hash = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(hash)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function uploadInChunks(baseUrl, blob, fields) {
+    const createResp = await fetch(`${baseUrl}/api/media-uploads/`, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({...fields, total_size: blob.size, sha256: await sha256Hex(blob)})
+    });
+    if (!createResp.ok) throw new Error('Не удалось начать загрузку');
+    const upload = await createResp.json();
+    const uploadUrl = `${baseUrl}/api/media-uploads/${upload.id}/`;
+
+    let offset = 0;
+    let retries = 0;
+    while (offset < blob.size) {
+        const end = Math.min(offset + UPLOAD_CHUNK_SIZE, blob.size);
+        try {
+            const resp = await fetch(`${uploadUrl}chunk/`, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Range': `bytes ${offset}-${end - 1}/${blob.size}`
+                },
+                body: blob.slice(offset, end)
+            });
+            const data = await resp.json();
+            if (resp.ok) {
+                offset = data.received_size;
+                retries = 0;
+                continue;
+            }
+            if (data.received_size === undefined || ++retries > UPLOAD_MAX_RETRIES) throw new Error(data.error);
+            // Сервер подсказал, с какого байта продолжать
+            offset = data.received_size;
+        } catch (err) {
+            if (++retries > UPLOAD_MAX_RETRIES) throw err;
+            await new Promise(r => setTimeout(r, 1000 * 2 ** retries));
+            // После обрыва связи уточняем, сколько байт сервер уже получил
+            try {
+                const state = await (await fetch(uploadUrl)).json();
+                offset = state.received_size;
+            } catch (e) { /* повторим на следующей итерации */ }
+        }
+    }
+
+    const completeResp = await fetch(`${uploadUrl}complete/`, {method: 'POST'});
+    if (!completeResp.ok) throw new Error('Не удалось завершить загрузку');
+    return completeResp.json();
+}
+
 // Timer for Recording
 function startTimer() {
     let seconds = 0;
@@ -278,7 +331,9 @@ async function loadTaskMedia(taskId) {
         videoList.innerHTML = media.map(m => `
             <div class="col-4">
                 <div class="video-thumb">
-                    <video src="${m.file}"></video>
+                    ${m.thumbnails && m.thumbnails['320']
+                        ? `<img src="${m.thumbnails['320']}" loading="lazy" alt="">`
+                        : `<video src="${m.file}" preload="none"></video>`}
                     <i class="bi bi-play-fill position-absolute text-white fs-3"></i>
                 </div>
             </div>
@@ -0,0 +1,90 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def parse_int(value):
+    return int(value)
+
+
+def parse_float(value):
+    return float(value)
+
+
+def parse_choices(choices):
+    """Список значений через запятую, каждое должно входить в choices"""
+    allowed = {str(key): key for key, _ in choices}
+
+    def parser(value):
+        items = [v.strip() for v in value.split(',') if v.strip()]
+        if not items or any(v not in allowed for v in items):
+            raise ValueError(value)
+        return [allowed[v] for v in items]
+    return parser
+
+
+def parse_day(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def _parse_moment(value):
+    """Дата или дата-время -> aware datetime (дата трактуется как начало дня)"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_range_start(value):
+    moment = _parse_moment(value)
+    if moment is not None:
+        return moment
+    return timezone.make_aware(datetime.combine(parse_day(value), time.min))
+
+
+def parse_range_end(value):
+    """Конец диапазона (используется с __lt): для даты — начало следующего дня"""
+    moment = _parse_moment(value)
+    if moment is not None:
+        return moment
+    return timezone.make_aware(datetime.combine(parse_day(value) + timedelta(days=1), time.min))
+
+
+class DeclaredFilterBackend(BaseFilterBackend):
+    """
+    Фильтрация по параметрам запроса, явно объявленным во ViewSet.
+    Неизвестные параметры игнорируются, некорректные значения дают 400.
+
+        filter_params = {
+            'task': ('task_id', parse_int),
+            'uploaded_from': ('uploaded_at__gte', parse_range_start),
+        }
+
+    Фильтры рассчитаны на индексы модели, поэтому сравнения идут по самим
+    столбцам (без приведения к дате и т.п.).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        errors = {}
+        for param, (lookup, parser) in getattr(view, 'filter_params', {}).items():
+            raw = request.query_params.get(param)
+            if raw is None or raw == '':
+                continue
+            try:
+                filters[lookup] = parser(raw)
+            except (TypeError, ValueError):
+                errors[param] = [f'Некорректное значение: {raw}']
+        if errors:
+            raise ValidationError(errors)
+        if filters:
+            queryset = queryset.filter(**filters)
+        return queryset
@@ -3,9 +3,11 @@ from django.db import migrations
 def create_case_templates(apps, schema_editor):
     TaskTemplate = apps.get_model('tasks', 'TaskTemplate')
     TaskTemplateStage = apps.get_model('tasks', 'TaskTemplateStage')
+    # Схема организации может быть в другой базе (customers/sharding.py)
+    db = schema_editor.connection.alias
 
     # Case 1: Auto Service
-    auto_template = TaskTemplate.objects.create(
+    auto_template = TaskTemplate.objects.using(db).create(
         code='AUTO-TO-60',
         title='Регламентное техническое обслуживание (ТО-60)',
         description='Стандартизация сервисных операций для минимизации возвратов по гарантии. Спецификация запчастей: масло, фильтры.',
@@ -13,7 +15,7 @@ def create_case_templates(apps, schema_editor):
         category='Автосервис'
     )
     
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=auto_template,
         name='Входная диагностика и чек-лист',
         executor_role='INSPECTOR',
@@ -21,7 +23,7 @@ def create_case_templates(apps, schema_editor):
         data_type='LIST',
         order=1
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=auto_template,
         name='Замена тех. жидкостей и фильтров',
         executor_role='WORKER',
@@ -29,7 +31,7 @@ def create_case_templates(apps, schema_editor):
         data_type='NUMBER',
         order=2
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=auto_template,
         name='Проверка тормозной системы',
         executor_role='WORKER',
@@ -37,7 +39,7 @@ def create_case_templates(apps, schema_editor):
         data_type='NUMBER',
         order=3
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=auto_template,
         name='Сброс сервисного интервала (ЭБУ)',
         executor_role='WORKER',
@@ -45,7 +47,7 @@ def create_case_templates(apps, schema_editor):
         data_type='CHECKBOX',
         order=4
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=auto_template,
         name='Выходной контроль ОТК',
         executor_role='INSPECTOR',
@@ -55,7 +57,7 @@ def create_case_templates(apps, schema_editor):
     )
 
     # Case 2: Microelectronics
-    micro_template = TaskTemplate.objects.create(
+    micro_template = TaskTemplate.objects.using(db).create(
         code='QC-MICRO-02',
         title='Контроль качества пайки SMT-линии',
         description='Мониторинг технологического процесса для предотвращения массового брака (AOI-анализ). Связанный ресурс: Технологическая карта изделия (Gerber-файлы).',
@@ -63,7 +65,7 @@ def create_case_templates(apps, schema_editor):
         category='Микроэлектроника'
     )
     
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=micro_template,
         name='Нанесение паяльной пасты (SPI)',
         executor_role='WORKER',
@@ -71,7 +73,7 @@ def create_case_templates(apps, schema_editor):
         data_type='NUMBER',
         order=1
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=micro_template,
         name='Установка компонентов (Pick & Place)',
         executor_role='WORKER',
@@ -79,7 +81,7 @@ def create_case_templates(apps, schema_editor):
         data_type='NUMBER',
         order=2
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=micro_template,
         name='Групповое оплавление (Reflow)',
         executor_role='WORKER',
@@ -87,7 +89,7 @@ def create_case_templates(apps, schema_editor):
         data_type='NUMBER',
         order=3
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=micro_template,
         name='Автоматическая оптика (AOI)',
         executor_role='INSPECTOR',
@@ -95,7 +97,7 @@ def create_case_templates(apps, schema_editor):
         data_type='NUMBER',
         order=4
     )
-    TaskTemplateStage.objects.create(
+    TaskTemplateStage.objects.using(db).create(
         template=micro_template,
         name='Рентген-контроль (X-Ray)',
         executor_role='INSPECTOR',
@@ -106,7 +108,7 @@ def create_case_templates(apps, schema_editor):
 
 def remove_case_templates(apps, schema_editor):
     TaskTemplate = apps.get_model('tasks', 'TaskTemplate')
-    TaskTemplate.objects.filter(code__in=['AUTO-TO-60', 'QC-MICRO-02']).delete()
+    TaskTemplate.objects.using(schema_editor.connection.alias).filter(code__in=['AUTO-TO-60', 'QC-MICRO-02']).delete()
 
 class Migration(migrations.Migration):
     dependencies = [
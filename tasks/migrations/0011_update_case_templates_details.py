@@ -2,9 +2,10 @@ from django.db import migrations
 
 def update_case_templates(apps, schema_editor):
     TaskTemplate = apps.get_model('tasks', 'TaskTemplate')
+    db = schema_editor.connection.alias
     
     # Update Case 1: Auto Service
-    auto = TaskTemplate.objects.filter(code='AUTO-TO-60').first()
+    auto = TaskTemplate.objects.using(db).filter(code='AUTO-TO-60').first()
     if auto:
         auto.description = 'Стандартизация сервисных операций для минимизации возвратов по гарантии.'
         auto.related_resource_name = 'Спецификация запчастей (масло, фильтры)'
@@ -12,7 +13,7 @@ def update_case_templates(apps, schema_editor):
         auto.save()
 
     # Update Case 2: Microelectronics
-    micro = TaskTemplate.objects.filter(code='QC-MICRO-02').first()
+    micro = TaskTemplate.objects.using(db).filter(code='QC-MICRO-02').first()
     if micro:
         micro.description = 'Мониторинг технологического процесса для предотвращения массового брака (AOI-анализ).'
         micro.related_resource_name = 'Технологическая карта изделия (Gerber-файлы)'
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0015_alter_operation_options_operation_data_type_and_more'),
+        ('users_app', '0011_remove_tenantuser_can_delete_media'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStagePause',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField(auto_now_add=True, verbose_name='Начало паузы')),
+                ('end_time', models.DateTimeField(blank=True, null=True, verbose_name='Окончание паузы')),
+                ('reason', models.CharField(blank=True, max_length=255, verbose_name='Причина паузы')),
+            ],
+            options={
+                'verbose_name': 'Пауза этапа',
+                'verbose_name_plural': 'Паузы этапов',
+            },
+        ),
+        migrations.AlterField(
+            model_name='taskstage',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'В планах'), ('IN_PROGRESS', 'В работе'), ('PAUSED', 'На паузе'), ('COMPLETED', 'Завершен'), ('FAILED', 'Проблема')], default='PENDING', max_length=20, verbose_name='Статус этапа'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-created_at'], name='task_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', '-created_at'], name='task_assignee_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['priority'], name='task_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['process_type'], name='task_process_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['deadline'], name='task_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at'], name='task_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskstagepause',
+            name='stage',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pauses', to='tasks.taskstage', verbose_name='Этап'),
+        ),
+    ]
@@ -238,6 +238,15 @@ class Task(models.Model):
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
         ordering = ['-created_at']
+        # Под фильтры TaskViewSet и сортировку по умолчанию
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='task_status_created_idx'),
+            models.Index(fields=['assigned_to', '-created_at'], name='task_assignee_created_idx'),
+            models.Index(fields=['priority'], name='task_priority_idx'),
+            models.Index(fields=['process_type'], name='task_process_type_idx'),
+            models.Index(fields=['deadline'], name='task_deadline_idx'),
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.external_id}] {self.title}"
@@ -370,40 +379,104 @@ class TaskStage(models.Model):
                 self.check_analytical_triggers()
             
             # --- Auto-calculation Logic ---
-            old_status = old_stage.status
-            new_status = self.status
             now = timezone.now()
-            
-            # 1. Start Timestamp
-            if new_status == 'IN_PROGRESS' and not self.start_timestamp:
-                self.start_timestamp = now
+            pause_action = self.apply_status_transition(old_stage.status, now)
             
             # 2. Pause Handling
-            if old_status != 'PAUSED' and new_status == 'PAUSED':
+            if pause_action == 'open':
                 TaskStagePause.objects.create(stage=self, start_time=now, reason="Смена статуса")
-            elif old_status == 'PAUSED' and new_status != 'PAUSED':
+            elif pause_action == 'close':
                 active_pauses = self.pauses.filter(end_time__isnull=True)
                 for pause in active_pauses:
                     pause.end_time = now
                     pause.save()
             
             # 3. Completion
-            if new_status == 'COMPLETED':
-                self.is_completed = True
-                if not self.end_timestamp:
-                    self.end_timestamp = now
-                
-                # Calculate Duration
-                if self.start_timestamp:
-                    total_seconds = (self.end_timestamp - self.start_timestamp).total_seconds()
-                    pause_minutes = self.pause_duration
-                    total_minutes = int(total_seconds / 60)
-                    self.actual_duration = max(0, total_minutes - pause_minutes)
-            elif new_status != 'COMPLETED' and self.is_completed:
-                self.is_completed = False
+            self.apply_completion(now)
         
         super().save(*args, **kwargs)
 
+    def apply_status_transition(self, old_status, now):
+        """
+        Проставляет время начала при переходе в работу.
+        Возвращает действие над паузами: 'open', 'close' или None.
+        """
+        new_status = self.status
+        
+        # 1. Start Timestamp
+        if new_status == 'IN_PROGRESS' and not self.start_timestamp:
+            self.start_timestamp = now
+        
+        if old_status != 'PAUSED' and new_status == 'PAUSED':
+            return 'open'
+        if old_status == 'PAUSED' and new_status != 'PAUSED':
+            return 'close'
+        return None
+
+    def apply_completion(self, now, pause_minutes=None):
+        """
+        Фиксирует завершение этапа и считает фактическую длительность за вычетом пауз.
+        pause_minutes можно передать заранее посчитанным (пакетное обновление).
+        """
+        if self.status == 'COMPLETED':
+            self.is_completed = True
+            if not self.end_timestamp:
+                self.end_timestamp = now
+            
+            # Calculate Duration
+            if self.start_timestamp:
+                total_seconds = (self.end_timestamp - self.start_timestamp).total_seconds()
+                if pause_minutes is None:
+                    pause_minutes = self.pause_duration
+                total_minutes = int(total_seconds / 60)
+                self.actual_duration = max(0, total_minutes - pause_minutes)
+        elif self.is_completed:
+            self.is_completed = False
+
+    @classmethod
+    def bulk_update_with_triggers(cls, stages, fields, originals):
+        """
+        Пакетное обновление этапов с той же логикой, что и save():
+        временные метки, паузы, длительность и аналитические триггеры.
+        originals — словарь {pk: этап в состоянии до изменения}.
+        """
+        now = timezone.now()
+        fields = set(fields)
+        pauses_to_open = []
+        pauses_to_close = []
+        
+        for stage in stages:
+            old_stage = originals[stage.pk]
+            if old_stage.data_value != stage.data_value:
+                stage.check_analytical_triggers()
+            
+            pause_action = stage.apply_status_transition(old_stage.status, now)
+            if pause_action == 'open':
+                pauses_to_open.append(TaskStagePause(stage=stage, start_time=now, reason="Смена статуса"))
+            elif pause_action == 'close':
+                pauses_to_close.append(stage.pk)
+        
+        if pauses_to_close:
+            TaskStagePause.objects.filter(
+                stage_id__in=pauses_to_close, end_time__isnull=True
+            ).update(end_time=now)
+        
+        # Минуты пауз считаем одним запросом для всех завершаемых этапов
+        completing = [s.pk for s in stages if s.status == 'COMPLETED' and s.start_timestamp]
+        pause_minutes = dict.fromkeys(completing, 0)
+        if completing:
+            for pause in TaskStagePause.objects.filter(stage_id__in=completing):
+                pause_minutes[pause.stage_id] += pause.duration_minutes
+        
+        for stage in stages:
+            stage.apply_completion(now, pause_minutes.get(stage.pk, 0))
+        
+        fields.update(['start_timestamp', 'end_timestamp', 'is_completed', 'actual_duration'])
+        cls.objects.bulk_update(stages, sorted(fields), batch_size=500)
+        if pauses_to_open:
+            TaskStagePause.objects.bulk_create(pauses_to_open)
+        return stages
+
     def check_analytical_triggers(self):
         """Проверка условий для автоматического создания задач или алертов"""
         # Кейс: Автосервис - Износ тормозных колодок > 80%
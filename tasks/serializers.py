@@ -1,6 +1,80 @@
+import copy
+
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Task, TaskStage
 
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Список объектов для пакетных операций.
+    Создание выполняется одним bulk_create, обновление — одним bulk_update
+    только по тем полям, которые пришли в запросе.
+    """
+    bulk_batch_size = 500
+
+    def get_instance_map(self):
+        if not hasattr(self, '_instance_map'):
+            self._instance_map = {obj.pk: obj for obj in self.instance}
+        return self._instance_map
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            try:
+                pk = int(data.get('id'))
+            except (AttributeError, TypeError, ValueError):
+                raise serializers.ValidationError({'id': ['Не указан корректный id объекта.']})
+            instance = self.get_instance_map().get(pk)
+            if instance is None:
+                raise serializers.ValidationError({'id': [f'Объект с id={pk} не найден.']})
+            self.child.instance = instance
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        objs = []
+        for attrs in validated_data:
+            attrs.pop('id', None)
+            objs.append(model(**attrs))
+        return model.objects.bulk_create(objs, batch_size=self.bulk_batch_size)
+
+    def update(self, instance, validated_data):
+        instance_map = self.get_instance_map()
+        objs = []
+        originals = {}
+        fields = set()
+        for attrs in validated_data:
+            obj = instance_map[attrs.pop('id')]
+            originals[obj.pk] = copy.copy(obj)
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+                fields.add(attr)
+            objs.append(obj)
+
+        # bulk_update не вызывает pre_save, поэтому auto_now проставляем вручную
+        now = timezone.now()
+        for field in self.child.Meta.model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for obj in objs:
+                    setattr(obj, field.attname, now)
+                fields.add(field.name)
+
+        if objs and fields:
+            self.perform_bulk_update(objs, fields, originals)
+        return objs
+
+    def perform_bulk_update(self, objs, fields, originals):
+        self.child.Meta.model.objects.bulk_update(objs, sorted(fields), batch_size=self.bulk_batch_size)
+
+
+class TaskStageBulkListSerializer(BulkListSerializer):
+    """Пакетное обновление этапов с сохранением логики TaskStage.save (метки времени, паузы)"""
+
+    def perform_bulk_update(self, objs, fields, originals):
+        TaskStage.bulk_update_with_triggers(objs, fields, originals)
+
+
 class TaskStageSerializer(serializers.ModelSerializer):
     class Meta:
         model = TaskStage
@@ -9,6 +83,35 @@ class TaskStageSerializer(serializers.ModelSerializer):
             'status', 'reason_code', 'defect_criticality', 'damage_amount', 'order', 'is_completed'
         ]
 
+
+class TaskStageBulkSerializer(serializers.ModelSerializer):
+    """Этап задачи для пакетной загрузки (интеграции с MES)"""
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = TaskStage
+        list_serializer_class = TaskStageBulkListSerializer
+        fields = [
+            'id', 'task', 'name', 'executor_role', 'assigned_executor', 'equipment',
+            'planned_duration', 'status', 'result_status', 'quantity_good',
+            'reason_code', 'defect_criticality', 'damage_amount', 'order',
+            'data_type', 'data_value',
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Этапы можно привязывать только к задачам, доступным пользователю
+        task_queryset = self.context.get('task_queryset')
+        if task_queryset is not None:
+            fields['task'].queryset = task_queryset
+        return fields
+
+    def validate(self, attrs):
+        if self.instance is None and 'task' not in attrs:
+            raise serializers.ValidationError({'task': ['Обязательное поле.']})
+        return attrs
+
+
 class TaskSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     stages = TaskStageSerializer(many=True, read_only=True)
@@ -25,3 +128,18 @@ class TaskSerializer(serializers.ModelSerializer):
             'is_completed', 'created_at', 'closed_at', 'stages', 
             'lead_time', 'cycle_time', 'wait_time', 'efficiency_score'
         ]
+
+
+class TaskBulkSerializer(serializers.ModelSerializer):
+    """Задача для пакетной загрузки: без вложенных этапов и вычисляемых метрик"""
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Task
+        list_serializer_class = BulkListSerializer
+        fields = [
+            'id', 'external_id', 'title', 'description', 'process_type',
+            'priority', 'control_object', 'source', 'status', 'deadline',
+            'client_name', 'product_name', 'article_number', 'quantity',
+            'assigned_to',
+        ]
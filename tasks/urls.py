@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet
+from .views import TaskViewSet, TaskStageViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
+router.register(r'stages', TaskStageViewSet, basename='stage')
 
 urlpatterns = router.urls
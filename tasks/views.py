@@ -1,16 +1,93 @@
-from rest_framework import viewsets, permissions
-from .models import Task
-from .serializers import TaskSerializer
+from django.db import IntegrityError
+from django.db.models import Q
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+from .models import Task, TaskStage
+from .serializers import TaskSerializer, TaskBulkSerializer, TaskStageBulkSerializer
+from .filters import DeclaredFilterBackend, parse_int, parse_choices, parse_day
 from users_app.permissions import IsTenantAdmin, IsTenantWorker
+from customers.sharding import tenant_atomic
 
-class TaskViewSet(viewsets.ModelViewSet):
+
+class BulkModelMixin:
+    """
+    Пакетное создание (POST) и обновление (PATCH) списка объектов одним запросом.
+    Вся пачка сохраняется в одной транзакции. При ошибках валидации ничего
+    не сохраняется, а в ответе возвращаются ошибки по индексам элементов.
+    """
+    bulk_serializer_class = None
+    bulk_max_items = 1000
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.bulk_serializer_class(*args, many=True, **kwargs)
+
+    def get_bulk_save_kwargs(self, creating):
+        return {}
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Ожидается список объектов'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {'error': f'Слишком много объектов в одном запросе (максимум {self.bulk_max_items})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        creating = request.method == 'POST'
+        if creating:
+            serializer = self.get_bulk_serializer(data=items)
+        else:
+            ids = set()
+            for item in items:
+                try:
+                    ids.add(int(item.get('id')))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            instances = list(self.get_queryset().filter(pk__in=ids))
+            serializer = self.get_bulk_serializer(instances, data=items, partial=True)
+
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with tenant_atomic():
+                objs = serializer.save(**self.get_bulk_save_kwargs(creating))
+        except IntegrityError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {'count': len(objs), 'ids': [obj.pk for obj in objs]},
+            status=status.HTTP_201_CREATED if creating else status.HTTP_200_OK
+        )
+
+
+class TaskViewSet(BulkModelMixin, viewsets.ModelViewSet):
     """
     ViewSet для задач.
     Сотрудники видят только свои задачи.
     Администраторы видят все задачи.
+    Фильтры: ?status=OPEN,PAUSE&priority=4&process_type=AUDIT&assigned_to=<id>
+    &deadline_from=YYYY-MM-DD&deadline_to=YYYY-MM-DD&ordering=-deadline
     """
     serializer_class = TaskSerializer
+    bulk_serializer_class = TaskBulkSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DeclaredFilterBackend, OrderingFilter]
+    filter_params = {
+        'status': ('status__in', parse_choices(Task.STATUS_CHOICES)),
+        'priority': ('priority__in', parse_choices(Task.PRIORITY_CHOICES)),
+        'process_type': ('process_type__in', parse_choices(Task.PROCESS_TYPE_CHOICES)),
+        'assigned_to': ('assigned_to_id', parse_int),
+        'deadline_from': ('deadline__gte', parse_day),
+        'deadline_to': ('deadline__lte', parse_day),
+    }
+    ordering_fields = ['created_at', 'deadline', 'priority', 'status', 'updated_at']
+    ordering = ['-created_at']
 
     def get_queryset(self):
         user = self.request.user
@@ -35,3 +112,49 @@ class TaskViewSet(viewsets.ModelViewSet):
         else:
             # Не должен попадать сюда из-за прав доступа, но для безопасности
             pass
+
+    def get_bulk_save_kwargs(self, creating):
+        from users_app.models import TenantUser
+        
+        # Как и при одиночном создании, сотрудник становится исполнителем своих задач
+        if creating and isinstance(self.request.user, TenantUser):
+            return {'assigned_to': self.request.user}
+        return {}
+
+
+class TaskStageViewSet(BulkModelMixin, viewsets.GenericViewSet):
+    """
+    Пакетная загрузка этапов задач (интеграции с MES).
+    Сотрудники работают только с этапами своих задач или назначенными им этапами.
+    """
+    bulk_serializer_class = TaskStageBulkSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_task_queryset(self):
+        user = self.request.user
+        from users_app.models import TenantUser
+        
+        if isinstance(user, TenantUser):
+            if user.role == 'ADMIN':
+                return Task.objects.all()
+            return Task.objects.filter(assigned_to=user)
+        elif getattr(user, 'is_superuser', False):
+            return Task.objects.all()
+        return Task.objects.none()
+
+    def get_queryset(self):
+        user = self.request.user
+        from users_app.models import TenantUser
+        
+        if isinstance(user, TenantUser):
+            if user.role == 'ADMIN':
+                return TaskStage.objects.all()
+            return TaskStage.objects.filter(Q(task__assigned_to=user) | Q(assigned_executor=user))
+        elif getattr(user, 'is_superuser', False):
+            return TaskStage.objects.all()
+        return TaskStage.objects.none()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['task_queryset'] = self.get_task_queryset()
+        return context
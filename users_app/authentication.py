@@ -2,11 +2,13 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
 from django.contrib.auth import get_user_model
 from .models import TenantUser
+from .principal_cache import get_cached_principal
 
 class TenantJWTAuthentication(JWTAuthentication):
     """
     Кастомная JWT аутентификация, поддерживающая TenantUser.
     Проверяет claim 'user_type' в токене.
+    Пользователь берется из короткоживущего кэша (см. principal_cache).
     """
     
     def get_user(self, validated_token):
@@ -20,16 +22,18 @@ class TenantJWTAuthentication(JWTAuthentication):
             raise InvalidToken('Token contained no recognizable user identification')
 
         if user_type == 'tenant':
-            try:
-                user = TenantUser.objects.get(id=user_id)
-            except TenantUser.DoesNotExist:
-                raise AuthenticationFailed('User not found', code='user_not_found')
+            model = TenantUser
         else:
             # Public user (standard Django User)
-            try:
-                user = get_user_model().objects.get(id=user_id)
-            except get_user_model().DoesNotExist:
-                raise AuthenticationFailed('User not found', code='user_not_found')
+            user_type = 'public'
+            model = get_user_model()
+
+        user = get_cached_principal(
+            user_type, user_id,
+            lambda: model.objects.filter(id=user_id).first()
+        )
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
 
         if not user.is_active:
             raise AuthenticationFailed('User is inactive', code='user_inactive')
@@ -2,6 +2,7 @@ from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
 from django.db import connection
 from .models import TenantUser
+from .principal_cache import get_cached_principal
 
 
 class TenantUserBackend(ModelBackend):
@@ -65,8 +66,8 @@ class TenantUserBackend(ModelBackend):
         if connection.tenant.schema_name == 'public':
             return None
             
-        try:
-            return TenantUser.objects.get(pk=user_id)
-        except TenantUser.DoesNotExist:
-            return None
+        return get_cached_principal(
+            'tenant', user_id,
+            lambda: TenantUser.objects.filter(pk=user_id).first()
+        )
 
@@ -44,3 +44,11 @@ class IsTenantAdminOrReadOnly(permissions.BasePermission):
             return True
             
         return False
+
+class IsPlatformSuperuser(permissions.BasePermission):
+    """
+    Только системные суперпользователи (панель платформы в публичной схеме).
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and
+                   getattr(request.user, 'is_superuser', False))
@@ -0,0 +1,57 @@
+"""
+Короткоживущий кэш пользователей для аутентификации (JWT и сессии).
+
+Ключ строится из (схема, user_type, user_id) и "версии" пространства
+пользователей. Версия увеличивается при сохранении/удалении TenantUser
+в схеме (смена пароля, блокировка и т.д.; запись одного last_login при
+входе не в счет), а для массовых update() её нужно увеличивать явно
+через bump_principal_version().
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+PUBLIC_NAMESPACE = 'auth_user'
+
+
+def get_principal_timeout():
+    return getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 60)
+
+
+def current_schema():
+    return getattr(connection, 'schema_name', 'public')
+
+
+def _version_key(namespace):
+    return f'principal:ver:{namespace}'
+
+
+def get_principal_version(namespace):
+    return cache.get_or_set(_version_key(namespace), 1, None)
+
+
+def bump_principal_version(namespace):
+    """Инвалидирует всех закэшированных пользователей схемы (или системных пользователей)"""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def get_cached_principal(user_type, user_id, loader):
+    """
+    Возвращает пользователя из кэша или вызывает loader() и кэширует результат.
+    Отсутствующие пользователи (loader вернул None) не кэшируются.
+    """
+    schema = current_schema()
+    namespace = schema if user_type == 'tenant' else PUBLIC_NAMESPACE
+    version = get_principal_version(namespace)
+    key = f'principal:{schema}:{user_type}:{user_id}:v{version}'
+
+    user = cache.get(key)
+    if user is None:
+        user = loader()
+        if user is not None:
+            cache.set(key, user, get_principal_timeout())
+    return user
@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import TenantUser
+from .principal_cache import bump_principal_version, current_schema, PUBLIC_NAMESPACE
+
+
+# Поля, изменение которых не влияет на аутентификацию (last_login пишется при каждом входе)
+NON_AUTH_FIELDS = frozenset({'last_login'})
+
+
+def affects_principal(update_fields):
+    return not update_fields or not set(update_fields) <= NON_AUTH_FIELDS
+
+
+@receiver(post_save, sender=TenantUser)
+@receiver(post_delete, sender=TenantUser)
+def invalidate_tenant_principals(sender, instance, update_fields=None, **kwargs):
+    """Смена пароля, роли или блокировка пользователя тенанта сбрасывает кэш аутентификации"""
+    if affects_principal(update_fields):
+        bump_principal_version(current_schema())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_public_principals(sender, instance, update_fields=None, **kwargs):
+    if affects_principal(update_fields):
+        bump_principal_version(PUBLIC_NAMESPACE)